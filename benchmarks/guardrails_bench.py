@@ -0,0 +1,142 @@
+"""
+Microbenchmark for the guardrail pattern matching.
+
+Times one query against growing sets of injection patterns and domain
+keywords, matched pattern by pattern (the previous approach) and with the
+single-pass matchers in services/pattern_matcher.py. The single-pass
+columns should stay flat as the pattern count grows. Then times
+validate_query on distinct questions without and with the verdict cache,
+and validate_batch over all of them at once:
+
+    python -m benchmarks.guardrails_bench --counts 50,200,800,3200 --batch-size 1000
+"""
+import re
+import time
+import random
+import string
+import argparse
+from typing import Callable, Dict, List
+
+from services.pattern_matcher import KeywordMatcher, RegexSet
+from services.guardrails_service import GuardrailsService, verdict_cache
+
+QUERY = (
+    "Como o retrieval augmented generation usa embeddings e busca vetorial para "
+    "encontrar os trechos mais relevantes antes de gerar a resposta com citações?"
+)
+
+
+def time_call(fn: Callable[[str], object], query: str, repeat: int) -> float:
+    """Median microseconds per call over `repeat` runs of 100 calls."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(100):
+            fn(query)
+        samples.append((time.perf_counter() - start) / 100)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6
+
+
+def synthetic(count: int, seed: int) -> Dict[str, List[str]]:
+    """`count` injection-like patterns and keywords that never match QUERY."""
+    rng = random.Random(seed)
+
+    def word() -> str:
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+    return {
+        'patterns': [rf"{word()}\s+{word()}" for _ in range(count)],
+        'keywords': [f"{word()} {word()}" if rng.random() < 0.3 else word() for _ in range(count)]
+    }
+
+
+def run(counts: List[int], repeat: int) -> List[Dict]:
+
+    rows = []
+    sets = [('guardrails', GuardrailsService.INJECTION_PATTERNS, GuardrailsService.DOMAIN_KEYWORDS)]
+    for count in counts:
+        generated = synthetic(count, seed=count)
+        sets.append((str(count), generated['patterns'], generated['keywords']))
+
+    for label, patterns, keywords in sets:
+        compiled = [re.compile(p, re.IGNORECASE) for p in patterns]
+        lowered = [k.lower() for k in keywords]
+        regex_set = RegexSet(patterns)
+        keyword_matcher = KeywordMatcher(keywords)
+
+        def regex_loop(query: str) -> bool:
+            query = query.lower()
+            return any(p.search(query) for p in compiled)
+
+        def keyword_loop(query: str) -> bool:
+            query = query.lower()
+            return any(k in query for k in lowered)
+
+        rows.append({
+            'patterns': label,
+            'regex_loop_us': round(time_call(regex_loop, QUERY, repeat), 1),
+            'regex_set_us': round(time_call(regex_set.search, QUERY, repeat), 1),
+            'keyword_loop_us': round(time_call(keyword_loop, QUERY, repeat), 1),
+            'keyword_matcher_us': round(time_call(keyword_matcher.find, QUERY, repeat), 1)
+        })
+    return rows
+
+
+def distinct_questions(count: int, seed: int = 0) -> List[str]:
+    """Distinct in-domain and off-topic questions built from QUERY's words."""
+    rng = random.Random(seed)
+    words = QUERY.rstrip("?").split()
+    return [
+        " ".join(rng.sample(words, rng.randint(4, len(words)))) + f" {i}?"
+        for i in range(count)
+    ]
+
+
+def run_batch(size: int) -> Dict:
+    """Microseconds per question for each way of validating `size` distinct questions."""
+    guardrails = GuardrailsService()
+    questions = distinct_questions(size)
+
+    def timed(fn: Callable[[], object], clear: bool) -> float:
+        if clear:
+            verdict_cache._entries.clear()
+        start = time.perf_counter()
+        fn()
+        return round((time.perf_counter() - start) / size * 1e6, 2)
+
+    uncached = timed(lambda: [guardrails.validate_query(q) for q in questions], clear=True)
+    cached = timed(lambda: [guardrails.validate_query(q) for q in questions], clear=False)
+    batch = timed(lambda: guardrails.validate_batch(questions), clear=True)
+    return {
+        'questions': size,
+        'validate_query_us': uncached,
+        'validate_query_cached_us': cached,
+        'validate_batch_us': batch
+    }
+
+
+def print_table(rows: List[Dict]) -> None:
+
+    header = list(rows[0])
+    print(" ".join(f"{h:>24}" for h in header))
+    for row in rows:
+        print(" ".join(f"{row[h]:>24}" for h in header))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Guardrail pattern matching microbenchmark")
+    parser.add_argument("--counts", default="50,200,800,3200",
+                        help="Comma-separated synthetic pattern counts")
+    parser.add_argument("--repeat", type=int, default=21)
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="Distinct questions for the cache / batch comparison")
+    args = parser.parse_args()
+
+    print_table(run([int(c) for c in args.counts.split(",")], args.repeat))
+    print()
+    print_table([run_batch(args.batch_size)])
+
+
+if __name__ == "__main__":
+    main()
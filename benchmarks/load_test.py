@@ -0,0 +1,120 @@
+"""
+Concurrent load test for the query endpoint.
+
+Fires a fixed number of POST /chat/ask requests at each concurrency level and
+reports throughput, latency percentiles and the average number of requests
+actually in flight (sum of latencies / wall time). Run it against a single
+uvicorn worker to see per-worker concurrency. Each request gets its own
+question (the base question plus a request number) so request coalescing and
+the query caches don't collapse the load; pass --same-question to measure
+coalescing instead.
+
+    uvicorn main:app --workers 1
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 1,8,32,64
+"""
+import time
+import json
+import asyncio
+import argparse
+import itertools
+from typing import Dict, Iterator, List
+import httpx
+import numpy as np
+
+DEFAULT_QUESTION = "O que é RAG?"
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    path: str,
+    payloads: Iterator[Dict],
+    concurrency: int,
+    total_requests: int
+) -> Dict:
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(payload: Dict) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(next(payloads)) for _ in range(total_requests)))
+    wall = time.perf_counter() - wall_start
+
+    lat = np.array(latencies)
+    return {
+        'concurrency': concurrency,
+        'requests': total_requests,
+        'errors': errors,
+        'wall_seconds': round(wall, 2),
+        'throughput_rps': round(total_requests / wall, 2) if wall > 0 else 0.0,
+        'avg_in_flight': round(float(lat.sum()) / wall, 1) if wall > 0 else 0.0,
+        'latency_p50': round(float(np.percentile(lat, 50)), 3),
+        'latency_p95': round(float(np.percentile(lat, 95)), 3),
+        'latency_max': round(float(lat.max()), 3)
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict]:
+
+    def payloads() -> Iterator[Dict]:
+        for number in itertools.count(1):
+            question = args.question if args.same_question else f"{args.question} (#{number})"
+            payload = {"question": question}
+            if args.top_k:
+                payload["top_k"] = args.top_k
+            yield payload
+
+    requests = payloads()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    results = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        for level in levels:
+            total = args.requests or level * 4
+            result = await run_level(client, args.path, requests, level, total)
+            results.append(result)
+            print(
+                f"concurrency={result['concurrency']:>4}  "
+                f"rps={result['throughput_rps']:>8}  "
+                f"in_flight={result['avg_in_flight']:>6}  "
+                f"p50={result['latency_p50']}s  p95={result['latency_p95']}s  "
+                f"errors={result['errors']}"
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent load test for /chat/ask")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/chat/ask")
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    parser.add_argument("--same-question", action="store_true",
+                        help="Send the question unchanged on every request (exercises coalescing)")
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=None, help="Requests per level (default: 4x concurrency)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+OpenAI-compatible stub server for offline testing.
+
+Implements /v1/chat/completions (plain and streaming) and /v1/embeddings with
+configurable per-model latency and answer behaviour, so routing (model
+cascade), streaming and load tests run without network access or cost.
+Embeddings are deterministic pseudo-random unit vectors derived from the
+input text.
+
+    python -m benchmarks.stub_openai --port 9000 \\
+        --latency gpt-4o-mini=0.2 --latency gpt-4o=1.0 \\
+        --mode gpt-4o-mini=no_citations
+
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=stub \\
+    LLM_FAST_MODEL=gpt-4o-mini LLM_MODEL=gpt-4o uvicorn main:app
+
+Modes: ok (answer citing [Source 1]), no_citations, empty, length, error.
+--throttle-every N answers every Nth request with a 429 and a Retry-After.
+--slow-rate P makes a fraction P of requests take --slow-latency seconds
+(tail latency, for request hedging).
+"""
+import time
+import json
+import asyncio
+import random
+import hashlib
+import argparse
+from typing import Dict, List, Optional
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MODES = ("ok", "no_citations", "empty", "length", "error")
+
+ANSWERS = {
+    "ok": "According to the provided context, the answer is described in the documents [Source 1].",
+    "no_citations": "I think the answer is probably related to the topic you asked about.",
+    "empty": "",
+    "length": "According to the provided context, the answer is described in"
+}
+
+config = {
+    'default_latency': 0.3,
+    'latency': {},
+    'mode': {},
+    'embedding_dim': 1536,
+    'throttle_every': 0,
+    'slow_rate': 0.0,
+    'slow_latency': 5.0,
+    'retry_after': 1.0,
+    'requests': 0,
+    'throttled': 0,
+    'calls': {}
+}
+
+app = FastAPI(title="OpenAI stub")
+
+
+def _count(text: str) -> int:
+    return max(1, len(text.split()))
+
+
+def _model_setting(table: Dict[str, object], model: str, default: object) -> object:
+    return table.get(model, table.get("*", default))
+
+
+def _latency(model: str) -> float:
+
+    if config['slow_rate'] and random.random() < config['slow_rate']:
+        return config['slow_latency']
+    return float(_model_setting(config['latency'], model, config['default_latency']))
+
+
+def _throttled() -> Optional[JSONResponse]:
+
+    config['requests'] += 1
+    if not config['throttle_every'] or config['requests'] % config['throttle_every']:
+        return None
+    config['throttled'] += 1
+    return JSONResponse(
+        status_code=429,
+        headers={"retry-after-ms": str(int(config['retry_after'] * 1000))},
+        content={"error": {"message": "stub rate limit", "type": "requests", "code": "rate_limit_exceeded"}}
+    )
+
+
+def _embedding(text: str, dim: int) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+
+    throttled = _throttled()
+    if throttled is not None:
+        return throttled
+
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    model = body.get("model", "text-embedding-3-small")
+    config['calls'][model] = config['calls'].get(model, 0) + 1
+
+    await asyncio.sleep(_latency(model) / 4)
+
+    tokens = sum(_count(str(text)) for text in inputs)
+    return {
+        "object": "list",
+        "model": model,
+        "data": [
+            {"object": "embedding", "index": i, "embedding": _embedding(str(text), config['embedding_dim'])}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+
+    throttled = _throttled()
+    if throttled is not None:
+        return throttled
+
+    body = await request.json()
+    model = body.get("model", "stub")
+    mode = str(_model_setting(config['mode'], model, "ok"))
+    latency = _latency(model)
+    config['calls'][model] = config['calls'].get(model, 0) + 1
+
+    if mode == "error":
+        await asyncio.sleep(latency / 4)
+        return JSONResponse(status_code=500, content={"error": {"message": "stub error", "type": "server_error"}})
+
+    answer = ANSWERS[mode]
+    finish_reason = "length" if mode == "length" else "stop"
+    prompt_tokens = sum(_count(str(m.get("content", ""))) for m in body.get("messages", []))
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": _count(answer) if answer else 0,
+        "total_tokens": prompt_tokens + (_count(answer) if answer else 0)
+    }
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(latency)
+        return {
+            "id": f"chatcmpl-stub-{created}",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": finish_reason
+            }],
+            "usage": usage
+        }
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+    words = answer.split(" ") if answer else []
+
+    async def stream():
+        def chunk(delta: Dict, finish=None, chunk_usage=None, choices=True) -> str:
+            payload = {
+                "id": f"chatcmpl-stub-{created}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if choices else [],
+            }
+            if chunk_usage is not None:
+                payload["usage"] = chunk_usage
+            return f"data: {json.dumps(payload)}\n\n"
+
+        await asyncio.sleep(latency / 2)
+        for i, word in enumerate(words):
+            yield chunk({"content": word if i == 0 else " " + word})
+            await asyncio.sleep(latency / 2 / max(len(words), 1))
+        yield chunk({}, finish=finish_reason)
+        if include_usage:
+            yield chunk({}, chunk_usage=usage, choices=False)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def stats():
+    return {"calls": config['calls'], "requests": config['requests'], "throttled": config['throttled']}
+
+
+def _parse_pairs(values: List[str]) -> Dict[str, str]:
+    pairs = {}
+    for value in values:
+        model, _, setting = value.rpartition("=")
+        pairs[model or "*"] = setting
+    return pairs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--default-latency", type=float, default=0.3)
+    parser.add_argument("--latency", action="append", default=[], help="model=seconds (repeatable)")
+    parser.add_argument("--mode", action="append", default=[], help=f"model=mode, one of {', '.join(MODES)}")
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth request with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with a 429, in seconds")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests that take --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    args = parser.parse_args()
+
+    modes = _parse_pairs(args.mode)
+    for model, mode in modes.items():
+        if mode not in MODES:
+            parser.error(f"unknown mode {mode!r} for {model}")
+
+    config['default_latency'] = args.default_latency
+    config['latency'] = {model: float(v) for model, v in _parse_pairs(args.latency).items()}
+    config['mode'] = modes
+    config['embedding_dim'] = args.embedding_dim
+    config['throttle_every'] = args.throttle_every
+    config['retry_after'] = args.retry_after
+    config['slow_rate'] = args.slow_rate
+    config['slow_latency'] = args.slow_latency
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import os
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, load_only
+
+from database.connection import SessionLocal
+from models.document import Document
+from services.ingestion_service import IngestionService
+from services.document_cache import document_cache
+from services.corpus_stats import corpus_stats
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("change_detection")
+
+HASH_READ_SIZE = 1024 * 1024
+
+
+@dataclass
+class FileState:
+
+    filename: str
+    size: int
+    mtime_ns: int
+    content_hash: Optional[str] = None
+
+
+@dataclass
+class ScanResult:
+    """
+    Classification of the data folder against indexed documents.
+
+    - new: no document for this file (or its content)
+    - changed: document exists but content differs or was never fully processed
+    - renamed: content matches a document whose file disappeared
+    - deleted: document whose file is gone (or a stale duplicate row)
+    - touched: metadata changed but content hash is identical
+    - unchanged: size and mtime match, file not even hashed
+    """
+
+    new: List[FileState] = field(default_factory=list)
+    changed: List[Tuple[int, FileState]] = field(default_factory=list)
+    renamed: List[Tuple[int, FileState]] = field(default_factory=list)
+    deleted: List[int] = field(default_factory=list)
+    touched: List[Tuple[int, FileState]] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    def to_index(self) -> List[str]:
+        """Filenames that need extraction, chunking and embedding."""
+        return [s.filename for s in self.new] + [s.filename for _, s in self.changed]
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'new': len(self.new),
+            'changed': len(self.changed),
+            'renamed': len(self.renamed),
+            'deleted': len(self.deleted),
+            'touched': len(self.touched),
+            'unchanged': len(self.unchanged)
+        }
+
+
+def hash_file(path: Path) -> str:
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stat_folder(folder: Path) -> Dict[str, FileState]:
+
+    states = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if Path(entry.name).suffix.lower() not in settings.ALLOWED_EXTENSIONS:
+                continue
+            st = entry.stat()
+            states[entry.name] = FileState(entry.name, st.st_size, st.st_mtime_ns)
+    return states
+
+
+def scan_data_folder(db: Session, data_folder: str = "data") -> ScanResult:
+    """
+    Stat every file first and hash only those whose size or mtime differs
+    from the stored document, then classify each file.
+    """
+    folder = Path(data_folder)
+    states = stat_folder(folder)
+
+    documents = db.query(Document).options(load_only(
+        Document.id,
+        Document.original_filename,
+        Document.file_path,
+        Document.file_size,
+        Document.file_mtime_ns,
+        Document.content_hash,
+        Document.is_processed
+    )).filter(
+        Document.file_path.like(f"{folder}{os.sep}%"),
+        ~Document.file_path.like(f"{folder}{os.sep}%{os.sep}%")
+    ).order_by(Document.id).all()
+
+    result = ScanResult()
+
+    by_name: Dict[str, Document] = {}
+    for doc in documents:
+        name = str(doc.original_filename)
+        current = by_name.get(name)
+        if current is None:
+            by_name[name] = doc
+        elif doc.is_processed or not current.is_processed:
+            result.deleted.append(int(current.id))
+            by_name[name] = doc
+        else:
+            result.deleted.append(int(doc.id))
+
+    unmatched: List[FileState] = []
+    for name, state in states.items():
+        doc = by_name.get(name)
+
+        if (
+            doc is not None
+            and doc.is_processed
+            and doc.file_size == state.size
+            and doc.file_mtime_ns == state.mtime_ns
+        ):
+            result.unchanged.append(name)
+            continue
+
+        state.content_hash = hash_file(folder / name)
+
+        if doc is None:
+            unmatched.append(state)
+        elif doc.is_processed and (
+            doc.content_hash == state.content_hash
+            or (doc.content_hash is None and doc.file_size == state.size)
+        ):
+            result.touched.append((int(doc.id), state))
+        else:
+            result.changed.append((int(doc.id), state))
+
+    orphans = {name: doc for name, doc in by_name.items() if name not in states}
+    orphans_by_hash = {
+        doc.content_hash: doc
+        for doc in orphans.values()
+        if doc.is_processed and doc.content_hash
+    }
+
+    for state in unmatched:
+        doc = orphans_by_hash.pop(state.content_hash, None)
+        if doc is not None:
+            orphans.pop(str(doc.original_filename))
+            result.renamed.append((int(doc.id), state))
+        else:
+            result.new.append(state)
+
+    result.deleted.extend(int(doc.id) for doc in orphans.values())
+
+    return result
+
+
+def apply_scan(db: Session, scan: ScanResult, data_folder: str = "data") -> List[str]:
+    """
+    Apply metadata-only updates (touched, renamed), drop documents whose
+    content is gone or stale (deleted, changed), and return the filenames
+    that still need to go through the pipeline.
+    """
+    folder = Path(data_folder)
+
+    for document_id, state in scan.touched + scan.renamed:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document is None:
+            continue
+        setattr(document, "filename", state.filename)
+        setattr(document, "original_filename", state.filename)
+        setattr(document, "file_path", str(folder / state.filename))
+        setattr(document, "file_size", state.size)
+        setattr(document, "file_mtime_ns", state.mtime_ns)
+        setattr(document, "content_hash", state.content_hash)
+    db.commit()
+    for document_id, _ in scan.renamed:
+        document_cache.invalidate(document_id)
+    corpus_stats.mark_dirty()
+
+    ingestion_service = IngestionService(db)
+    for document_id in scan.deleted + [document_id for document_id, _ in scan.changed]:
+        ingestion_service.delete_document(document_id, delete_file=False)
+
+    return scan.to_index()
+
+
+def reconcile_data_folder(data_folder: str = "data") -> ScanResult:
+    """
+    Scan the data folder, apply the cheap updates, and return the scan so
+    the caller can enqueue scan.to_index() for indexing.
+    """
+    db = SessionLocal()
+    try:
+        scan = scan_data_folder(db, data_folder)
+        logger.info(f"Data folder scan: {scan.summary()}")
+        apply_scan(db, scan, data_folder)
+        return scan
+    finally:
+        db.close()
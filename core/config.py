@@ -16,14 +16,66 @@ class Settings(BaseSettings):
     
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", 500))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", 100))
+    STITCH_ADJACENT_CHUNKS: bool = os.getenv("STITCH_ADJACENT_CHUNKS", "true").lower() == "true"
 
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
     EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", 1536))
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+    EMBEDDING_CONCURRENCY: int = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+    SENTENCE_EMBEDDINGS: bool = os.getenv("SENTENCE_EMBEDDINGS", "true").lower() == "true"
+    SENTENCE_EMBEDDING_DIM: int = int(os.getenv("SENTENCE_EMBEDDING_DIM", 256))
+    EXTRACTIVE_MAX_SENTENCES: int = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", 3))
+
+    INGESTION_WORKERS: int = int(os.getenv("INGESTION_WORKERS", os.cpu_count() or 1))
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", 8))
+    PDF_PAGE_CACHE_DIR: str = os.getenv("PDF_PAGE_CACHE_DIR", ".cache/pdf_pages")
+    SERVE_WHILE_INDEXING: bool = os.getenv("SERVE_WHILE_INDEXING", "false").lower() == "true"
+
+    WATCH_DATA_FOLDER: bool = os.getenv("WATCH_DATA_FOLDER", "true").lower() == "true"
+    WATCH_MODE: str = os.getenv("WATCH_MODE", "auto")
+    WATCH_DEBOUNCE_SECONDS: float = float(os.getenv("WATCH_DEBOUNCE_SECONDS", 1.0))
+    WATCH_POLL_INTERVAL: float = float(os.getenv("WATCH_POLL_INTERVAL", 2.0))
+    WATCH_QUEUE_SIZE: int = int(os.getenv("WATCH_QUEUE_SIZE", 16))
+
+    COALESCE_REQUESTS: bool = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+    COALESCE_TIMEOUT_SECONDS: float = float(os.getenv("COALESCE_TIMEOUT_SECONDS", 30.0))
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", 30.0))
+    DEADLINE_MIN_LLM_SECONDS: float = float(os.getenv("DEADLINE_MIN_LLM_SECONDS", 1.0))
+    SPECULATIVE_EMBEDDING: bool = os.getenv("SPECULATIVE_EMBEDDING", "true").lower() == "true"
+    GUARDRAILS_CACHE_SIZE: int = int(os.getenv("GUARDRAILS_CACHE_SIZE", 4096))
+    DOMAIN_CHECK: str = os.getenv("DOMAIN_CHECK", "keywords")
+    DOMAIN_SIMILARITY_MARGIN: float = float(os.getenv("DOMAIN_SIMILARITY_MARGIN", 0.0))
+    DOMAIN_MAX_CENTROIDS: int = int(os.getenv("DOMAIN_MAX_CENTROIDS", 256))
+    DOMAIN_REFRESH_SECONDS: float = float(os.getenv("DOMAIN_REFRESH_SECONDS", 300.0))
+    DOMAIN_CACHE_SIZE: int = int(os.getenv("DOMAIN_CACHE_SIZE", 1024))
+    METRICS_WINDOW_SIZE: int = int(os.getenv("METRICS_WINDOW_SIZE", 10000))
+
+    STATS_REFRESH_SECONDS: float = float(os.getenv("STATS_REFRESH_SECONDS", 5.0))
+    STATS_MAX_AGE_SECONDS: float = float(os.getenv("STATS_MAX_AGE_SECONDS", 300.0))
     
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    HEDGE_REQUESTS: bool = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+    HEDGE_DELAY_SECONDS: float = float(os.getenv("HEDGE_DELAY_SECONDS", 0.0))
+    HEDGE_MAX_RATE: float = float(os.getenv("HEDGE_MAX_RATE", 0.05))
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", 60.0))
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+    OPENAI_RPM_LIMIT: int = int(os.getenv("OPENAI_RPM_LIMIT", 3000))
+    OPENAI_TPM_LIMIT: int = int(os.getenv("OPENAI_TPM_LIMIT", 1000000))
+    OPENAI_BATCH_RESERVE: float = float(os.getenv("OPENAI_BATCH_RESERVE", 0.2))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", 5))
+    OPENAI_RETRY_BASE_SECONDS: float = float(os.getenv("OPENAI_RETRY_BASE_SECONDS", 0.5))
+    OPENAI_RETRY_MAX_SECONDS: float = float(os.getenv("OPENAI_RETRY_MAX_SECONDS", 30.0))
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    LLM_FAST_MODEL: str = os.getenv("LLM_FAST_MODEL", "")
+    LLM_CASCADE_MIN_SIMILARITY: float = float(os.getenv("LLM_CASCADE_MIN_SIMILARITY", 0.6))
+    LLM_CASCADE_SIGNALS: List[str] = [
+        s.strip() for s in os.getenv("LLM_CASCADE_SIGNALS", "low_similarity,length,empty,no_citations").split(",") if s.strip()
+    ]
     LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", 0.7))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", 800))
+    LLM_CONTEXT_WINDOW: int = int(os.getenv("LLM_CONTEXT_WINDOW", 16385))
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", 3000))
     
     TOP_K_RESULTS: int = int(os.getenv("TOP_K_RESULTS", 3))
     MIN_SIMILARITY: float = float(os.getenv("MIN_SIMILARITY", 0.5))
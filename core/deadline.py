@@ -0,0 +1,44 @@
+import time
+from typing import Optional
+
+from core.config import settings
+
+
+class DeadlineExceeded(Exception):
+    """A stage ran out of request budget and had nothing to degrade to."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Overall time budget of one request. Stages take remaining() as their
+    timeout so the whole request finishes by the deadline; None means
+    unbounded.
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds if seconds and seconds > 0 else None
+        self.expires_at = time.monotonic() + self.seconds if self.seconds else None
+
+    @classmethod
+    def for_request(cls, header_seconds: Optional[float] = None) -> "Deadline":
+        """X-Request-Timeout when the client sent one, else REQUEST_DEADLINE_SECONDS."""
+        return cls(header_seconds if header_seconds is not None else settings.REQUEST_DEADLINE_SECONDS)
+
+    def remaining(self) -> Optional[float]:
+
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def allows(self, seconds: float) -> bool:
+        """Whether at least `seconds` of budget is left."""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    @property
+    def expired(self) -> bool:
+        return not self.allows(1e-9)
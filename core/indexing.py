@@ -0,0 +1,150 @@
+import os
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database.setup_pgvector import setup_pgvector
+from core.change_detection import reconcile_data_folder
+from core.pipeline import process_documents_parallel
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("indexing")
+
+
+class IndexingState:
+    """
+    Tracks the background indexing run started at application startup.
+
+    Phases: pending -> schema -> indexing -> ready. Errors in any phase are
+    recorded but still end in "ready" (the API has always come up even when
+    pgvector setup or a document failed); readiness is about the initial
+    pass having finished, not about it having been perfect.
+    """
+
+    PHASES = ["pending", "schema", "indexing", "ready"]
+
+    def __init__(self):
+        self.phase = "pending"
+        self.schema_ready = False
+        self.files_total = 0
+        self.files_done = 0
+        self.files_failed = 0
+        self.errors: List[str] = []
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def set_phase(self, phase: str) -> None:
+        with self._lock:
+            self.phase = phase
+            if phase == "schema" and self.started_at is None:
+                self.started_at = datetime.now().isoformat()
+            if phase == "ready":
+                self.finished_at = datetime.now().isoformat()
+
+    def record_error(self, error: str) -> None:
+        with self._lock:
+            self.errors.append(error)
+
+    def on_file_progress(self, filename: str, stage: str) -> None:
+        with self._lock:
+            if stage == "completed":
+                self.files_done += 1
+            elif stage == "failed":
+                self.files_done += 1
+                self.files_failed += 1
+
+    @property
+    def is_ready(self) -> bool:
+        return self.phase == "ready"
+
+    def accepting_queries(self) -> bool:
+        """
+        Queries need the schema in place; before the initial pass finishes they
+        are only served when SERVE_WHILE_INDEXING allows answering from the
+        already-indexed subset.
+        """
+        if self.is_ready:
+            return True
+        return self.schema_ready and settings.SERVE_WHILE_INDEXING
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'phase': self.phase,
+                'ready': self.phase == "ready",
+                'accepting_queries': self.accepting_queries(),
+                'files': {
+                    'total': self.files_total,
+                    'done': self.files_done,
+                    'failed': self.files_failed
+                },
+                'errors': list(self.errors),
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+indexing_state = IndexingState()
+
+
+async def run_startup_indexing(data_folder: str = "data", state: IndexingState = indexing_state) -> None:
+    """
+    Schema setup and the initial data folder pass, run as a background task so
+    the API starts serving liveness (and, optionally, queries) immediately.
+    """
+    state.set_phase("schema")
+    logger.info("Setting up pgvector extension...")
+    try:
+        await asyncio.to_thread(setup_pgvector)
+        logger.info("✓ pgvector extension configured")
+    except Exception as e:
+        logger.error(f"✗ Error setting up pgvector: {str(e)}")
+        logger.warning("  Continuing anyway, but vector search may not work properly")
+        state.record_error(f"pgvector setup: {str(e)}")
+    state.schema_ready = True
+
+    state.set_phase("indexing")
+    logger.info("Processing documents from data folder...")
+    try:
+        if not os.path.exists(data_folder):
+            logger.warning(f"Data folder not found: {data_folder}")
+            return
+
+        scan = await asyncio.to_thread(reconcile_data_folder, data_folder)
+        summary = scan.summary()
+        logger.info(
+            f"  New: {summary['new']}, changed: {summary['changed']}, "
+            f"renamed: {summary['renamed']}, deleted: {summary['deleted']}, "
+            f"unchanged: {summary['unchanged'] + summary['touched']}"
+        )
+
+        files = scan.to_index()
+        state.files_total = len(files)
+        if not files:
+            logger.info("No new or changed documents in data folder")
+            return
+
+        logger.info(f"Found {len(files)} document(s) to process")
+        results = await process_documents_parallel(
+            files,
+            data_folder=data_folder,
+            progress_callback=state.on_file_progress
+        )
+        for result in results:
+            if not result.get("success"):
+                logger.error(f"  ✗ {result['filename']}: {result.get('error', 'Unknown')}")
+                state.record_error(f"{result['filename']}: {result.get('error', 'Unknown')}")
+        indexed = sum(1 for r in results if r.get("success") and not r.get("skipped"))
+        logger.info(f"  ✓ Indexed: {indexed}/{len(files)}")
+
+    except Exception as e:
+        logger.error(f"  ✗ Exception processing documents: {str(e)}")
+        state.record_error(str(e))
+    finally:
+        state.set_phase("ready")
+        logger.info("=" * 70)
+        logger.info("✓ Document processing complete - index ready")
+        logger.info("=" * 70)
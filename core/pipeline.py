@@ -1,18 +1,27 @@
 import os
 import gc
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from sqlalchemy.orm import Session
 
-from services.ingestion_service import IngestionService
-from services.chunking_service import ChunkingService
+from services.ingestion_service import IngestionService, extract_content, compute_content_hash
+from services.chunking_service import ChunkingService, split_text, split_text_stream
+from services.pdf_extraction import PdfPageCache, iter_pdf_text
 from services.embedding_service import EmbeddingService
+from services.corpus_stats import corpus_stats
+from database.connection import SessionLocal
 from database.vector_store import VectorStore
 from models.document import Document
+from core.config import settings
 from core.logging_config import get_logger
 
 logger = get_logger("pipeline")
 
+_shared_pool: Optional[ProcessPoolExecutor] = None
+_shared_embedding_semaphore: Optional[asyncio.Semaphore] = None
+
 
 def process_document_pipeline(db: Session, filename: str) -> Dict[str, Any]:
     """
@@ -34,25 +43,35 @@ def process_document_pipeline(db: Session, filename: str) -> Dict[str, Any]:
                 "error": f"File not found: {filename}"
             }
         
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        content_hash = compute_content_hash(content)
+
+        ingestion_service = IngestionService(db)
+        # Scoped to the data folder: an upload may share the original filename.
         existing = db.query(Document).filter(
-            Document.original_filename == filename
+            Document.original_filename == filename,
+            Document.file_path == str(file_path)
         ).first()
 
         if existing is not None:
             is_processed_value = getattr(existing, 'is_processed', False)
-            if is_processed_value:
+            if is_processed_value and existing.content_hash in (None, content_hash):
                 return {
                     "success": True,
                     "skipped": True,
                     "message": f"Document already processed: {filename}"
                 }
+            logger.info(f"Content changed or incomplete, re-indexing {filename}...")
+            ingestion_service.delete_document(int(existing.id), delete_file=False)
 
         logger.info(f"Step 1: Ingesting document {filename}...")
-        ingestion_service = IngestionService(db)
-        with open(file_path, 'rb') as f:
-            content = f.read()
-
-        document = ingestion_service.ingest_document_sync(content, filename, save_to_disk=False)
+        document = ingestion_service.ingest_document_sync(
+            content,
+            filename,
+            save_to_disk=False,
+            file_mtime_ns=file_path.stat().st_mtime_ns
+        )
         logger.info(f"✓ Document ingested: {document.id}")
         doc_id = document.id
         
@@ -125,3 +144,345 @@ def process_document_pipeline(db: Session, filename: str) -> Dict[str, Any]:
             except:
                 pass
         gc.collect()
+
+
+def extract_and_chunk(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    executor: Optional[Executor] = None
+) -> Dict[str, Any]:
+    """
+    CPU-bound half of the parallel pipeline: parse the file and split it into chunks.
+    Runs inside a worker process, so it must not touch the database.
+
+    PDFs go through the per-page cache and are chunked page by page as pages
+    arrive; given an executor, their page ranges are parsed across it.
+    """
+    path = Path(file_path)
+    file_ext = path.suffix.lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        raise ValueError(f"File type not allowed. Allowed: {settings.ALLOWED_EXTENSIONS}")
+
+    file_mtime_ns = path.stat().st_mtime_ns
+    with open(path, 'rb') as f:
+        file_content = f.read()
+
+    file_size = len(file_content)
+    if file_size > settings.MAX_FILE_SIZE:
+        raise ValueError(f"File too large. Maximum: {settings.MAX_FILE_SIZE} bytes")
+
+    file_type = file_ext.lstrip('.')
+    content_hash = compute_content_hash(file_content)
+
+    if file_type == 'pdf':
+        del file_content
+        cache = PdfPageCache()
+        parts: List[str] = []
+
+        def pages_text():
+            for part in iter_pdf_text(file_path, content_hash, executor=executor, cache=cache):
+                parts.append(part)
+                yield part
+
+        chunks = list(split_text_stream(pages_text(), chunk_size, chunk_overlap))
+        content = "".join(parts)
+        metadata = {'num_pages': cache.get_num_pages(content_hash)}
+    else:
+        content, metadata = extract_content(file_content, file_type)
+        chunks = split_text(content, chunk_size, chunk_overlap)
+
+    return {
+        'file_type': file_type,
+        'file_size': file_size,
+        'file_mtime_ns': file_mtime_ns,
+        'content_hash': content_hash,
+        'content': content,
+        'metadata': metadata,
+        'chunks': chunks
+    }
+
+
+def _persist_extracted(
+    original_filename: str,
+    file_path: Path,
+    extracted: Dict[str, Any]
+) -> Tuple[int, List[int], List[str]]:
+    db = SessionLocal()
+    try:
+        document = IngestionService(db).save_extracted_document(
+            stored_filename=file_path.name,
+            original_filename=original_filename,
+            file_type=extracted['file_type'],
+            file_size=extracted['file_size'],
+            file_path=str(file_path),
+            content=extracted['content'],
+            metadata=extracted['metadata'],
+            content_hash=extracted['content_hash'],
+            file_mtime_ns=extracted['file_mtime_ns']
+        )
+
+        chunks = []
+        if extracted['chunks']:
+            chunks = ChunkingService(db).save_chunks(document, extracted['chunks'])
+
+        return int(document.id), [int(c.id) for c in chunks], [str(c.content) for c in chunks]
+    finally:
+        db.close()
+
+
+def _persist_embeddings(
+    document_id: int,
+    chunk_ids: List[int],
+    embeddings: List[List[float]],
+    model: str,
+    sentences: Optional[List[Tuple[str, Optional[bytes]]]] = None
+) -> int:
+    db = SessionLocal()
+    try:
+        stored = VectorStore(db).store_embeddings(list(zip(chunk_ids, embeddings)), model, sentences)
+
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document and stored == len(chunk_ids):
+            setattr(document, "is_processed", True)
+            setattr(document, "processing_status", "completed")
+            db.commit()
+            corpus_stats.mark_dirty()
+
+        return stored
+    finally:
+        db.close()
+
+
+def _discard_document(document_id: int) -> None:
+    """Delete a document whose indexing failed after it was persisted, so the next scan retries the file."""
+    db = SessionLocal()
+    try:
+        IngestionService(db).delete_document(document_id, delete_file=False)
+    finally:
+        db.close()
+
+
+async def _index_file(
+    file_path: Path,
+    filename: str,
+    position: int,
+    total: int,
+    pool: ProcessPoolExecutor,
+    embedding_service: EmbeddingService,
+    semaphore: asyncio.Semaphore,
+    batch_size: int,
+    progress_callback: Optional[Callable[[str, str], None]]
+) -> Dict[str, Any]:
+
+    def report(stage: str, detail: str = "") -> None:
+        logger.info(f"[{position}/{total}] {filename}: {stage}{' - ' + detail if detail else ''}")
+        if progress_callback:
+            progress_callback(filename, stage)
+
+    loop = asyncio.get_running_loop()
+    document_id = None
+
+    try:
+        report("extracting")
+        if file_path.suffix.lower() == '.pdf':
+            extracted = await asyncio.to_thread(
+                extract_and_chunk,
+                str(file_path),
+                settings.CHUNK_SIZE,
+                settings.CHUNK_OVERLAP,
+                pool
+            )
+        else:
+            extracted = await loop.run_in_executor(
+                pool,
+                extract_and_chunk,
+                str(file_path),
+                settings.CHUNK_SIZE,
+                settings.CHUNK_OVERLAP
+            )
+        report("extracted", f"{len(extracted['chunks'])} chunks")
+
+        document_id, chunk_ids, texts = await asyncio.to_thread(
+            _persist_extracted, filename, file_path, extracted
+        )
+        del extracted
+
+        embeddings_count = 0
+        if texts:
+            report("embedding")
+            embeddings_task = embedding_service.generate_embeddings_async(
+                texts, batch_size=batch_size, semaphore=semaphore
+            )
+            if settings.SENTENCE_EMBEDDINGS:
+                embeddings, sentences = await asyncio.gather(
+                    embeddings_task,
+                    embedding_service.generate_sentence_embeddings_async(texts, semaphore=semaphore)
+                )
+            else:
+                embeddings, sentences = await embeddings_task, None
+            embeddings_count = await asyncio.to_thread(
+                _persist_embeddings, document_id, chunk_ids, embeddings, embedding_service.model, sentences
+            )
+
+        report("completed", f"{embeddings_count}/{len(chunk_ids)} embeddings")
+
+        return {
+            "success": True,
+            "skipped": False,
+            "filename": filename,
+            "document_id": document_id,
+            "chunks_count": len(chunk_ids),
+            "embeddings_count": embeddings_count,
+            "message": f"Successfully processed: {filename}"
+        }
+
+    except Exception as e:
+        logger.error(f"[{position}/{total}] {filename}: failed - {str(e)}")
+        if document_id is not None:
+            # The document and its chunks were committed without embeddings:
+            # invisible to retrieval, yet its content hash would mark the file unchanged.
+            try:
+                await asyncio.to_thread(_discard_document, document_id)
+            except Exception as cleanup_error:
+                logger.error(f"[{position}/{total}] {filename}: could not remove partial document {document_id} - {str(cleanup_error)}")
+        if progress_callback:
+            progress_callback(filename, "failed")
+        return {
+            "success": False,
+            "filename": filename,
+            "error": str(e)
+        }
+
+
+async def process_documents_parallel(
+    filenames: List[str],
+    data_folder: str = "data",
+    max_workers: Optional[int] = None,
+    embedding_concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    progress_callback: Optional[Callable[[str, str], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Process many documents concurrently.
+
+    Extraction and chunking run across a process pool (PDF/DOCX parsing is
+    CPU-bound), embeddings are requested with async I/O under a shared
+    concurrency cap, and database writes run in worker threads. Results are
+    returned in the same order as filenames, in the process_document_pipeline
+    result format plus a "filename" key.
+    """
+    max_workers = max_workers or settings.INGESTION_WORKERS
+    embedding_concurrency = embedding_concurrency or settings.EMBEDDING_CONCURRENCY
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    folder = Path(data_folder)
+
+    db = SessionLocal()
+    try:
+        # Matched on the data folder path: an upload may share the original filename.
+        processed = {
+            row.original_filename
+            for row in db.query(Document.original_filename).filter(
+                Document.file_path.in_([str(folder / filename) for filename in filenames]),
+                Document.is_processed == True
+            )
+        }
+        embedding_service = EmbeddingService(db)
+    finally:
+        db.close()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for filename in filenames:
+        if filename in processed:
+            results[filename] = {
+                "success": True,
+                "skipped": True,
+                "filename": filename,
+                "message": f"Document already processed: {filename}"
+            }
+        elif not (folder / filename).exists():
+            results[filename] = {
+                "success": False,
+                "filename": filename,
+                "error": f"File not found: {filename}"
+            }
+        else:
+            pending.append(filename)
+
+    if pending:
+        logger.info(
+            f"Indexing {len(pending)} document(s) with {max_workers} "
+            f"worker(s), {embedding_concurrency} concurrent embedding request(s)"
+        )
+        semaphore = asyncio.Semaphore(embedding_concurrency)
+        # Sized to max_workers even for few documents: PDF pages fan out over the pool.
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            indexed = await asyncio.gather(*(
+                _index_file(
+                    folder / filename,
+                    filename,
+                    position,
+                    len(pending),
+                    pool,
+                    embedding_service,
+                    semaphore,
+                    batch_size,
+                    progress_callback
+                )
+                for position, filename in enumerate(pending, 1)
+            ))
+        for result in indexed:
+            results[result["filename"]] = result
+
+    return [results[filename] for filename in filenames]
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Long-lived extraction pool for requests that arrive while the API is serving
+    (uploads), so each one does not pay process start-up cost.
+    """
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = ProcessPoolExecutor(max_workers=settings.INGESTION_WORKERS)
+    return _shared_pool
+
+
+def shutdown_process_pool() -> None:
+    global _shared_pool
+    if _shared_pool is not None:
+        _shared_pool.shutdown(wait=False, cancel_futures=True)
+        _shared_pool = None
+
+
+async def process_uploaded_document(
+    file_path: Path,
+    original_filename: str,
+    progress_callback: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Index a file that was already written to the upload directory. Uses the
+    shared process pool and a process-wide cap on concurrent embedding requests.
+    """
+    global _shared_embedding_semaphore
+    if _shared_embedding_semaphore is None:
+        _shared_embedding_semaphore = asyncio.Semaphore(settings.EMBEDDING_CONCURRENCY)
+
+    db = SessionLocal()
+    try:
+        embedding_service = EmbeddingService(db)
+    finally:
+        db.close()
+
+    return await _index_file(
+        file_path,
+        original_filename,
+        1,
+        1,
+        get_process_pool(),
+        embedding_service,
+        _shared_embedding_semaphore,
+        settings.EMBEDDING_BATCH_SIZE,
+        progress_callback
+    )
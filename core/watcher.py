@@ -0,0 +1,255 @@
+import os
+import sys
+import time
+import struct
+import asyncio
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from database.connection import SessionLocal
+from core.change_detection import reconcile_data_folder, stat_folder
+from core.pipeline import process_document_pipeline
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("watcher")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+RESCAN = "*"
+
+
+class InotifySource:
+    """
+    Minimal inotify binding over ctypes (Linux only). Raises OSError when
+    inotify is unavailable so the watcher can fall back to polling.
+    """
+
+    def __init__(self, folder: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("libc has no inotify support")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        wd = libc.inotify_add_watch(self.fd, str(folder).encode(), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+
+    def read_events(self) -> List[str]:
+        """Drain pending events; returns affected filenames (RESCAN on overflow)."""
+        names: List[str] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                _, mask, _, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + name_len].rstrip(b"\0").decode(errors="replace")
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    names.append(RESCAN)
+                elif name:
+                    names.append(name)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DataFolderWatcher:
+    """
+    Watches the data folder and feeds changes into the indexing pipeline.
+
+    Events (inotify, or a stat-diff poll as fallback) are debounced per file:
+    a file is only enqueued after it has been quiet for debounce_seconds, so an
+    editor's write bursts produce a single job. The work queue is bounded; when
+    it is full the debouncer blocks on put() and further events are coalesced
+    in the pending map instead of piling up behind slow embedding calls.
+
+    The worker drains whatever is queued, reconciles the folder (cheap: stat
+    first, hash only changed files, handles renames/deletes) and runs
+    process_document_pipeline for each file that needs indexing.
+    """
+
+    def __init__(
+        self,
+        data_folder: str = "data",
+        debounce_seconds: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        queue_size: Optional[int] = None,
+        mode: Optional[str] = None
+    ):
+        self.data_folder = Path(data_folder)
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else settings.WATCH_DEBOUNCE_SECONDS
+        self.poll_interval = poll_interval if poll_interval is not None else settings.WATCH_POLL_INTERVAL
+        self.queue_size = queue_size or settings.WATCH_QUEUE_SIZE
+        self.requested_mode = (mode or settings.WATCH_MODE).lower()
+        self.mode: Optional[str] = None
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending: Dict[str, float] = {}
+        self._source: Optional[InotifySource] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.stats = {
+            'events': 0,
+            'enqueued': 0,
+            'backpressure_waits': 0,
+            'batches': 0,
+            'files_indexed': 0,
+            'files_failed': 0,
+            'last_batch_at': None
+        }
+
+    def _is_relevant(self, name: str) -> bool:
+        if name == RESCAN:
+            return True
+        if name.startswith('.'):
+            return False
+        return Path(name).suffix.lower() in settings.ALLOWED_EXTENSIONS
+
+    def _mark(self, names: List[str]) -> None:
+        now = time.monotonic()
+        for name in names:
+            if self._is_relevant(name):
+                self.stats['events'] += 1
+                self.pending[name] = now
+
+    def _start_inotify(self) -> bool:
+        try:
+            self._source = InotifySource(self.data_folder)
+        except OSError as e:
+            logger.warning(f"inotify unavailable ({e}); falling back to polling")
+            return False
+
+        source = self._source
+        asyncio.get_running_loop().add_reader(source.fd, lambda: self._mark(source.read_events()))
+        return True
+
+    async def _poll_loop(self) -> None:
+        snapshot: Dict[str, Tuple[int, int]] = {}
+        first = True
+        while True:
+            try:
+                states = await asyncio.to_thread(stat_folder, self.data_folder)
+                current = {name: (s.size, s.mtime_ns) for name, s in states.items()}
+                if not first:
+                    changed = [n for n, meta in current.items() if snapshot.get(n) != meta]
+                    removed = [n for n in snapshot if n not in current]
+                    self._mark(changed + removed)
+                snapshot = current
+                first = False
+            except FileNotFoundError:
+                pass
+            await asyncio.sleep(self.poll_interval)
+
+    async def _debounce_loop(self) -> None:
+        tick = max(self.debounce_seconds / 4, 0.05)
+        while True:
+            await asyncio.sleep(tick)
+            now = time.monotonic()
+            ready = [n for n, t in self.pending.items() if now - t >= self.debounce_seconds]
+            for name in ready:
+                if self.queue.full():
+                    self.stats['backpressure_waits'] += 1
+                await self.queue.put(name)
+                if self.pending.get(name, now) <= now:
+                    self.pending.pop(name, None)
+                self.stats['enqueued'] += 1
+
+    def _sync_batch(self, names: List[str]) -> None:
+        scan = reconcile_data_folder(str(self.data_folder))
+        to_index = scan.to_index()
+        if not to_index:
+            return
+
+        logger.info(f"Watcher: indexing {len(to_index)} file(s) after changes to {sorted(set(names))}")
+        for filename in to_index:
+            db = SessionLocal()
+            try:
+                result = process_document_pipeline(db, filename)
+                if result.get("success"):
+                    self.stats['files_indexed'] += 1
+                else:
+                    self.stats['files_failed'] += 1
+                    logger.error(f"Watcher: {filename} failed - {result.get('error', 'Unknown')}")
+            finally:
+                db.close()
+
+    async def _worker(self, after: Optional[asyncio.Task]) -> None:
+        if after is not None:
+            await asyncio.wait([after])
+
+        while True:
+            names = [await self.queue.get()]
+            while not self.queue.empty():
+                names.append(self.queue.get_nowait())
+
+            try:
+                await asyncio.to_thread(self._sync_batch, names)
+                self.stats['batches'] += 1
+                self.stats['last_batch_at'] = time.time()
+            except Exception as e:
+                logger.error(f"Watcher batch failed: {str(e)}")
+            finally:
+                for _ in names:
+                    self.queue.task_done()
+
+    async def start(self, after: Optional[asyncio.Task] = None) -> None:
+        """
+        Start watching immediately; processing waits for `after` (typically the
+        startup indexing task) so the two never index the same files at once.
+        """
+        self.data_folder.mkdir(parents=True, exist_ok=True)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+
+        if self.requested_mode in ("auto", "inotify") and self._start_inotify():
+            self.mode = "inotify"
+        else:
+            self.mode = "poll"
+            self._tasks.append(asyncio.create_task(self._poll_loop()))
+
+        self._tasks.append(asyncio.create_task(self._debounce_loop()))
+        self._tasks.append(asyncio.create_task(self._worker(after)))
+        logger.info(f"Watching {self.data_folder} for changes (mode: {self.mode})")
+
+    async def stop(self) -> None:
+        if self._source is not None:
+            asyncio.get_running_loop().remove_reader(self._source.fd)
+            self._source.close()
+            self._source = None
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get_stats(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'pending': len(self.pending),
+            'queued': self.queue.qsize() if self.queue else 0,
+            'queue_capacity': self.queue_size,
+            **self.stats
+        }
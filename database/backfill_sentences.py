@@ -0,0 +1,98 @@
+"""
+Fill sentence_spans / sentence_embeddings for chunks indexed before
+extractive answers existed (or with SENTENCE_EMBEDDINGS=false).
+
+    python -m database.backfill_sentences [--batch-chunks 256] [--embedding-concurrency 4]
+
+Chunks are processed in id order, one committed batch at a time, so an
+interrupted run simply resumes with the chunks still missing them.
+Embedding requests run at batch priority under the shared OpenAI quota.
+"""
+import sys
+import time
+import asyncio
+import argparse
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from database.connection import SessionLocal
+from database.setup_pgvector import setup_pgvector
+from services.embedding_service import EmbeddingService
+from core.config import settings
+from core.logging_config import setup_logging, get_logger
+
+logger = get_logger("backfill_sentences")
+
+
+async def backfill(batch_chunks: int, embedding_concurrency: int) -> int:
+
+    semaphore = asyncio.Semaphore(embedding_concurrency)
+    db = SessionLocal()
+    try:
+        embedding_service = EmbeddingService(db)
+        total = 0
+        last_id = 0
+        start_time = time.time()
+
+        while True:
+            rows = db.execute(
+                text("""
+                    SELECT id, content
+                    FROM chunks
+                    WHERE sentence_spans IS NULL AND id > :last_id
+                    ORDER BY id
+                    LIMIT :limit
+                """),
+                {"last_id": last_id, "limit": batch_chunks}
+            ).fetchall()
+            if not rows:
+                break
+
+            sentences = await embedding_service.generate_sentence_embeddings_async(
+                [row.content for row in rows], semaphore=semaphore
+            )
+            db.execute(
+                text("""
+                    UPDATE chunks
+                    SET sentence_spans = :spans,
+                        sentence_embeddings = :blob
+                    WHERE id = :id
+                """),
+                [
+                    {"id": row.id, "spans": spans, "blob": blob}
+                    for row, (spans, blob) in zip(rows, sentences)
+                ]
+            )
+            db.commit()
+
+            total += len(rows)
+            last_id = rows[-1].id
+            logger.info(f"{total} chunks backfilled ({total / (time.time() - start_time):.1f} chunks/s)")
+
+        return total
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill sentence embeddings for extractive answers")
+    parser.add_argument("--batch-chunks", type=int, default=256,
+                        help="Chunks per committed batch")
+    parser.add_argument("--embedding-concurrency", type=int, default=settings.EMBEDDING_CONCURRENCY,
+                        help="Concurrent embedding requests")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+
+    if not setup_pgvector(create_index=False):
+        print("✗ pgvector setup failed")
+        return 1
+
+    total = asyncio.run(backfill(args.batch_chunks, args.embedding_concurrency))
+    print(f"✓ {total} chunks backfilled")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
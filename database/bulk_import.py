@@ -0,0 +1,497 @@
+"""
+Bulk import of a directory tree into documents/chunks.
+
+    python -m database.bulk_import /path/to/corpus [--workers 8] [--batch-docs 64]
+
+Pipeline per batch of files: parallel extraction + chunking + token counting
+in a process pool (the next batch is already extracting while the current one
+embeds), token-packed embedding requests issued concurrently, then a single
+COPY per table with pre-allocated ids. The ANN index is dropped up front and
+built once at the end. Completed files are appended to a checkpoint file so an
+interrupted run resumes where it stopped (failed files are retried).
+"""
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor, Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import tiktoken
+from sqlalchemy import text
+
+from database.connection import engine, SessionLocal
+from database.setup_pgvector import setup_pgvector, create_vector_index, ivfflat_lists
+from services.ingestion_service import IngestionService
+from services.chunking_service import ChunkingService
+from services.embedding_service import EmbeddingService
+from core.pipeline import extract_and_chunk
+from core.config import settings
+from core.logging_config import setup_logging, get_logger
+
+logger = get_logger("bulk_import")
+
+DEFAULT_CHECKPOINT = ".bulk_import_checkpoint.jsonl"
+
+_encoding = None
+
+
+def _count_tokens(texts: List[str]) -> List[int]:
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(settings.EMBEDDING_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return [len(tokens) for tokens in _encoding.encode_batch(texts)]
+
+
+def extract_for_import(file_path: str, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    """Worker-process task: extract, chunk and count tokens for one file."""
+    try:
+        extracted = extract_and_chunk(file_path, chunk_size, chunk_overlap)
+        extracted['token_counts'] = _count_tokens(extracted['chunks'])
+        extracted['path'] = file_path
+        return extracted
+    except Exception as e:
+        return {'path': file_path, 'error': str(e)}
+
+
+def discover_files(root: Path) -> List[Path]:
+
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            if Path(filename).suffix.lower() in settings.ALLOWED_EXTENSIONS:
+                files.append(Path(dirpath) / filename)
+    return files
+
+
+def load_checkpoint(path: Path) -> Set[str]:
+
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                done.add(json.loads(line)['path'])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def _copy_value(value: Any) -> str:
+    """Encode a value for COPY ... FROM STDIN in PostgreSQL text format."""
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (
+        str(value)
+        .replace('\x00', '')
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def _copy_rows(cursor, table: str, columns: List[str], rows: List[List[Any]]) -> None:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(v) for v in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+DOCUMENT_COLUMNS = [
+    'id', 'filename', 'original_filename', 'file_type', 'file_size', 'file_path',
+    'content_hash', 'file_mtime_ns', 'content', 'content_preview', 'num_pages',
+    'num_words', 'num_characters', 'language', 'is_processed', 'processing_status',
+    'processed_at'
+]
+
+CHUNK_COLUMNS = [
+    'id', 'document_id', 'content', 'chunk_index', 'chunk_size', 'token_count',
+    'previous_chunk_id', 'next_chunk_id', 'embedding', 'embedding_model',
+    'section_title', 'embedding_vector', 'sentence_spans', 'sentence_embeddings'
+]
+
+
+def copy_load_batch(
+    root: Path,
+    extracted: List[Dict[str, Any]],
+    embeddings: List[List[List[float]]],
+    model: str,
+    sentences: Optional[List[List[Tuple[str, Optional[bytes]]]]] = None
+) -> List[int]:
+    """
+    Load one batch with COPY. Ids come from the tables' own sequences up front
+    so chunk rows can reference their document and neighbours without a
+    round trip per row. Runs in a single transaction. `sentences` holds each
+    document's per-chunk (sentence_spans, sentence_embeddings).
+    """
+    total_chunks = sum(len(e['chunks']) for e in extracted)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence('documents', 'id')) FROM generate_series(1, %s)",
+            (len(extracted),)
+        )
+        document_ids = [row[0] for row in cursor.fetchall()]
+
+        chunk_ids: List[int] = []
+        if total_chunks:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('chunks', 'id')) FROM generate_series(1, %s)",
+                (total_chunks,)
+            )
+            chunk_ids = [row[0] for row in cursor.fetchall()]
+
+        document_rows = []
+        chunk_rows = []
+        next_chunk = 0
+
+        for position, (document_id, item, vectors) in enumerate(zip(document_ids, extracted, embeddings)):
+            document_sentences = sentences[position] if sentences else []
+            content = item['content']
+            relative = Path(item['path']).relative_to(root).as_posix()
+            fully_embedded = len(vectors) == len(item['chunks']) and bool(item['chunks'])
+
+            document_rows.append([
+                document_id,
+                relative[-255:],
+                relative[-255:],
+                item['file_type'],
+                item['file_size'],
+                item['path'],
+                item['content_hash'],
+                item['file_mtime_ns'],
+                content,
+                content[:500],
+                item['metadata'].get('num_pages'),
+                IngestionService._count_words(content),
+                len(content),
+                IngestionService._detect_language(content),
+                fully_embedded,
+                'completed' if fully_embedded else 'chunked',
+                None
+            ])
+
+            ids = chunk_ids[next_chunk:next_chunk + len(item['chunks'])]
+            next_chunk += len(item['chunks'])
+
+            for index, (chunk_id, chunk_text) in enumerate(zip(ids, item['chunks'])):
+                vector = vectors[index] if index < len(vectors) else None
+                spans, blob = document_sentences[index] if index < len(document_sentences) else (None, None)
+                chunk_rows.append([
+                    chunk_id,
+                    document_id,
+                    chunk_text,
+                    index,
+                    len(chunk_text),
+                    item['token_counts'][index],
+                    ids[index - 1] if index > 0 else None,
+                    ids[index + 1] if index + 1 < len(ids) else None,
+                    json.dumps(vector) if vector is not None else None,
+                    model if vector is not None else None,
+                    ChunkingService._extract_section_title(chunk_text),
+                    '[' + ','.join(map(str, vector)) + ']' if vector is not None else None,
+                    spans,
+                    '\\x' + blob.hex() if blob is not None else None
+                ])
+
+        _copy_rows(cursor, 'documents', DOCUMENT_COLUMNS, document_rows)
+        if chunk_rows:
+            _copy_rows(cursor, 'chunks', CHUNK_COLUMNS, chunk_rows)
+
+        raw.commit()
+        return document_ids
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+class BulkImporter:
+
+    def __init__(
+        self,
+        root: Path,
+        workers: int,
+        batch_docs: int,
+        embedding_concurrency: int,
+        max_request_tokens: int,
+        checkpoint_path: Path,
+        keep_index: bool = False
+    ):
+        self.root = root
+        self.workers = workers
+        self.batch_docs = batch_docs
+        self.embedding_concurrency = embedding_concurrency
+        self.max_request_tokens = max_request_tokens
+        self.checkpoint_path = checkpoint_path
+        self.keep_index = keep_index
+
+        self.stats = {
+            'files_found': 0,
+            'files_skipped_checkpoint': 0,
+            'files_skipped_duplicate': 0,
+            'files_failed': 0,
+            'documents': 0,
+            'chunks': 0,
+            'embedding_tokens': 0,
+            'extract_wait': 0.0,
+            'embed_time': 0.0,
+            'load_time': 0.0,
+            'index_time': 0.0
+        }
+
+    def _existing_hashes(self) -> Set[str]:
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                text("SELECT content_hash FROM documents WHERE content_hash IS NOT NULL")
+            ).fetchall()
+            return {row[0] for row in rows}
+        finally:
+            db.close()
+
+    async def _embed_batch(
+        self,
+        embedding_service: EmbeddingService,
+        semaphore: asyncio.Semaphore,
+        texts: List[str],
+        token_counts: List[int]
+    ) -> List[List[float]]:
+
+        async def run(indices: List[int]) -> List[List[float]]:
+            async with semaphore:
+                return await embedding_service._generate_embeddings_batch_async(
+                    [texts[i] for i in indices],
+                    tokens=sum(token_counts[i] for i in indices)
+                )
+
+        packs = EmbeddingService.pack_token_batches(token_counts, self.max_request_tokens)
+        results = await asyncio.gather(*(run(indices) for indices in packs))
+        return [vector for result in results for vector in result]
+
+    def _write_checkpoint(self, items: List[Dict[str, Any]], document_ids: List[Optional[int]]) -> None:
+        with open(self.checkpoint_path, 'a', encoding='utf-8') as f:
+            for item, document_id in zip(items, document_ids):
+                f.write(json.dumps({
+                    'path': item['path'],
+                    'hash': item.get('content_hash'),
+                    'document_id': document_id,
+                    'error': item.get('error')
+                }) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _set_vector_index(self, drop: bool) -> None:
+        with engine.connect() as conn:
+            if drop:
+                conn.execute(text("DROP INDEX IF EXISTS chunks_embedding_vector_idx;"))
+            else:
+                vectors = conn.execute(
+                    text("SELECT COUNT(*) FROM chunks WHERE embedding_vector IS NOT NULL")
+                ).scalar() or 0
+                create_vector_index(conn, lists=ivfflat_lists(vectors))
+            conn.commit()
+
+    async def run(self) -> Dict[str, Any]:
+        start_time = time.time()
+
+        done = load_checkpoint(self.checkpoint_path)
+        files = discover_files(self.root)
+        self.stats['files_found'] = len(files)
+        pending = [str(f) for f in files if str(f) not in done]
+        self.stats['files_skipped_checkpoint'] = len(files) - len(pending)
+        logger.info(f"Found {len(files)} file(s), {len(pending)} to import ({len(done)} in checkpoint)")
+
+        if not pending:
+            return self.report(time.time() - start_time)
+
+        seen_hashes = self._existing_hashes()
+
+        db = SessionLocal()
+        try:
+            embedding_service = EmbeddingService(db)
+        finally:
+            db.close()
+        semaphore = asyncio.Semaphore(self.embedding_concurrency)
+
+        if not self.keep_index:
+            self._set_vector_index(drop=True)
+            logger.info("Dropped vector index; it will be rebuilt once at the end")
+
+        batches = [pending[i:i + self.batch_docs] for i in range(0, len(pending), self.batch_docs)]
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+
+            def submit(batch: List[str]) -> List[Future]:
+                return [
+                    pool.submit(extract_for_import, path, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+                    for path in batch
+                ]
+
+            in_flight = [submit(batches[0])]
+            if len(batches) > 1:
+                in_flight.append(submit(batches[1]))
+
+            for batch_number in range(len(batches)):
+                wait_start = time.time()
+                results = await asyncio.gather(*(asyncio.wrap_future(f) for f in in_flight.pop(0)))
+                self.stats['extract_wait'] += time.time() - wait_start
+
+                if batch_number + 2 < len(batches):
+                    in_flight.append(submit(batches[batch_number + 2]))
+
+                failed = [r for r in results if 'error' in r]
+                for item in failed:
+                    logger.error(f"  ✗ {item['path']}: {item['error']}")
+                self.stats['files_failed'] += len(failed)
+
+                to_load = []
+                duplicates = []
+                for item in results:
+                    if 'error' in item:
+                        continue
+                    if item['content_hash'] in seen_hashes:
+                        duplicates.append(item)
+                        continue
+                    seen_hashes.add(item['content_hash'])
+                    to_load.append(item)
+                self.stats['files_skipped_duplicate'] += len(duplicates)
+
+                document_ids: List[int] = []
+                if to_load:
+                    texts = [c for item in to_load for c in item['chunks']]
+                    token_counts = [t for item in to_load for t in item['token_counts']]
+
+                    embed_start = time.time()
+                    if settings.SENTENCE_EMBEDDINGS:
+                        vectors, sentence_data = await asyncio.gather(
+                            self._embed_batch(embedding_service, semaphore, texts, token_counts),
+                            embedding_service.generate_sentence_embeddings_async(texts, semaphore=semaphore)
+                        )
+                    else:
+                        vectors = await self._embed_batch(embedding_service, semaphore, texts, token_counts)
+                        sentence_data = []
+                    self.stats['embed_time'] += time.time() - embed_start
+                    self.stats['embedding_tokens'] += sum(token_counts)
+
+                    per_document = []
+                    per_document_sentences = []
+                    offset = 0
+                    for item in to_load:
+                        per_document.append(vectors[offset:offset + len(item['chunks'])])
+                        per_document_sentences.append(sentence_data[offset:offset + len(item['chunks'])])
+                        offset += len(item['chunks'])
+
+                    load_start = time.time()
+                    document_ids = await asyncio.to_thread(
+                        copy_load_batch, self.root, to_load, per_document, embedding_service.model,
+                        per_document_sentences if sentence_data else None
+                    )
+                    self.stats['load_time'] += time.time() - load_start
+                    self.stats['documents'] += len(to_load)
+                    self.stats['chunks'] += len(texts)
+
+                self._write_checkpoint(to_load + duplicates, document_ids + [None] * len(duplicates))
+
+                elapsed = time.time() - start_time
+                logger.info(
+                    f"[batch {batch_number + 1}/{len(batches)}] "
+                    f"{self.stats['documents']} docs, {self.stats['chunks']} chunks, "
+                    f"{self.stats['documents'] / elapsed:.1f} docs/s"
+                )
+
+        if not self.keep_index:
+            index_start = time.time()
+            self._set_vector_index(drop=False)
+            self.stats['index_time'] = time.time() - index_start
+            logger.info(f"✓ Vector index rebuilt in {self.stats['index_time']:.1f}s")
+
+        return self.report(time.time() - start_time)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        elapsed = max(elapsed, 1e-9)
+        return {
+            **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.stats.items()},
+            'elapsed_seconds': round(elapsed, 2),
+            'docs_per_second': round(self.stats['documents'] / elapsed, 2),
+            'chunks_per_second': round(self.stats['chunks'] / elapsed, 2),
+            'embedding_tokens_per_second': round(self.stats['embedding_tokens'] / elapsed, 2)
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import a directory tree of documents")
+    parser.add_argument("root", help="Directory to import (walked recursively)")
+    parser.add_argument("--workers", type=int, default=settings.INGESTION_WORKERS,
+                        help="Extraction processes")
+    parser.add_argument("--batch-docs", type=int, default=64,
+                        help="Files per COPY batch / checkpoint")
+    parser.add_argument("--embedding-concurrency", type=int, default=settings.EMBEDDING_CONCURRENCY,
+                        help="Concurrent embedding requests")
+    parser.add_argument("--max-request-tokens", type=int, default=100_000,
+                        help="Token budget per embedding request")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT,
+                        help="Checkpoint file (JSON lines) used to resume")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument("--keep-index", action="store_true",
+                        help="Keep the vector index during the import instead of rebuilding it")
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO")
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"✗ Not a directory: {root}")
+        return 1
+
+    checkpoint_path = Path(args.checkpoint)
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    if not setup_pgvector(create_index=False):
+        print("✗ pgvector setup failed")
+        return 1
+
+    importer = BulkImporter(
+        root=root,
+        workers=args.workers,
+        batch_docs=args.batch_docs,
+        embedding_concurrency=args.embedding_concurrency,
+        max_request_tokens=args.max_request_tokens,
+        checkpoint_path=checkpoint_path,
+        keep_index=args.keep_index
+    )
+    report = asyncio.run(importer.run())
+
+    print("\n📊 Bulk import report")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
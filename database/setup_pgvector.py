@@ -1,7 +1,39 @@
 from sqlalchemy import text
 from database.connection import engine
 
-def setup_pgvector():
+def ivfflat_lists(row_count: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(row_count ** 0.5)
+
+
+def create_vector_index(conn, lists: int = 100):
+    conn.execute(text("DROP INDEX IF EXISTS chunks_embedding_vector_idx;"))
+    conn.execute(text(f"""
+        CREATE INDEX chunks_embedding_vector_idx
+        ON chunks
+        USING ivfflat (embedding_vector vector_cosine_ops)
+        WITH (lists = {int(lists)});
+    """))
+
+
+def ensure_vector_index(conn, lists: int = 100) -> bool:
+    """Create the vector index only when missing; an existing one keeps its tuning. True if created."""
+    exists = conn.execute(text("""
+        SELECT 1 FROM pg_indexes WHERE indexname = 'chunks_embedding_vector_idx';
+    """)).fetchone()
+    if exists:
+        return False
+    create_vector_index(conn, lists=lists)
+    return True
+
+
+def setup_pgvector(create_index: bool = True):
+    """
+    Extension, vector column and schema additions. create_index=False skips
+    the vector index, for callers that manage it themselves (bulk import).
+    """
     with engine.connect() as conn:
         print("Setting up pgvector...")
 
@@ -36,17 +68,42 @@ def setup_pgvector():
             return False
 
         try:
-            conn.execute(text("DROP INDEX IF EXISTS chunks_embedding_vector_idx;"))
             conn.execute(text("""
-                CREATE INDEX chunks_embedding_vector_idx
-                ON chunks
-                USING ivfflat (embedding_vector vector_cosine_ops)
-                WITH (lists = 100);
+                ALTER TABLE documents
+                ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64),
+                ADD COLUMN IF NOT EXISTS file_mtime_ns BIGINT;
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_documents_content_hash
+                ON documents (content_hash);
             """))
-            print("✓ IVFFlat index created")
             conn.commit()
+            print("✓ Document change-detection columns ready")
         except Exception as e:
-            print(f"⚠ Error creating index (normal if no data): {e}")
+            print(f"✗ Error adding document columns: {e}")
+            return False
+
+        try:
+            conn.execute(text("""
+                ALTER TABLE chunks
+                ADD COLUMN IF NOT EXISTS sentence_spans TEXT,
+                ADD COLUMN IF NOT EXISTS sentence_embeddings BYTEA;
+            """))
+            conn.commit()
+            print("✓ Sentence embedding columns ready")
+        except Exception as e:
+            print(f"✗ Error adding sentence columns: {e}")
+            return False
+
+        if create_index:
+            try:
+                if ensure_vector_index(conn):
+                    print("✓ IVFFlat index created")
+                else:
+                    print("ℹ IVFFlat index already exists")
+                conn.commit()
+            except Exception as e:
+                print(f"⚠ Error creating index (normal if no data): {e}")
 
         try:
             result = conn.execute(text("SELECT COUNT(*) FROM chunks WHERE embedding_vector IS NOT NULL;"))
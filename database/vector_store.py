@@ -1,9 +1,10 @@
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text, func
 import json
 
 from models.chunk import Chunk
+from services.corpus_stats import corpus_stats, count_chunks
 
 class VectorStore:
     def __init__(self, db: Session):
@@ -62,6 +63,57 @@ class VectorStore:
 
         return {'synced': synced, 'total_pending': pending}
 
+    def store_embeddings(
+        self,
+        embeddings_by_chunk: List[Tuple[int, List[float]]],
+        model: str,
+        sentences: Optional[List[Tuple[str, Optional[bytes]]]] = None
+    ) -> int:
+        """
+        Write JSON and pgvector columns for known chunks in one executemany,
+        skipping the separate sync pass over pending rows. `sentences`, when
+        given, holds each chunk's (sentence_spans, sentence_embeddings).
+        """
+        if not embeddings_by_chunk:
+            return 0
+
+        params = []
+        for chunk_id, embedding in embeddings_by_chunk:
+            params.append({
+                "id": chunk_id,
+                "emb": json.dumps(embedding),
+                "vec": '[' + ','.join(map(str, embedding)) + ']',
+                "model": model
+            })
+
+        self.db.execute(
+            text("""
+                UPDATE chunks
+                SET embedding = :emb,
+                    embedding_vector = CAST(:vec AS vector),
+                    embedding_model = :model
+                WHERE id = :id
+            """),
+            params
+        )
+        if sentences:
+            self.db.execute(
+                text("""
+                    UPDATE chunks
+                    SET sentence_spans = :spans,
+                        sentence_embeddings = :blob
+                    WHERE id = :id
+                """),
+                [
+                    {"id": chunk_id, "spans": spans, "blob": blob}
+                    for (chunk_id, _), (spans, blob) in zip(embeddings_by_chunk, sentences)
+                ]
+            )
+        self.db.commit()
+        corpus_stats.mark_dirty()
+
+        return len(params)
+
     def similarity_search(
         self,
         query_embedding: List[float],
@@ -94,9 +146,17 @@ class VectorStore:
             }
         ).fetchall()
 
+        if not results:
+            return []
+
+        chunks = {
+            chunk.id: chunk
+            for chunk in self.db.query(Chunk).filter(Chunk.id.in_([row.id for row in results]))
+        }
+
         chunk_results = []
         for row in results:
-            chunk = self.db.query(Chunk).filter(Chunk.id == row.id).first()
+            chunk = chunks.get(row.id)
             if chunk:
                 similarity = 1 - (row.distance / 2)
                 chunk_results.append((chunk, similarity))
@@ -104,29 +164,12 @@ class VectorStore:
         return chunk_results
 
     def get_stats(self) -> Dict:
-        total_chunks = self.db.query(Chunk).count()
-
-        chunks_with_vector_query = text("""
-            SELECT COUNT(*)
-            FROM chunks
-            WHERE embedding_vector IS NOT NULL
-        """)
-        chunks_with_vector = self.db.execute(chunks_with_vector_query).scalar() or 0
-
-        docs_with_embeddings_query = text("""
-            SELECT COUNT(DISTINCT document_id)
-            FROM chunks
-            WHERE embedding_vector IS NOT NULL
-        """)
-        docs_with_embeddings = self.db.execute(docs_with_embeddings_query).scalar() or 0
+        chunks = count_chunks(self.db)
 
         return {
-            'total_chunks': total_chunks,
-            'chunks_with_vectors': chunks_with_vector,
-            'chunks_pending': total_chunks - chunks_with_vector,
-            'completion_rate': round(
-                (chunks_with_vector / total_chunks * 100) if total_chunks > 0 else 0,
-                2
-            ),
-            'documents_indexed': docs_with_embeddings
+            'total_chunks': chunks['total'],
+            'chunks_with_vectors': chunks['with_embeddings'],
+            'chunks_pending': chunks['pending'],
+            'completion_rate': chunks['completion_rate'],
+            'documents_indexed': chunks['documents_indexed']
         }
@@ -1,10 +1,17 @@
 from fastapi import FastAPI
-from database.connection import Base, engine, SessionLocal
+from fastapi.responses import JSONResponse
+from database.connection import Base, engine
 from routes.chatbot_route import router as chatbot_router
+from routes.document_route import router as document_router
 from core.logging_config import setup_logging, get_logger
-from core.pipeline import process_document_pipeline
-from database.setup_pgvector import setup_pgvector
+from core.pipeline import shutdown_process_pool
+from core.indexing import indexing_state, run_startup_indexing
+from core.watcher import DataFolderWatcher
+from services.corpus_stats import corpus_stats
+from services.domain_classifier import domain_classifier
+from core.config import settings
 import os
+import asyncio
 
 setup_logging(level="INFO", log_file="logs/rag_chatbot.log", json_format=False)
 logger = get_logger("main")
@@ -18,6 +25,7 @@ app = FastAPI(
 )
 
 app.include_router(chatbot_router)
+app.include_router(document_router)
 
 
 @app.on_event("startup")
@@ -33,52 +41,40 @@ async def startup_event():
     logger.info("✓ Models synchronized")
     logger.info("=" * 70)
     
-    logger.info("Setting up pgvector extension...")
-    try:
-        setup_pgvector()
-        logger.info("✓ pgvector extension configured")
-    except Exception as e:
-        logger.error(f"✗ Error setting up pgvector: {str(e)}")
-        logger.warning("  Continuing anyway, but vector search may not work properly")
-    logger.info("=" * 70)
-    
-    logger.info("Processing documents from data folder...")
-    data_folder = "data"
-    if os.path.exists(data_folder):
-        files = [f for f in os.listdir(data_folder) if f.endswith(('.md', '.txt', '.pdf', '.docx'))]
-        if files:
-            logger.info(f"Found {len(files)} document(s) to process")
-            for i, filename in enumerate(files, 1):
-                logger.info(f"[{i}/{len(files)}] Processing: {filename}")
-                db = SessionLocal()
-                try:
-                    result = process_document_pipeline(db, filename)
-                    if result.get("success"):
-                        if result.get("skipped"):
-                            logger.info(f"  ✓ Skipped (already processed)")
-                        else:
-                            logger.info(f"  ✓ Chunks: {result.get('chunks_count', 0)}")
-                            logger.info(f"  ✓ Embeddings: {result.get('embeddings_count', 0)}")
-                    else:
-                        logger.error(f"  ✗ Error: {result.get('error', 'Unknown')}")
-                except Exception as e:
-                    logger.error(f"  ✗ Exception processing {filename}: {str(e)}")
-                finally:
-                    db.close()
-                    import gc
-                    gc.collect()
-            logger.info("=" * 70)
-            logger.info("✓ Document processing complete")
-        else:
-            logger.info("No documents found in data folder")
-    else:
-        logger.warning(f"Data folder not found: {data_folder}")
+    app.state.indexing_task = asyncio.create_task(run_startup_indexing("data"))
+    app.state.stats_task = asyncio.create_task(corpus_stats.run())
+    if domain_classifier.enabled:
+        app.state.domain_task = asyncio.create_task(domain_classifier.run())
+    logger.info("✓ Indexing scheduled in background")
+
+    if settings.WATCH_DATA_FOLDER:
+        app.state.watcher = DataFolderWatcher("data")
+        await app.state.watcher.start(after=app.state.indexing_task)
+    if settings.SERVE_WHILE_INDEXING:
+        logger.info("  Queries will be served from the indexed subset while indexing runs")
     
     logger.info("=" * 70)
-    logger.info("API ready for requests")
+    logger.info("API accepting requests")
     logger.info("=" * 70)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    watcher = getattr(app.state, "watcher", None)
+    if watcher is not None:
+        await watcher.stop()
+    indexing_task = getattr(app.state, "indexing_task", None)
+    if indexing_task is not None and not indexing_task.done():
+        indexing_task.cancel()
+    stats_task = getattr(app.state, "stats_task", None)
+    if stats_task is not None:
+        stats_task.cancel()
+    domain_task = getattr(app.state, "domain_task", None)
+    if domain_task is not None:
+        domain_task.cancel()
+    shutdown_process_pool()
+
+
 @app.get("/")
 def root():
     return {
@@ -87,43 +83,62 @@ def root():
         "docs": "/docs",
         "endpoints": {
             "ask_question": "POST /chat/ask",
-            "metrics": "GET /chat/metrics"
+            "metrics": "GET /chat/metrics",
+            "upload_document": "POST /documents",
+            "upload_status": "GET /documents/{job_id}/status",
+            "liveness": "GET /health/live",
+            "readiness": "GET /health/ready"
         }
     }
 
 
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def readiness():
+    state = indexing_state.to_dict()
+    if not state['accepting_queries']:
+        return JSONResponse(status_code=503, content={"status": "not_ready", "indexing": state})
+
+    response = {
+        "status": "ready" if state['ready'] else "ready_partial",
+        "indexing": state
+    }
+    watcher = getattr(app.state, "watcher", None)
+    if watcher is not None:
+        response["watcher"] = watcher.get_stats()
+    return response
+
+
 @app.get("/health")
 def health_check():
-    from database.connection import get_db
-    from models.document import Document
-    from models.chunk import Chunk
-    from sqlalchemy import text
-    
-    db = next(get_db())
+    indexing = indexing_state.to_dict()
+    if not indexing['accepting_queries']:
+        api = "not_ready"
+    else:
+        api = "ready" if indexing['ready'] else "ready_partial"
+
     try:
-        total_docs = db.query(Document).count()
-        processed_docs = db.query(Document).filter(Document.is_processed == True).count()
-        total_chunks = db.query(Chunk).count()
-        
-        chunks_with_embeddings_query = text("""
-            SELECT COUNT(*)
-            FROM chunks
-            WHERE embedding_vector IS NOT NULL
-        """)
-        chunks_with_embeddings = db.execute(chunks_with_embeddings_query).scalar() or 0
-        
+        stats = corpus_stats.get()
+    except Exception as e:
+        # Before the startup task has created the schema there is nothing to count yet.
+        logger.warning(f"Corpus stats unavailable: {str(e)}")
         return {
-            "status": "healthy",
-            "api": "ready",
-            "documents": {
-                "total": total_docs,
-                "processed": processed_docs,
-                "pending": total_docs - processed_docs
-            },
-            "chunks": {
-                "total": total_chunks,
-                "with_embeddings": chunks_with_embeddings
-            }
+            "status": "degraded",
+            "api": api,
+            "indexing": indexing,
+            "error": "Corpus statistics unavailable"
         }
-    finally:
-        db.close()
+
+    return {
+        "status": "healthy",
+        "api": api,
+        "indexing": indexing,
+        "documents": stats['documents'],
+        "chunks": stats['chunks'],
+        "vector_index": stats['vector_index'],
+        "snapshot": stats['snapshot']
+    }
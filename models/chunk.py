@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from database import Base
 
 class Chunk(Base):
@@ -23,6 +23,11 @@ class Chunk(Base):
 
     section_title = Column(String(500), nullable=True)
 
+    # Extractive answers: sentence offsets (JSON) and their float16 embeddings,
+    # see services/sentence_embeddings.py.
+    sentence_spans = deferred(Column(Text, nullable=True))
+    sentence_embeddings = deferred(Column(LargeBinary, nullable=True))
+
     document = relationship("Document", backref="chunks")
 
     def __repr__(self):
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Boolean
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from database import Base
 
@@ -13,7 +14,11 @@ class Document(Base):
     file_size = Column(Integer, nullable=False)
     file_path = Column(String(500), nullable=False)
 
-    content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)
+    file_mtime_ns = Column(BigInteger, nullable=True)
+
+    # Full extracted text is only needed for chunking; keep it out of every other SELECT.
+    content = deferred(Column(Text, nullable=False))
     content_preview = Column(String(500))
 
     num_pages = Column(Integer, nullable=True)
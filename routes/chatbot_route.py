@@ -1,30 +1,53 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional, Iterator, Tuple, Literal
+import json
 import time
+import asyncio
 
-from database.connection import get_db
-from services.guardrails_service import GuardrailsService
+from database.connection import SessionLocal
+from core.indexing import indexing_state
+from services.guardrails_service import GuardrailsService, verdict_cache
 from services.retrieval_service import RetrievalService
+from services.embedding_service import EmbeddingService
 from services.prompt_service import PromptService
 from services.llm_service import LLMService
 from services.observability_service import ObservabilityService
+from services.single_flight import SingleFlight
+from services.model_cascade import ModelCascade
+from services.openai_scheduler import openai_scheduler, INTERACTIVE
+from services.hedging import hedging_stats
+from services.extractive_service import ExtractiveService
+from services.domain_classifier import domain_classifier
+from core.deadline import Deadline, DeadlineExceeded
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("chatbot_route")
 
 router = APIRouter(prefix="/chat", tags=["chatbot"])
 
 observability = ObservabilityService()
+single_flight = SingleFlight(timeout=settings.COALESCE_TIMEOUT_SECONDS)
+cascade = ModelCascade()
 
 class ChatRequest(BaseModel):
 
     question: str
     top_k: Optional[int] = None
+    answer_mode: Literal["generate", "extractive"] = "generate"
+
+class ValidateRequest(BaseModel):
+
+    questions: List[str] = Field(..., min_length=1, max_length=1000)
 
 class Source(BaseModel):
 
     document: str
     excerpt: str
     similarity: float
+    chunk_indices: Optional[List[int]] = None
 
 class Metrics(BaseModel):
 
@@ -34,6 +57,12 @@ class Metrics(BaseModel):
     total_tokens: int
     cost: float
     chunks_retrieved: int
+    context_tokens: Optional[int] = None
+    context_budget: Optional[int] = None
+    model: Optional[str] = None
+    escalated: bool = False
+    degraded: bool = False
+    answer_mode: str = "generate"
 
 class ChatResponse(BaseModel):
 
@@ -41,21 +70,360 @@ class ChatResponse(BaseModel):
     citations: List[Source]
     metrics: Optional[Metrics] = None
 
+# Slack for the extractive fallback after the LLM stage times out at the deadline.
+DEADLINE_GRACE_SECONDS = 0.5
+
+NO_RESULTS_ANSWER = "I could not find relevant information in the available documents to answer your question. Please try reformulating or asking another question about the attached documents."
+
+def _build_citations(retrieval_results: List[Dict]) -> List[Source]:
+
+    seen_citations = set()
+    citations = []
+    for r in retrieval_results:
+        excerpt = r['content'][:500] + "..." if len(r['content']) > 500 else r['content']
+        citation_key = (r['document'].original_filename, excerpt[:100])
+
+        if citation_key not in seen_citations:
+            seen_citations.add(citation_key)
+            citations.append(
+                Source(
+                    document=r['document'].original_filename,
+                    excerpt=excerpt,
+                    similarity=r['similarity'],
+                    chunk_indices=r.get('chunk_indices')
+                )
+            )
+    return citations
+
+def _build_metrics(metrics_data) -> Metrics:
+
+    return Metrics(
+        total_latency=metrics_data.total_latency,
+        retrieval_latency=metrics_data.retrieval_latency,
+        llm_latency=metrics_data.llm_latency,
+        total_tokens=metrics_data.total_tokens,
+        cost=metrics_data.total_cost,
+        chunks_retrieved=metrics_data.chunks_retrieved,
+        context_tokens=metrics_data.context_tokens,
+        context_budget=metrics_data.context_budget or None,
+        model=metrics_data.llm_model or None,
+        escalated=metrics_data.escalated,
+        degraded=metrics_data.degraded,
+        answer_mode=metrics_data.answer_mode
+    )
+
+def _sse(event: str, data: Dict) -> str:
+
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _ensure_accepting_queries() -> None:
+
+    if not indexing_state.accepting_queries():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Document index is still being built. Please retry shortly."
+        )
+
+def _coalescing_key(question: str, top_k: Optional[int], answer_mode: str = "generate") -> Tuple:
+
+    normalized = " ".join(question.lower().split()).rstrip("?!. ")
+    return (normalized, top_k or settings.TOP_K_RESULTS, settings.LLM_MODEL, answer_mode)
+
+async def _embed_question(question: str) -> Dict:
+    """
+    Query embedding with its timing, so it can run speculatively. A question
+    the domain classifier has seen reuses the embedding cached with its verdict.
+    """
+    started = time.time()
+    embedding = domain_classifier.cached_embedding(question)
+    if embedding is None:
+        embedding = await EmbeddingService(None).generate_query_embedding_async(question)
+    return {'embedding': embedding, 'started': started, 'finished': time.time()}
+
+async def _extractive_response(
+    question: str,
+    query_embedding: Optional[List[float]],
+    retrieval_results: List[Dict],
+    intro: Optional[str] = None
+) -> Dict:
+    """
+    Answer built from the sources' best sentences, without an LLM call.
+    Loads the sentence embeddings with its own session in a worker thread.
+    """
+    start = time.time()
+
+    def extract() -> Dict:
+        db = SessionLocal()
+        try:
+            return ExtractiveService(db).answer(question, query_embedding, retrieval_results, intro)
+        finally:
+            db.close()
+
+    extracted = await asyncio.to_thread(extract)
+    return {
+        'answer': extracted['answer'],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        'cost': 0.0,
+        'latency': time.time() - start,
+        'model': 'extractive',
+        'finish_reason': 'stop',
+        'answer_mode': 'extractive',
+        'extraction': extracted['method']
+    }
+
+async def _degraded_response(
+    question: str,
+    query_embedding: Optional[List[float]],
+    retrieval_results: List[Dict],
+    llm_response: Optional[Dict]
+) -> Dict:
+    """
+    Extractive answer used when the deadline leaves no time for the LLM.
+    Keeps the usage and cost of any LLM attempt that was already paid for.
+    """
+    llm_response = llm_response or {}
+    extracted = await _extractive_response(
+        question, query_embedding, retrieval_results, intro=ExtractiveService.DEGRADED_INTRO
+    )
+    return {
+        **extracted,
+        'usage': llm_response.get('usage', extracted['usage']),
+        'cost': llm_response.get('cost', 0.0),
+        'latency': llm_response.get('latency', 0.0) + extracted['latency'],
+        'finish_reason': 'deadline',
+        'answer_mode': 'generate',
+        'degraded': True
+    }
+
+async def _retrieve(
+    question: str,
+    top_k: Optional[int],
+    embedding_task: Optional["asyncio.Future[Dict]"]
+) -> Tuple[Dict, List[float]]:
+    """
+    Retrieval data and the query embedding it used (kept for extractive answers).
+    The vector search runs with its own session in a worker thread: a deadline
+    cancels only the await, and the thread closes the session when it ends.
+    """
+    if embedding_task is not None:
+        query_embedding = (await embedding_task)['embedding']
+    else:
+        query_embedding = await EmbeddingService(None).generate_query_embedding_async(question)
+
+    def search() -> Dict:
+        db = SessionLocal()
+        try:
+            return RetrievalService(db).search_with_metadata(
+                query=question,
+                query_embedding=query_embedding,
+                top_k=top_k
+            )
+        finally:
+            db.close()
+
+    retrieval_data = await asyncio.to_thread(search)
+    return retrieval_data, query_embedding
+
+async def _compute_answer(
+    question: str,
+    top_k: Optional[int],
+    embedding_task: Optional["asyncio.Future[Dict]"] = None,
+    deadline: Optional[Deadline] = None,
+    answer_mode: str = "generate"
+) -> Dict:
+    """
+    Retrieval, prompt and completion for one question. Opens its own sessions
+    because coalesced callers may outlive the request that started it.
+    A speculative embedding_task, when given, replaces the embedding call.
+    answer_mode="extractive" answers from the sources' sentences instead of
+    the LLM.
+
+    Each stage gets the time left in `deadline`. Retrieval running out of
+    time raises DeadlineExceeded (there is nothing to answer from); the LLM
+    running out degrades to an extractive answer from the sources.
+
+    Without an embedding_task the caller skipped the embedding domain check
+    expecting to join an identical flight. When this runs, that flight
+    finished first or the wait timed out, so the check happens here. An
+    off-topic question returns {'rejection': verdict}.
+    """
+    deadline = deadline or Deadline(None)
+    if embedding_task is None and domain_classifier.enabled:
+        embedding_task = asyncio.ensure_future(_embed_question(question))
+        verdict = await _check_domain(question, embedding_task, {'is_valid': True}, deadline)
+        if not verdict['is_valid']:
+            return {'rejection': verdict}
+
+    start = time.time()
+    try:
+        retrieval_data, query_embedding = await asyncio.wait_for(
+            _retrieve(question, top_k, embedding_task),
+            deadline.remaining()
+        )
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("retrieval")
+    retrieval_latency = time.time() - start
+
+    llm_response = None
+    packing = None
+    # The sources the answer's [Source N] markers refer to: the packed
+    # prompt order for LLM answers, retrieval order for extractive ones.
+    sources = retrieval_data['results']
+    if retrieval_data['results'] and answer_mode == "extractive":
+        llm_response = await _extractive_response(question, query_embedding, retrieval_data['results'])
+    elif retrieval_data['results']:
+        prompt_service = PromptService()
+        prompt = prompt_service.build_prompt(
+            question=question,
+            retrieval_results=retrieval_data['results']
+        )
+        packing = prompt['packing']
+        sources = prompt['sources']
+
+        if deadline.allows(settings.DEADLINE_MIN_LLM_SECONDS):
+            llm_response = await cascade.generate(prompt['messages'], sources, deadline)
+        if llm_response is None or llm_response.get('timed_out'):
+            llm_response = await _degraded_response(
+                question, query_embedding, retrieval_data['results'], llm_response
+            )
+            sources = retrieval_data['results']
+
+    return {
+        'retrieval_data': retrieval_data,
+        'retrieval_latency': retrieval_latency,
+        'packing': packing,
+        'sources': sources,
+        'llm_response': llm_response
+    }
+
+async def _answer_coalesced(
+    question: str,
+    top_k: Optional[int],
+    embedding_task: Optional["asyncio.Future[Dict]"] = None,
+    deadline: Optional[Deadline] = None,
+    answer_mode: str = "generate"
+) -> Tuple[Dict, bool]:
+    """
+    (answer, coalesced). The flight runs on its leader's deadline: a follower
+    with a shorter one stops waiting at its own (see _answer_within), one with
+    a longer one gets the leader's answer, degraded if the leader ran out.
+    """
+    if not settings.COALESCE_REQUESTS:
+        return await _compute_answer(question, top_k, embedding_task, deadline, answer_mode), False
+
+    return await single_flight.do(
+        _coalescing_key(question, top_k, answer_mode),
+        lambda: _compute_answer(question, top_k, embedding_task, deadline, answer_mode)
+    )
+
+async def _answer_within(
+    question: str,
+    top_k: Optional[int],
+    embedding_task: Optional["asyncio.Future[Dict]"],
+    deadline: Deadline,
+    answer_mode: str = "generate"
+) -> Tuple[Dict, bool]:
+    """
+    _answer_coalesced bounded by this request's deadline. A follower may have
+    a shorter deadline than the leader computing for it, so the wait itself
+    is capped; the computation keeps running for the other callers.
+    """
+    remaining = deadline.remaining()
+    if remaining is None:
+        return await _answer_coalesced(question, top_k, embedding_task, deadline, answer_mode)
+    try:
+        return await asyncio.wait_for(
+            _answer_coalesced(question, top_k, embedding_task, deadline, answer_mode),
+            remaining + DEADLINE_GRACE_SECONDS
+        )
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("answer")
+
+def _start_embedding(
+    question: str,
+    top_k: Optional[int],
+    answer_mode: str = "generate"
+) -> Optional["asyncio.Future[Dict]"]:
+    """
+    Start the query embedding as a task. Skipped when the question would
+    join an in-flight identical one, whose leader already has its embedding
+    (and passed the domain check); if it ends up not joining, _compute_answer
+    runs the check itself.
+    """
+    if settings.COALESCE_REQUESTS and single_flight.joinable(_coalescing_key(question, top_k, answer_mode)):
+        return None
+    return asyncio.ensure_future(_embed_question(question))
+
+def _start_speculation(
+    question: str,
+    top_k: Optional[int],
+    answer_mode: str = "generate"
+) -> Optional["asyncio.Future[Dict]"]:
+    """Start the query embedding before the guardrails verdict."""
+    if not settings.SPECULATIVE_EMBEDDING:
+        return None
+    return _start_embedding(question, top_k, answer_mode)
+
+async def _check_domain(
+    question: str,
+    embedding_task: Optional["asyncio.Future[Dict]"],
+    validation: Dict,
+    deadline: Deadline
+) -> Dict:
+    """
+    Embedding-based domain verdict (DOMAIN_CHECK=embedding), on the same
+    embedding retrieval will use. Without an embedding task the question
+    is expected to join an in-flight identical one, which already passed;
+    _compute_answer checks it when it does not.
+    """
+    if embedding_task is None:
+        return validation
+    try:
+        embedded = await asyncio.wait_for(embedding_task, deadline.remaining())
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("domain")
+
+    domain = await asyncio.to_thread(domain_classifier.classify, question, embedded['embedding'])
+    if not domain['in_domain']:
+        return GuardrailsService.out_of_domain_result(domain)
+    return {**validation, 'domain': domain}
+
 @router.post("/ask", response_model=ChatResponse, status_code=status.HTTP_200_OK)
 async def ask_question(
     request: ChatRequest,
-    db: Session = Depends(get_db)
+    x_request_timeout: Optional[float] = Header(None, gt=0)
 ):
 
+    _ensure_accepting_queries()
+
+    deadline = Deadline.for_request(x_request_timeout)
     tracking_context = observability.start_query(request.question)
 
+    embedding_task = None
     try:
         start = time.time()
         guardrails = GuardrailsService()
-        validation = guardrails.validate_query(request.question)
-        observability.record_stage(tracking_context, 'guardrails', time.time() - start)
+
+        # Guardrails are CPU-only and rarely reject, so the embedding call is
+        # started alongside them (they run in a thread to leave the loop free
+        # to send it) and cancelled if the question is rejected.
+        check_domain = not domain_classifier.enabled
+        embedding_task = _start_speculation(request.question, request.top_k, request.answer_mode)
+        if embedding_task is not None:
+            validation = await asyncio.to_thread(guardrails.validate_query, request.question, check_domain=check_domain)
+        else:
+            validation = guardrails.validate_query(request.question, check_domain=check_domain)
+        guardrails_done = time.time()
+        observability.record_stage(tracking_context, 'guardrails', guardrails_done - start)
+
+        if validation['is_valid'] and not check_domain:
+            embedding_task = embedding_task or _start_embedding(request.question, request.top_k, request.answer_mode)
+            validation = await _check_domain(request.question, embedding_task, validation, deadline)
 
         if not validation['is_valid']:
+            if embedding_task is not None and 'domain' not in validation:
+                embedding_task.cancel()
+                observability.record_speculation(tracking_context, guardrails_done)
             guardrails.log_violation(
                 request.question,
                 validation['violations'],
@@ -68,17 +436,27 @@ async def ask_question(
                 metrics=None
             )
 
-        start = time.time()
-        retrieval_service = RetrievalService(db)
-        retrieval_data = retrieval_service.retrieve_with_metadata(
-            query=request.question,
-            top_k=request.top_k
+        shared, coalesced = await _answer_within(
+            request.question, request.top_k, embedding_task, deadline, request.answer_mode
         )
-        retrieval_latency = time.time() - start
+
+        if shared.get('rejection'):
+            validation = shared['rejection']
+            guardrails.log_violation(request.question, validation['violations'], validation['severity'])
+            return ChatResponse(answer=validation['message'], citations=[], metrics=None)
+
+        if embedding_task is not None:
+            if not embedding_task.done():
+                # Joined a flight that started meanwhile; its leader embedded.
+                embedding_task.cancel()
+            elif not embedding_task.cancelled() and embedding_task.exception() is None and not coalesced:
+                observability.record_speculation(tracking_context, guardrails_done, embedding_task.result())
+
+        retrieval_data = shared['retrieval_data']
         observability.record_stage(
             tracking_context,
             'retrieval',
-            retrieval_latency,
+            shared['retrieval_latency'],
             metadata=retrieval_data
         )
 
@@ -86,19 +464,22 @@ async def ask_question(
 
         if not retrieval_results:
             return ChatResponse(
-                answer="I could not find relevant information in the available documents to answer your question. Please try reformulating or asking another question about the attached documents.",
+                answer=NO_RESULTS_ANSWER,
                 citations=[],
                 metrics=None
             )
 
-        prompt_service = PromptService()
-        messages = prompt_service.create_conversation_prompt(
-            question=request.question,
-            retrieval_results=retrieval_results
-        )
+        observability.record_stage(tracking_context, 'prompt', 0.0, metadata=shared['packing'])
 
-        llm_service = LLMService()
-        llm_response = llm_service.generate_response(messages)
+        llm_response = shared['llm_response']
+        if coalesced:
+            # The leader paid for this completion; don't count its tokens twice.
+            llm_response = {
+                **llm_response,
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                'cost': 0.0,
+                'coalesced': True
+            }
 
         metrics_data = observability.finish_query(
             context=tracking_context,
@@ -110,30 +491,8 @@ async def ask_question(
 
         sanitized_answer = guardrails.sanitize_response(llm_response['answer'])
 
-        seen_citations = set()
-        citations = []
-        for r in retrieval_results:
-            excerpt = r['content'][:500] + "..." if len(r['content']) > 500 else r['content']
-            citation_key = (r['document'].original_filename, excerpt[:100])
-            
-            if citation_key not in seen_citations:
-                seen_citations.add(citation_key)
-                citations.append(
-                    Source(
-                        document=r['document'].original_filename,
-                        excerpt=excerpt,
-                        similarity=r['similarity']
-                    )
-                )
-
-        metrics = Metrics(
-            total_latency=metrics_data.total_latency,
-            retrieval_latency=metrics_data.retrieval_latency,
-            llm_latency=metrics_data.llm_latency,
-            total_tokens=metrics_data.total_tokens,
-            cost=metrics_data.total_cost,
-            chunks_retrieved=metrics_data.chunks_retrieved
-        )
+        citations = _build_citations(shared['sources'])
+        metrics = _build_metrics(metrics_data)
 
         return ChatResponse(
             answer=sanitized_answer,
@@ -141,7 +500,18 @@ async def ask_question(
             metrics=metrics
         )
 
+    except DeadlineExceeded as e:
+        if embedding_task is not None and not embedding_task.done():
+            embedding_task.cancel()
+        observability.record_deadline_exceeded(e.stage)
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+
     except Exception as e:
+        if embedding_task is not None and not embedding_task.done():
+            embedding_task.cancel()
         print(f"Erro no pipeline: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -151,13 +521,212 @@ async def ask_question(
             detail=f"Internal error processing question: {str(e)}"
         )
 
+@router.post("/ask/stream")
+def ask_question_stream(request: ChatRequest):
+    """
+    Server-sent events version of /ask. Emits `citations` as soon as
+    retrieval finishes, `token` events as the answer is generated (sanitized
+    incrementally), then `metrics` and `done`. Errors after the stream has
+    started are reported as an `error` event.
+
+    The generator opens its own session: it outlives the request handler.
+    """
+    _ensure_accepting_queries()
+
+    if request.answer_mode != "generate":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Extractive answers are not streamed; use /chat/ask."
+        )
+
+    return StreamingResponse(
+        _stream_answer(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _stream_answer(request: ChatRequest) -> Iterator[str]:
+
+    tracking_context = observability.start_query(request.question)
+    db = SessionLocal()
+
+    try:
+        start = time.time()
+        guardrails = GuardrailsService()
+        validation = guardrails.validate_query(request.question, check_domain=not domain_classifier.enabled)
+        observability.record_stage(tracking_context, 'guardrails', time.time() - start)
+
+        start = time.time()
+        retrieval_service = RetrievalService(db)
+        query_embedding = None
+        if validation['is_valid'] and domain_classifier.enabled:
+            query_embedding = (
+                domain_classifier.cached_embedding(request.question)
+                or retrieval_service.embedding_service.generate_query_embedding(request.question)
+            )
+            domain = domain_classifier.classify(request.question, query_embedding)
+            if not domain['in_domain']:
+                validation = guardrails.out_of_domain_result(domain)
+
+        if not validation['is_valid']:
+            guardrails.log_violation(
+                request.question,
+                validation['violations'],
+                validation['severity']
+            )
+            yield _sse("citations", {"citations": []})
+            yield _sse("token", {"content": validation['message']})
+            yield _sse("done", {})
+            return
+
+        if query_embedding is not None:
+            retrieval_data = retrieval_service.search_with_metadata(
+                query=request.question,
+                query_embedding=query_embedding,
+                top_k=request.top_k
+            )
+        else:
+            retrieval_data = retrieval_service.retrieve_with_metadata(
+                query=request.question,
+                top_k=request.top_k
+            )
+        observability.record_stage(
+            tracking_context,
+            'retrieval',
+            time.time() - start,
+            metadata=retrieval_data
+        )
+
+        retrieval_results = retrieval_data['results']
+        if not retrieval_results:
+            yield _sse("citations", {"citations": []})
+            yield _sse("token", {"content": NO_RESULTS_ANSWER})
+            yield _sse("done", {})
+            return
+
+        start = time.time()
+        prompt_service = PromptService()
+        prompt = prompt_service.build_prompt(
+            question=request.question,
+            retrieval_results=retrieval_results
+        )
+        observability.record_stage(tracking_context, 'prompt', time.time() - start, metadata=prompt['packing'])
+
+        citations = _build_citations(prompt['sources'])
+        yield _sse("citations", {"citations": [c.model_dump() for c in citations]})
+
+        llm_service = LLMService()
+        llm_response: Dict = {}
+
+        def deltas() -> Iterator[str]:
+            for event in llm_service.generate_response_events(prompt['messages']):
+                if event['type'] == 'token':
+                    yield event['content']
+                else:
+                    llm_response.update(event)
+
+        for text in guardrails.sanitize_stream(deltas()):
+            observability.record_first_token(tracking_context)
+            yield _sse("token", {"content": text})
+
+        if llm_response.get('error'):
+            yield _sse("error", {"detail": f"Error generating response: {llm_response['error']}"})
+
+        metrics_data = observability.finish_query(
+            context=tracking_context,
+            answer=llm_response.get('answer', ''),
+            retrieval_results=retrieval_results,
+            llm_response=llm_response,
+            guardrails_result=validation
+        )
+
+        yield _sse("metrics", {
+            **_build_metrics(metrics_data).model_dump(),
+            "time_to_first_token": metrics_data.time_to_first_token,
+            "usage": llm_response.get('usage', {})
+        })
+        yield _sse("done", {})
+
+    except Exception as e:
+        logger.error(f"Streaming pipeline failed: {str(e)}", exc_info=True)
+
+        yield _sse("error", {"detail": f"Internal error processing question: {str(e)}"})
+    finally:
+        db.close()
+
 @router.get("/metrics")
 async def get_metrics(last_n: Optional[int] = None):
 
     stats = observability.get_statistics(last_n=last_n)
     return {
         "success": True,
-        "statistics": stats
+        "statistics": stats,
+        "coalescing": single_flight.get_stats(),
+        "cascade": cascade.get_stats(),
+        "openai_quota": openai_scheduler.get_stats(),
+        "hedging": hedging_stats(),
+        "domain": domain_classifier.get_stats(),
+        "guardrails_cache": verdict_cache.get_stats()
+    }
+
+async def _classify_batch(questions: List[str], verdicts: List[Dict]) -> List[Dict]:
+    """
+    The embedding domain check of /chat/ask for each question that passed
+    the rules. Questions without a cached embedding are embedded in one call.
+    """
+    passed = [i for i, verdict in enumerate(verdicts) if verdict['is_valid']]
+    embeddings = {i: domain_classifier.cached_embedding(questions[i]) for i in passed}
+
+    missing = list(dict.fromkeys(questions[i] for i in passed if embeddings[i] is None))
+    if missing:
+        vectors = dict(zip(missing, await EmbeddingService(None).generate_embeddings_batch_async(missing, INTERACTIVE)))
+        for i in passed:
+            if embeddings[i] is None:
+                embeddings[i] = vectors[questions[i]]
+
+    def classify() -> Dict[int, Dict]:
+        return {i: domain_classifier.classify(questions[i], embeddings[i]) for i in passed}
+
+    domains = await asyncio.to_thread(classify)
+    classified = list(verdicts)
+    for i, domain in domains.items():
+        if domain['in_domain']:
+            classified[i] = {**verdicts[i], 'domain': domain}
+        else:
+            classified[i] = GuardrailsService.out_of_domain_result(domain)
+    return classified
+
+@router.post("/validate")
+async def validate_questions(request: ValidateRequest):
+    """
+    Guardrail verdicts for a list of questions, e.g. an evaluation set,
+    without retrieval or generation. The rules run in one validate_batch
+    pass; the domain check is the one /chat/ask uses, and each result
+    reports it in domain_check ('embedding' or 'keywords') with the
+    classifier's scores in domain.
+    """
+    verdicts = await asyncio.to_thread(
+        GuardrailsService().validate_batch, request.questions, check_domain=not domain_classifier.enabled
+    )
+    if domain_classifier.enabled:
+        verdicts = await _classify_batch(request.questions, verdicts)
+
+    return {
+        "results": [
+            {
+                "question": question,
+                "is_valid": verdict['is_valid'],
+                "violations": verdict['violations'],
+                "severity": verdict['severity'],
+                "message": verdict['message'],
+                "domain_check": verdict['domain']['method'] if 'domain' in verdict else (
+                    None if domain_classifier.enabled else "keywords"
+                ),
+                "domain": verdict.get('domain')
+            }
+            for question, verdict in zip(request.questions, verdicts)
+        ],
+        "guardrails_cache": verdict_cache.get_stats()
     }
 
 @router.get("/metrics/recent")
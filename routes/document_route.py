@@ -0,0 +1,144 @@
+from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import List, Dict, Optional
+from pathlib import Path
+import uuid
+
+from core.config import settings
+from core.logging_config import get_logger
+from core.pipeline import process_uploaded_document
+from services.job_service import JobService
+
+router = APIRouter(prefix="/documents", tags=["documents"])
+
+logger = get_logger("document_route")
+
+jobs = JobService()
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+class UploadResponse(BaseModel):
+
+    job_id: str
+    filename: str
+    file_size: int
+    status: str
+    status_url: str
+
+class JobStatusResponse(BaseModel):
+
+    job_id: str
+    filename: str
+    file_size: int
+    status: str
+    progress: float
+    is_finished: bool
+    stages: Dict[str, str]
+    document_id: Optional[int] = None
+    chunks_count: int = 0
+    embeddings_count: int = 0
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+async def _stream_to_disk(upload: UploadFile, destination: Path) -> int:
+    """
+    Copy the upload to disk in fixed-size chunks, writing from the threadpool,
+    and stop as soon as MAX_FILE_SIZE is exceeded.
+    """
+    written = 0
+    out = await run_in_threadpool(open, destination, 'wb')
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            written += len(chunk)
+            if written > settings.MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File too large. Maximum: {settings.MAX_FILE_SIZE} bytes"
+                )
+
+            await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        await run_in_threadpool(out.close)
+        destination.unlink(missing_ok=True)
+        raise
+
+    await run_in_threadpool(out.close)
+    return written
+
+async def _run_ingestion_job(job_id: str, file_path: Path, original_filename: str) -> None:
+
+    try:
+        result = await process_uploaded_document(
+            file_path,
+            original_filename,
+            progress_callback=lambda _filename, stage: jobs.update_stage(job_id, stage)
+        )
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+
+    if result.get("success"):
+        jobs.update_stage(
+            job_id,
+            "completed",
+            document_id=result.get("document_id"),
+            chunks_count=result.get("chunks_count", 0),
+            embeddings_count=result.get("embeddings_count", 0)
+        )
+    else:
+        logger.error(f"Ingestion job {job_id} failed: {result.get('error')}")
+        jobs.update_stage(job_id, "failed", error=result.get("error", "Unknown error"))
+        file_path.unlink(missing_ok=True)
+
+@router.post("", response_model=UploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_document(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...)
+):
+
+    original_filename = Path(file.filename or "").name
+    file_ext = Path(original_filename).suffix.lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed: {settings.ALLOWED_EXTENSIONS}"
+        )
+
+    destination = settings.UPLOAD_DIR_PATH / f"{uuid.uuid4()}{file_ext}"
+    try:
+        file_size = await _stream_to_disk(file, destination)
+    finally:
+        await file.close()
+
+    if file_size == 0:
+        destination.unlink(missing_ok=True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty file")
+
+    job = jobs.create_job(original_filename, file_size)
+    background_tasks.add_task(_run_ingestion_job, job.job_id, destination, original_filename)
+
+    return UploadResponse(
+        job_id=job.job_id,
+        filename=original_filename,
+        file_size=file_size,
+        status=job.status,
+        status_url=f"{router.prefix}/{job.job_id}/status"
+    )
+
+@router.get("/jobs", response_model=List[JobStatusResponse])
+async def list_jobs(n: int = 20):
+
+    return jobs.list_jobs(n=n)
+
+@router.get("/{job_id}/status", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+
+    job_status = jobs.get_status(job_id)
+    if job_status is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job_status
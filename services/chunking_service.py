@@ -1,9 +1,11 @@
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
 from sqlalchemy.orm import Session
 
 from models.document import Document
 from models.chunk import Chunk
+from services.corpus_stats import corpus_stats
+from services.token_counter import count_tokens
 from core.config import settings
 
 class ChunkingService:
@@ -33,6 +35,15 @@ class ChunkingService:
             logger.warning(f"No chunks created for document {document.id}")
             return []
 
+        chunks = self.save_chunks(document, chunks_data)
+        logger.debug(f"Saved {len(chunks)} chunks to database")
+
+        return chunks
+
+    def save_chunks(self, document: Document, chunks_data: List[str]) -> List[Chunk]:
+        """
+        Persist pre-split chunk texts for a document, linking neighbours.
+        """
         chunks = []
         previous_chunk = None
 
@@ -57,11 +68,11 @@ class ChunkingService:
             previous_chunk = chunk
 
         self.db.commit()
-        logger.debug(f"Saved {len(chunks)} chunks to database")
 
         setattr(document, "is_processed", False)
         setattr(document, "processing_status", "chunked")
         self.db.commit()
+        corpus_stats.mark_dirty()
 
         return chunks
 
@@ -69,50 +80,14 @@ class ChunkingService:
         """
         Create chunks with overlap, trying to break at paragraph or line boundaries.
         """
-        chunks = []
-        start = 0
-        text_length = len(text)
-
-        while start < text_length:
-            end = start + self.chunk_size
-
-            if end < text_length:
-                search_start = max(end - 100, start)
-                search_end = min(end + 100, text_length)
-
-                paragraph_break = text.find('\n\n', search_start, search_end)
-
-                if paragraph_break != -1 and paragraph_break > start:
-                    end = paragraph_break + 2
-                else:
-                    line_break = text.find('\n', max(end - 50, start), min(end + 50, text_length))
-                    if line_break != -1 and line_break > start:
-                        end = line_break + 1
-            else:
-                end = text_length
-
-            chunk_text = text[start:end].strip()
-
-            if chunk_text:
-                chunks.append(chunk_text)
-
-            new_start = end - self.chunk_overlap
-            
-            if new_start <= start:
-                new_start = start + 1
-            
-            if new_start >= text_length:
-                break
-                
-            start = new_start
-
-        return chunks
+        return split_text(text, self.chunk_size, self.chunk_overlap)
 
     def _estimate_tokens(self, text: str) -> int:
 
-        return len(text) // 4
+        return count_tokens(text)
 
-    def _extract_section_title(self, text: str) -> Optional[str]:
+    @staticmethod
+    def _extract_section_title(text: str) -> Optional[str]:
         lines = text.split('\n')
         for line in lines[:3]:
             if line.strip().startswith('#'):
@@ -184,4 +159,111 @@ class ChunkingService:
             'overlap_configured': self.chunk_overlap
         }
 
+
+SPLIT_LOOKAHEAD = 100
+
+
+def _next_chunk(
+    text: str,
+    start: int,
+    chunk_size: int,
+    chunk_overlap: int
+) -> Tuple[str, Optional[int]]:
+    """
+    One step of the splitter: the chunk starting at `start` and the next start
+    position (None when the text is exhausted). Never looks further than
+    start + chunk_size + SPLIT_LOOKAHEAD.
+    """
+    text_length = len(text)
+    end = start + chunk_size
+
+    if end < text_length:
+        search_start = max(end - SPLIT_LOOKAHEAD, start)
+        search_end = min(end + SPLIT_LOOKAHEAD, text_length)
+
+        paragraph_break = text.find('\n\n', search_start, search_end)
+
+        if paragraph_break != -1 and paragraph_break > start:
+            end = paragraph_break + 2
+        else:
+            line_break = text.find('\n', max(end - 50, start), min(end + 50, text_length))
+            if line_break != -1 and line_break > start:
+                end = line_break + 1
+    else:
+        end = text_length
+
+    chunk_text = text[start:end].strip()
+
+    new_start = end - chunk_overlap
+
+    if new_start <= start:
+        new_start = start + 1
+
+    if new_start >= text_length:
+        return chunk_text, None
+
+    return chunk_text, new_start
+
+
+def split_text_stream(
+    parts: Iterable[str],
+    chunk_size: int,
+    chunk_overlap: int
+) -> Iterator[str]:
+    """
+    Incremental split_text: consumes text parts (e.g. PDF pages) as they arrive
+    and yields each chunk as soon as enough lookahead is buffered. Produces
+    exactly the chunks split_text would for the concatenated parts, while only
+    holding the unconsumed tail in memory.
+    """
+    buffer = ""
+    for part in parts:
+        buffer += part
+        start: Optional[int] = 0
+        while start is not None and start + chunk_size + SPLIT_LOOKAHEAD <= len(buffer):
+            chunk_text, start = _next_chunk(buffer, start, chunk_size, chunk_overlap)
+            if chunk_text:
+                yield chunk_text
+        buffer = buffer[start:] if start is not None else ""
+
+    start = 0
+    while start is not None and start < len(buffer):
+        chunk_text, start = _next_chunk(buffer, start, chunk_size, chunk_overlap)
+        if chunk_text:
+            yield chunk_text
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Split text into overlapping chunks, preferring paragraph or line boundaries.
+    Module-level (no session needed) so it can run inside worker processes.
+    """
+    return list(split_text_stream([text], chunk_size, chunk_overlap))
+
+
+MIN_STITCH_OVERLAP = 8
+
+
+def stitch_chunks(texts: List[str], chunk_overlap: int) -> str:
+    """
+    Inverse of split_text for consecutive chunks: joins them dropping the
+    text each chunk repeats from the previous one. The splitter strips chunk
+    edges, so the repeated part is the longest suffix of the previous chunk
+    that prefixes the next one (at most ~chunk_overlap chars). Chunks with no
+    detectable overlap are joined with a blank line.
+    """
+    if not texts:
+        return ""
+
+    stitched = texts[0]
+    for text in texts[1:]:
+        limit = min(len(stitched), len(text), chunk_overlap * 2)
+        for size in range(limit, min(MIN_STITCH_OVERLAP, len(text)) - 1, -1):
+            if stitched.endswith(text[:size]):
+                stitched += text[size:]
+                break
+        else:
+            stitched += "\n\n" + text
+    return stitched
+
 from sqlalchemy import func
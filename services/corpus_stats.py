@@ -0,0 +1,182 @@
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from database.connection import SessionLocal
+from models.document import Document
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("corpus_stats")
+
+FILE_TYPES = ['pdf', 'docx', 'txt', 'md']
+STATUSES = ['uploaded', 'processing', 'chunked', 'completed', 'failed']
+
+
+def count_documents(db: Session) -> Dict:
+    """One grouped scan over documents: totals, size, and counts by type/status."""
+    rows = db.query(
+        Document.file_type,
+        Document.processing_status,
+        Document.is_processed,
+        func.count(Document.id),
+        func.coalesce(func.sum(Document.file_size), 0)
+    ).group_by(
+        Document.file_type,
+        Document.processing_status,
+        Document.is_processed
+    ).all()
+
+    by_type = {file_type: 0 for file_type in FILE_TYPES}
+    by_status = {status: 0 for status in STATUSES}
+    total = processed = total_size = 0
+
+    for file_type, status, is_processed, count, size in rows:
+        total += count
+        total_size += int(size)
+        if is_processed:
+            processed += count
+        by_type[file_type] = by_type.get(file_type, 0) + count
+        by_status[status] = by_status.get(status, 0) + count
+
+    return {
+        'total': total,
+        'processed': processed,
+        'pending': total - processed,
+        'total_size_mb': round(total_size / (1024 * 1024), 2),
+        'by_type': by_type,
+        'by_status': by_status
+    }
+
+
+def count_chunks(db: Session) -> Dict:
+    """One scan over chunks for both embedding columns."""
+    row = db.execute(text("""
+        SELECT
+            COUNT(*),
+            COUNT(embedding),
+            COUNT(embedding_vector),
+            COUNT(DISTINCT document_id) FILTER (WHERE embedding_vector IS NOT NULL)
+        FROM chunks
+    """)).one()
+
+    total, with_embedding, with_vector, documents_indexed = (int(v or 0) for v in row)
+    return {
+        'total': total,
+        'with_embeddings': with_vector,
+        'with_json_embedding': with_embedding,
+        'pending': total - with_vector,
+        'completion_rate': round((with_vector / total * 100) if total > 0 else 0, 2),
+        'documents_indexed': documents_indexed
+    }
+
+
+def vector_index_state(db: Session) -> Dict:
+
+    row = db.execute(text("""
+        SELECT indexname, indexdef
+        FROM pg_indexes
+        WHERE tablename = 'chunks' AND indexname = 'chunks_embedding_vector_idx'
+    """)).first()
+
+    return {
+        'exists': row is not None,
+        'name': row[0] if row else None,
+        'definition': row[1] if row else None
+    }
+
+
+class CorpusStatsSnapshot:
+    """
+    In-memory corpus statistics served to /health and dashboards.
+
+    Writers (ingestion, chunking, embedding, deletes) call mark_dirty(); a
+    background loop recomputes the snapshot with three queries at most once
+    per STATS_REFRESH_SECONDS while dirty, and every STATS_MAX_AGE_SECONDS
+    regardless to pick up out-of-process writes such as the bulk importer.
+    Reads never touch the database once the first snapshot exists.
+    """
+
+    def __init__(self, refresh_seconds: Optional[float] = None, max_age_seconds: Optional[float] = None):
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else settings.STATS_REFRESH_SECONDS
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else settings.STATS_MAX_AGE_SECONDS
+        self._snapshot: Optional[Dict] = None
+        self._computed_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+
+    def is_stale(self) -> bool:
+        age = time.monotonic() - self._computed_at
+        if self._snapshot is None or age >= self.max_age_seconds:
+            return True
+        return self._dirty and age >= self.refresh_seconds
+
+    def compute(self, db: Session) -> Dict:
+
+        return {
+            'documents': count_documents(db),
+            'chunks': count_chunks(db),
+            'vector_index': vector_index_state(db)
+        }
+
+    def refresh(self) -> Dict:
+
+        with self._refresh_lock:
+            # Cleared before computing so writes landing mid-query mark it again.
+            self._dirty = False
+            db = SessionLocal()
+            try:
+                snapshot = self.compute(db)
+            except Exception:
+                self._dirty = True
+                raise
+            finally:
+                db.close()
+
+            with self._lock:
+                self._snapshot = snapshot
+                self._computed_at = time.monotonic()
+                self.refreshes += 1
+            return snapshot
+
+    def get(self) -> Dict:
+        """Current snapshot plus its age; computes inline only on first use."""
+        with self._lock:
+            snapshot = self._snapshot
+            computed_at = self._computed_at
+
+        if snapshot is None:
+            snapshot = self.refresh()
+            computed_at = self._computed_at
+
+        return {
+            **snapshot,
+            'snapshot': {
+                'age_seconds': round(time.monotonic() - computed_at, 2),
+                'dirty': self._dirty,
+                'refreshes': self.refreshes
+            }
+        }
+
+    async def run(self) -> None:
+        """Background refresh loop; started at application startup."""
+        tick = max(min(self.refresh_seconds, self.max_age_seconds) / 2, 0.5)
+        while True:
+            if self.is_stale():
+                try:
+                    await asyncio.to_thread(self.refresh)
+                except Exception as e:
+                    logger.warning(f"Corpus stats refresh failed: {str(e)}")
+                    await asyncio.sleep(self.refresh_seconds)
+            await asyncio.sleep(tick)
+
+
+corpus_stats = CorpusStatsSnapshot()
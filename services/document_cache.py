@@ -0,0 +1,100 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+from sqlalchemy.orm import Session, load_only
+
+from models.document import Document
+
+@dataclass(frozen=True)
+class DocumentInfo:
+    """
+    The document fields read at query time. Exposes the same attribute names as
+    Document so citation and prompt code can take either.
+    """
+
+    id: int
+    filename: str
+    original_filename: str
+    file_type: str
+    language: Optional[str]
+
+class DocumentMetadataCache:
+    """
+    In-process id -> DocumentInfo cache for the query path.
+
+    Documents are immutable once indexed except for renames, so entries only
+    need invalidating when a document is renamed, re-ingested or deleted; the
+    ingestion code does that. Misses are filled with one IN query restricted
+    to the small metadata columns.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: Dict[int, DocumentInfo] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, db: Session, document_ids: Iterable[int]) -> Dict[int, DocumentInfo]:
+
+        wanted = set(document_ids)
+        with self._lock:
+            found = {i: self._entries[i] for i in wanted if i in self._entries}
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+
+        missing = wanted - found.keys()
+        if not missing:
+            return found
+
+        rows = db.query(Document).options(load_only(
+            Document.id,
+            Document.filename,
+            Document.original_filename,
+            Document.file_type,
+            Document.language
+        )).filter(Document.id.in_(missing)).all()
+
+        loaded = {
+            int(row.id): DocumentInfo(
+                id=int(row.id),
+                filename=str(row.filename),
+                original_filename=str(row.original_filename),
+                file_type=str(row.file_type),
+                language=row.language
+            )
+            for row in rows
+        }
+
+        with self._lock:
+            if len(self._entries) + len(loaded) > self.max_entries:
+                self._entries.clear()
+            self._entries.update(loaded)
+
+        found.update(loaded)
+        return found
+
+    def get(self, db: Session, document_id: int) -> Optional[DocumentInfo]:
+
+        return self.get_many(db, [document_id]).get(document_id)
+
+    def invalidate(self, document_id: Optional[int] = None) -> None:
+
+        with self._lock:
+            if document_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(document_id, None)
+
+    def get_stats(self) -> Dict:
+
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 2) if total else 0.0
+            }
+
+document_cache = DocumentMetadataCache()
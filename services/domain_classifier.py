@@ -0,0 +1,295 @@
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import text
+
+from database.connection import SessionLocal
+from services.corpus_stats import corpus_stats
+from services.embedding_service import EmbeddingService
+from services.guardrails_service import GuardrailsService
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("domain_classifier")
+
+# Keyword check used until the corpus centroids are built.
+_keyword_guardrails = GuardrailsService()
+
+# Known off-topic questions, grouped by topic; each topic becomes one centroid.
+OFF_TOPIC_EXAMPLES = {
+    'culinária': [
+        "Qual é a receita de bolo de chocolate?",
+        "Como fazer pão caseiro?",
+        "How long should I boil an egg?"
+    ],
+    'esportes': [
+        "Quem ganhou a copa do mundo de futebol de 2002?",
+        "Qual o melhor time do campeonato brasileiro?",
+        "Who won the NBA finals last season?"
+    ],
+    'clima': [
+        "Vai chover amanhã em São Paulo?",
+        "What is the weather like in Paris tomorrow?"
+    ],
+    'geografia e história': [
+        "Qual é a capital da França?",
+        "Quem descobriu o Brasil?",
+        "When did the Second World War end?"
+    ],
+    'entretenimento': [
+        "Qual é o enredo do filme Titanic?",
+        "Recommend me a good TV series to watch",
+        "Quem canta essa música que está tocando no rádio?"
+    ],
+    'saúde': [
+        "Qual remédio devo tomar para dor de cabeça?",
+        "How many calories should I eat per day?"
+    ],
+    'finanças': [
+        "Vale a pena investir em bitcoin agora?",
+        "How do I file my income taxes?"
+    ],
+    'viagem': [
+        "Quais os melhores hotéis em Lisboa?",
+        "What should I pack for a trip to Japan?"
+    ]
+}
+
+KMEANS_ITERATIONS = 10
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS) -> np.ndarray:
+    """k unit-norm centroids of unit-norm rows (cosine k-means)."""
+    if len(vectors) <= k:
+        return vectors
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)]
+    for _ in range(iterations):
+        assignment = (vectors @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=k)
+        # Empty clusters keep their previous centroid.
+        centroids = np.where(counts[:, None] > 0, _normalize(sums), centroids)
+    return centroids
+
+
+class DomainClassifier:
+    """
+    Domain check on the query embedding that retrieval computes anyway: no
+    extra API call and no keyword scan per request.
+
+    The query is compared with centroids of the indexed documents (one per
+    document, reduced with k-means past DOMAIN_MAX_CENTROIDS) and with one
+    centroid per topic of OFF_TOPIC_EXAMPLES. It is in domain when its best
+    corpus similarity beats its best off-topic similarity by at least
+    DOMAIN_SIMILARITY_MARGIN. Centroids are computed by a background loop
+    started with the application (run()) and recomputed once the number of
+    indexed chunks changes, at most every DOMAIN_REFRESH_SECONDS. Requests
+    never wait for them: until they exist the keyword check is used.
+
+    Verdicts are cached per question together with its embedding, so a
+    repeated question skips the embedding call as well.
+    """
+
+    def __init__(
+        self,
+        margin: Optional[float] = None,
+        max_centroids: Optional[int] = None,
+        refresh_seconds: Optional[float] = None,
+        cache_size: Optional[int] = None
+    ):
+        self.margin = margin if margin is not None else settings.DOMAIN_SIMILARITY_MARGIN
+        self.max_centroids = max_centroids or settings.DOMAIN_MAX_CENTROIDS
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else settings.DOMAIN_REFRESH_SECONDS
+        self.cache_size = cache_size or settings.DOMAIN_CACHE_SIZE
+
+        self._corpus: Optional[np.ndarray] = None
+        self._off_topic: Optional[np.ndarray] = None
+        self._topics = list(OFF_TOPIC_EXAMPLES)
+        self._indexed_chunks: Optional[int] = None
+        self._computed_at = 0.0
+        self._version = 0
+
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'checks': 0,
+            'rejected': 0,
+            'cache_hits': 0,
+            'embeddings_reused': 0,
+            'keyword_fallbacks': 0,
+            'refreshes': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return settings.DOMAIN_CHECK == "embedding"
+
+    def cached_embedding(self, question: str) -> Optional[List[float]]:
+        """Embedding of a question classified before, if still cached."""
+        with self._lock:
+            entry = self._cache.get(question.strip())
+            if entry is None:
+                return None
+            self._cache.move_to_end(question.strip())
+            self.stats['embeddings_reused'] += 1
+            return entry['embedding'].tolist()
+
+    def classify(self, question: str, embedding: List[float]) -> Dict:
+        """{'in_domain', 'method', ...}; method is 'embedding' or 'keywords'."""
+        key = question.strip()
+
+        with self._lock:
+            self.stats['checks'] += 1
+            entry = self._cache.get(key)
+            if entry is not None and entry['version'] == self._version:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                verdict = entry['verdict']
+            else:
+                verdict = None
+
+        if verdict is None:
+            verdict = self._decide(question, embedding)
+            with self._lock:
+                self._cache[key] = {
+                    'embedding': np.asarray(embedding, dtype=np.float32),
+                    'verdict': verdict,
+                    'version': self._version
+                }
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if not verdict['in_domain']:
+            with self._lock:
+                self.stats['rejected'] += 1
+        return verdict
+
+    def _decide(self, question: str, embedding: List[float]) -> Dict:
+
+        corpus, off_topic = self._corpus, self._off_topic
+        if corpus is None or off_topic is None:
+            with self._lock:
+                self.stats['keyword_fallbacks'] += 1
+            return {'in_domain': _keyword_guardrails._check_domain(question), 'method': 'keywords'}
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        domain_score = float((corpus @ query).max())
+        off_topic_scores = off_topic @ query
+        nearest = int(off_topic_scores.argmax())
+        off_topic_score = float(off_topic_scores[nearest])
+
+        return {
+            'in_domain': domain_score - off_topic_score >= self.margin,
+            'method': 'embedding',
+            'domain_score': round(domain_score, 4),
+            'off_topic_score': round(off_topic_score, 4),
+            'nearest_off_topic': self._topics[nearest]
+        }
+
+    def is_stale(self, indexed_chunks: int) -> bool:
+
+        if not self._computed_at or self._off_topic is None:
+            return True
+        if indexed_chunks == self._indexed_chunks:
+            return False
+        # An empty corpus is re-checked as often as the stats refresh.
+        interval = self.refresh_seconds if self._corpus is not None else settings.STATS_REFRESH_SECONDS
+        return time.monotonic() - self._computed_at >= interval
+
+    def refresh_if_stale(self) -> bool:
+
+        indexed = corpus_stats.get()['chunks']['with_embeddings']
+        if not self.is_stale(indexed):
+            return False
+        self.refresh(indexed)
+        return True
+
+    async def run(self) -> None:
+        """Background refresh loop; started at application startup when DOMAIN_CHECK=embedding."""
+        tick = max(min(settings.STATS_REFRESH_SECONDS, self.refresh_seconds) / 2, 0.5)
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh_if_stale)
+            except Exception as e:
+                logger.warning(f"Domain centroid refresh failed: {str(e)}")
+                await asyncio.sleep(settings.STATS_REFRESH_SECONDS)
+            await asyncio.sleep(tick)
+
+    def refresh(self, indexed_chunks: Optional[int] = None) -> None:
+
+        if self._off_topic is None:
+            self._off_topic = self._embed_off_topic()
+
+        db = SessionLocal()
+        try:
+            rows = db.execute(text("""
+                SELECT AVG(embedding_vector)::text AS centroid
+                FROM chunks
+                WHERE embedding_vector IS NOT NULL
+                GROUP BY document_id
+            """)).fetchall()
+        finally:
+            db.close()
+
+        corpus = None
+        if rows:
+            documents = _normalize(np.array([json.loads(row.centroid) for row in rows], dtype=np.float32))
+            corpus = spherical_kmeans(documents, self.max_centroids)
+
+        with self._lock:
+            self._corpus = corpus
+            self._indexed_chunks = indexed_chunks
+            self._computed_at = time.monotonic()
+            self._version += 1
+            self.stats['refreshes'] += 1
+
+        logger.info(
+            f"Domain centroids refreshed: {len(rows)} documents, "
+            f"{0 if corpus is None else len(corpus)} centroids"
+        )
+
+    def _embed_off_topic(self) -> np.ndarray:
+
+        texts = [example for topic in self._topics for example in OFF_TOPIC_EXAMPLES[topic]]
+        vectors = _normalize(np.array(
+            EmbeddingService(None)._generate_embeddings_batch(texts), dtype=np.float32
+        ))
+
+        centroids = []
+        start = 0
+        for topic in self._topics:
+            count = len(OFF_TOPIC_EXAMPLES[topic])
+            centroids.append(vectors[start:start + count].mean(axis=0))
+            start += count
+        return _normalize(np.array(centroids))
+
+    def get_stats(self) -> Dict:
+
+        checks = self.stats['checks']
+        return {
+            **self.stats,
+            'enabled': self.enabled,
+            'margin': self.margin,
+            'corpus_centroids': 0 if self._corpus is None else len(self._corpus),
+            'off_topic_centroids': 0 if self._off_topic is None else len(self._off_topic),
+            'cached': len(self._cache),
+            'cache_hit_rate': round(self.stats['cache_hits'] / checks * 100, 2) if checks else 0.0,
+            'rejection_rate': round(self.stats['rejected'] / checks * 100, 2) if checks else 0.0,
+            'age_seconds': round(time.monotonic() - self._computed_at, 1) if self._computed_at else None
+        }
+
+
+domain_classifier = DomainClassifier()
@@ -1,28 +1,34 @@
 import json
 import time
 import gc
-from typing import List, Optional, Dict, Any
+import asyncio
+from typing import List, Optional, Dict, Any, Tuple
 import numpy as np
 from sqlalchemy.orm import Session
-from openai import OpenAI
+from openai import AsyncOpenAI
 import tiktoken
 
 from models.chunk import Chunk
 from models.document import Document
+from services.corpus_stats import corpus_stats, count_chunks
+from services.openai_clients import get_openai_client, get_async_openai_client
+from services.openai_scheduler import openai_scheduler, INTERACTIVE, BATCH
+from services.hedging import hedged
+from services.sentence_embeddings import sentence_spans, encode_chunk
 from core.config import settings
 
+SENTENCE_REQUEST_TOKENS = 50000
+
+
 class EmbeddingService:
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Optional[Session]):
         self.db = db
         
         if not settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY not configured. Please set it in .env file.")
         
-        self.client = OpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            timeout=60.0
-        )
+        self.client = get_openai_client()
         self.model = settings.EMBEDDING_MODEL
         
         try:
@@ -70,7 +76,7 @@ class EmbeddingService:
 
             try:
                 logger.info(f"  Batch {batch_num}/{total_batches}: Generating embeddings for {len(batch)} chunks ({batch_tokens} tokens)...")
-                embeddings = self._generate_embeddings_batch(texts)
+                embeddings = self._generate_embeddings_batch(texts, batch_tokens)
                 logger.info(f"  Batch {batch_num}/{total_batches}: ✓ Embeddings received from OpenAI")
 
                 for chunk, embedding in zip(batch, embeddings):
@@ -78,6 +84,11 @@ class EmbeddingService:
                     setattr(chunk, "embedding_model", self.model)
                     chunks_processed += 1
 
+                if settings.SENTENCE_EMBEDDINGS:
+                    for chunk, (spans, blob) in zip(batch, self.generate_sentence_embeddings(texts)):
+                        setattr(chunk, "sentence_spans", spans)
+                        setattr(chunk, "sentence_embeddings", blob)
+
                 self.db.commit()
                 logger.info(f"  Batch {batch_num}/{total_batches}: ✓ Saved to database ({chunks_processed}/{len(chunks)} chunks processed)")
 
@@ -96,6 +107,7 @@ class EmbeddingService:
             setattr(document, "is_processed", True)
             setattr(document, "processing_status", "completed")
             self.db.commit()
+        corpus_stats.mark_dirty()
 
         elapsed_time = time.time() - start_time
         estimated_cost = (total_tokens / 1000) * 0.0001
@@ -109,67 +121,199 @@ class EmbeddingService:
             'tokens_per_second': round(total_tokens / elapsed_time if elapsed_time > 0 else 0, 2)
         }
 
-    def _generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    def _generate_embeddings_batch(self, texts: List[str], tokens: Optional[int] = None) -> List[List[float]]:
+        """
+        Embed one batch under the shared OpenAI quota at batch priority;
+        openai_scheduler handles 429/Retry-After and transient-error retries.
+        """
+        from core.logging_config import get_logger
+        logger = get_logger("embedding")
 
-        max_retries = 3
-        retry_delay = 1
+        if tokens is None:
+            tokens = sum(self.count_tokens(text) for text in texts)
 
-        for attempt in range(max_retries):
-            try:
-                from core.logging_config import get_logger
-                logger = get_logger("embedding")
-                
-                if attempt > 0:
-                    logger.info(f"    Retry attempt {attempt + 1}/{max_retries}...")
-                
-                logger.debug(f"    Calling OpenAI API with model: {self.model}")
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=texts
-                )
-
-                embeddings = [item.embedding for item in response.data]
-                logger.debug(f"    ✓ Received {len(embeddings)} embeddings from OpenAI")
-                return embeddings
+        logger.debug(f"    Calling OpenAI API with model: {self.model}")
+        response = openai_scheduler.call(
+            lambda: self.client.embeddings.create(model=self.model, input=texts),
+            priority=BATCH,
+            tokens=tokens
+        )
 
-            except Exception as e:
-                from core.logging_config import get_logger
-                logger = get_logger("embedding")
-                logger.warning(f"    API call failed: {str(e)}")
-                
-                if attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)
-                    logger.info(f"    Waiting {wait_time}s before retry...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"    All retries exhausted. Raising exception.")
-                    raise e
-
-        raise Exception("Failed to generate embeddings after all retries")
+        embeddings = [item.embedding for item in response.data]
+        logger.debug(f"    ✓ Received {len(embeddings)} embeddings from OpenAI")
+        return embeddings
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        return get_async_openai_client()
+
+    async def _generate_embeddings_batch_async(
+        self,
+        texts: List[str],
+        tokens: Optional[int] = None,
+        priority: int = BATCH
+    ) -> List[List[float]]:
+        """
+        Async twin of _generate_embeddings_batch: waits for quota and backs off
+        without blocking the event loop, so concurrent batches keep it free.
+        """
+        if tokens is None:
+            tokens = sum(self.count_tokens(text) for text in texts)
+
+        response = await openai_scheduler.call_async(
+            lambda: self.async_client.embeddings.create(model=self.model, input=texts),
+            priority=priority,
+            tokens=tokens
+        )
+        return [item.embedding for item in response.data]
+
+    async def generate_embeddings_batch_async(
+        self,
+        texts: List[str],
+        priority: int = INTERACTIVE
+    ) -> List[List[float]]:
+        """
+        Embed texts in one request at the given scheduler priority; for
+        request-path callers with several queries to embed at once.
+        """
+        return await self._generate_embeddings_batch_async(texts, priority=priority)
+
+    async def generate_embeddings_async(
+        self,
+        texts: List[str],
+        batch_size: int,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> List[List[float]]:
+        """
+        Embed texts in batches issued concurrently. The optional semaphore caps
+        in-flight requests when several documents are embedded at once.
+        """
+
+        async def run_batch(batch: List[str]) -> List[List[float]]:
+            if semaphore is None:
+                return await self._generate_embeddings_batch_async(batch)
+            async with semaphore:
+                return await self._generate_embeddings_batch_async(batch)
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+        return [embedding for batch_result in results for embedding in batch_result]
+
+    def _sentence_batches(self, texts: List[str]) -> Tuple[List[List[int]], List[List[str]], List[int]]:
+        """Sentences of the given chunks, token-packed into embedding requests."""
+        spans = [sentence_spans(text) for text in texts]
+        sentences = [text[start:end] for text, chunk_spans in zip(texts, spans) for start, end in chunk_spans]
+        token_counts = [self.count_tokens(sentence) for sentence in sentences]
+        packs = self.pack_token_batches(token_counts, SENTENCE_REQUEST_TOKENS)
+        return spans, [[sentences[i] for i in pack] for pack in packs], [sum(token_counts[i] for i in pack) for pack in packs]
+
+    def _encode_sentences(self, spans: List[List[Tuple[int, int]]], vectors: List[List[float]]) -> List[Tuple[str, Optional[bytes]]]:
+
+        encoded = []
+        offset = 0
+        for chunk_spans in spans:
+            encoded.append(encode_chunk(chunk_spans, vectors[offset:offset + len(chunk_spans)], self.model))
+            offset += len(chunk_spans)
+        return encoded
+
+    def generate_sentence_embeddings(self, texts: List[str]) -> List[Tuple[str, Optional[bytes]]]:
+        """
+        (sentence_spans, sentence_embeddings) column values for each chunk
+        text, used by extractive answers. All sentences are embedded in as
+        few batch-priority requests as the token budget allows.
+        """
+        spans, batches, batch_tokens = self._sentence_batches(texts)
+        vectors: List[List[float]] = []
+        for batch, tokens in zip(batches, batch_tokens):
+            vectors.extend(self._generate_embeddings_batch(batch, tokens))
+        return self._encode_sentences(spans, vectors)
+
+    async def generate_sentence_embeddings_async(
+        self,
+        texts: List[str],
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> List[Tuple[str, Optional[bytes]]]:
+        """
+        Async twin of generate_sentence_embeddings, requests issued
+        concurrently. Sentence splitting, token counting and encoding run in a
+        worker thread to keep the event loop free.
+        """
+        spans, batches, batch_tokens = await asyncio.to_thread(self._sentence_batches, texts)
+
+        async def run_batch(batch: List[str], tokens: int) -> List[List[float]]:
+            if semaphore is None:
+                return await self._generate_embeddings_batch_async(batch, tokens)
+            async with semaphore:
+                return await self._generate_embeddings_batch_async(batch, tokens)
+
+        results = await asyncio.gather(*(run_batch(b, t) for b, t in zip(batches, batch_tokens)))
+        return await asyncio.to_thread(
+            self._encode_sentences, spans, [vector for result in results for vector in result]
+        )
+
+    @staticmethod
+    def pack_token_batches(
+        token_counts: List[int],
+        max_tokens: int,
+        max_inputs: int = 2048
+    ) -> List[List[int]]:
+        """
+        Group input indices into requests holding as many tokens as allowed
+        (rather than a fixed number of inputs), preserving order.
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+
+        for index, tokens in enumerate(token_counts):
+            if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(index)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+
+        return batches
 
     def generate_query_embedding(self, query: str) -> List[float]:
 
         try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=[query]
+            response = openai_scheduler.call(
+                lambda: self.client.embeddings.create(model=self.model, input=[query]),
+                priority=INTERACTIVE,
+                tokens=self.count_tokens(query)
             )
             return response.data[0].embedding
 
         except Exception as e:
             raise Exception(f"Error generating query embedding: {str(e)}")
 
+    async def generate_query_embedding_async(self, query: str) -> List[float]:
+
+        try:
+            response, _ = await hedged("embedding", lambda: openai_scheduler.call_async(
+                lambda: self.async_client.embeddings.create(model=self.model, input=[query]),
+                priority=INTERACTIVE,
+                tokens=self.count_tokens(query)
+            ))
+            return response.data[0].embedding
+
+        except Exception as e:
+            raise Exception(f"Error generating query embedding: {str(e)}")
+
     def count_tokens(self, text: str) -> int:
 
         return len(self.encoding.encode(text))
 
     def get_embedding_stats(self) -> Dict:
 
-        total_chunks = self.db.query(Chunk).count()
-        chunks_with_embedding = self.db.query(Chunk).filter(
-            Chunk.embedding.isnot(None)
-        ).count()
+        chunks = count_chunks(self.db)
+        total_chunks = chunks['total']
+        chunks_with_embedding = chunks['with_json_embedding']
 
         return {
             'total_chunks': total_chunks,
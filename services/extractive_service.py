@@ -0,0 +1,206 @@
+import re
+import json
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import Row
+from sqlalchemy.orm import Session
+
+from models.chunk import Chunk
+from services.sentence_embeddings import sentence_spans, sentence_text, reduce, unpack
+from core.config import settings
+
+WORD = re.compile(r'\w+', re.UNICODE)
+RRF_K = 60
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how in is it of on or that the this to
+was what when where which who why will with you your o os as um uma de do da dos das
+e em no na nos nas por para com que qual quais como quando onde se ser sobre
+""".split())
+
+
+class ExtractiveService:
+    """
+    Answers with the retrieved sources' own sentences, without an LLM call,
+    citing them as [Source N] in source order.
+
+    Sentences are scored against the query embedding with the sentence
+    embeddings precomputed at ingest (one matrix-vector product). Chunks
+    without them are scored lexically (question terms contained, weighted
+    by the source's similarity) and merged into the same ranking, so a
+    partly backfilled corpus still contributes every retrieved chunk.
+
+    Serves answer_mode=extractive and the degraded answer when the request
+    deadline leaves no time for the LLM.
+    """
+
+    DEGRADED_INTRO = (
+        "A complete answer could not be generated in time. "
+        "These are the most relevant passages from the documents:"
+    )
+
+    def __init__(self, db: Optional[Session] = None, max_sentences: Optional[int] = None):
+        self.db = db
+        self.max_sentences = max_sentences or settings.EXTRACTIVE_MAX_SENTENCES
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+
+        return [sentence_text(text, span) for span in sentence_spans(text)]
+
+    @staticmethod
+    def _terms(text: str) -> Set[str]:
+
+        return {w for w in WORD.findall(text.lower()) if w not in STOPWORDS and len(w) > 1}
+
+    def rank_sentences(self, question: str, retrieval_results: List[Dict]) -> List[Dict]:
+        """Lexical ranking, best first; 'source' is the 1-based citation number."""
+        return self._rank_lexical(question, [
+            (source, result.get('similarity', 0.0), 0, result.get('content') or "")
+            for source, result in enumerate(retrieval_results, 1)
+        ])
+
+    def _rank_lexical(self, question: str, passages: List[Tuple[int, float, int, str]]) -> List[Dict]:
+        """Lexical ranking of (source, similarity, chunk_index, text) passages, best first."""
+        question_terms = self._terms(question)
+        ranked = []
+
+        for source, similarity, chunk_index, text in passages:
+            for position, sentence in enumerate(self.split_sentences(text)):
+                overlap = len(question_terms & self._terms(sentence)) / (len(question_terms) or 1)
+                ranked.append({
+                    'sentence': sentence,
+                    'source': source,
+                    'position': (chunk_index, position),
+                    'overlap': overlap,
+                    'ranking': 'lexical',
+                    # Earlier sentences break ties: they tend to carry the topic.
+                    'score': overlap * similarity + 0.001 / (position + 1)
+                })
+
+        ranked.sort(key=lambda s: s['score'], reverse=True)
+        return ranked
+
+    def _load_chunks(self, chunk_ids: List[int]) -> Dict[int, Row]:
+
+        rows = self.db.query(
+            Chunk.id, Chunk.content, Chunk.chunk_index, Chunk.sentence_spans, Chunk.sentence_embeddings
+        ).filter(
+            Chunk.id.in_(chunk_ids)
+        ).all()
+        return {row.id: row for row in rows}
+
+    @staticmethod
+    def _fuse(rankings: List[List[Dict]], k: int = RRF_K) -> List[Dict]:
+        """
+        Reciprocal rank fusion: embedding and lexical scores are not on the
+        same scale, so sentences are merged by their rank in each list. A
+        sentence in several lists (chunk overlap) adds up its ranks.
+        """
+        fused: Dict[str, Dict] = {}
+        for ranking in rankings:
+            for rank, sentence in enumerate(ranking, 1):
+                entry = fused.setdefault(sentence['sentence'], {**sentence, 'score': 0.0})
+                entry['score'] += 1 / (k + rank)
+        return sorted(fused.values(), key=lambda s: s['score'], reverse=True)
+
+    def rank_by_embedding(
+        self,
+        question: str,
+        query_embedding: List[float],
+        retrieval_results: List[Dict]
+    ) -> List[Dict]:
+        """
+        Embedding ranking over the chunks that have sentence embeddings, best
+        first. Sentences repeated in the overlap of adjacent chunks are kept once.
+        Chunks without them (a corpus not yet backfilled) are ranked lexically,
+        keeping sentences that share a term with the question, and merged in
+        with _fuse; each sentence's 'ranking' says which scored it.
+        """
+        chunk_ids = [
+            chunk_id
+            for result in retrieval_results
+            for chunk_id in result.get('chunk_ids') or [result['chunk'].id]
+        ]
+        if self.db is None or not chunk_ids:
+            return []
+
+        loaded = self._load_chunks(chunk_ids)
+
+        candidates = []
+        matrices = []
+        unembedded = []
+        for source, result in enumerate(retrieval_results, 1):
+            for chunk_id in result.get('chunk_ids') or [result['chunk'].id]:
+                row = loaded.get(chunk_id)
+                if row is None:
+                    continue
+                if row.sentence_embeddings is None:
+                    unembedded.append((source, result.get('similarity', 0.0), row.chunk_index, row.content))
+                    continue
+                spans = json.loads(row.sentence_spans)
+                if not spans:
+                    continue
+                matrices.append(unpack(row.sentence_embeddings, len(spans)))
+                for position, span in enumerate(spans):
+                    candidates.append({
+                        'sentence': sentence_text(row.content, span),
+                        'source': source,
+                        'position': (row.chunk_index, position),
+                        'ranking': 'embedding'
+                    })
+
+        embedded: List[Dict] = []
+        if candidates:
+            matrix = np.vstack(matrices)
+            scores = matrix @ reduce(np.array(query_embedding), matrix.shape[1])
+
+            best: Dict[str, Dict] = {}
+            for candidate, score in zip(candidates, scores):
+                candidate['score'] = float(score)
+                kept = best.get(candidate['sentence'])
+                if kept is None or candidate['score'] > kept['score']:
+                    best[candidate['sentence']] = candidate
+            embedded = sorted(best.values(), key=lambda s: s['score'], reverse=True)
+
+        lexical = [s for s in self._rank_lexical(question, unembedded) if s['overlap'] > 0]
+        if not lexical:
+            return embedded
+        if not embedded:
+            return lexical
+        return self._fuse([embedded, lexical])
+
+    def answer(
+        self,
+        question: str,
+        query_embedding: Optional[List[float]],
+        retrieval_results: List[Dict],
+        intro: Optional[str] = None
+    ) -> Dict:
+        """
+        {'answer', 'sentences', 'method'} where method is 'embedding',
+        'lexical', or 'mixed' when the chosen sentences came from both rankings.
+        """
+        chosen = []
+        if query_embedding is not None:
+            chosen = self.rank_by_embedding(question, query_embedding, retrieval_results)[:self.max_sentences]
+
+        if chosen:
+            rankings = {s['ranking'] for s in chosen}
+            method = rankings.pop() if len(rankings) == 1 else 'mixed'
+        else:
+            method = 'lexical'
+            ranked = self.rank_sentences(question, retrieval_results)
+            # Sentences sharing no term with the question only pad the answer;
+            # keep the single best one when nothing matches.
+            chosen = [s for s in ranked if s['overlap'] > 0][:self.max_sentences] or ranked[:1]
+
+        chosen.sort(key=lambda s: (s['source'], s['position']))
+        lines = "\n".join(f"- {s['sentence']} [Source {s['source']}]" for s in chosen)
+        text = "\n\n".join(part for part in (intro, lines) if part)
+
+        return {'answer': text, 'sentences': chosen, 'method': method}
+
+    def summarize(self, question: str, retrieval_results: List[Dict]) -> str:
+
+        return self.answer(question, None, retrieval_results, intro=self.DEGRADED_INTRO)['answer']
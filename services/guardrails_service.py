@@ -1,5 +1,193 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterable, Iterator, Sequence, Tuple
+from collections import OrderedDict
 import re
+import threading
+
+from services.pattern_matcher import KeywordMatcher, RegexSet
+from core.config import settings
+
+URL_PATTERN = re.compile(r'http[s]?://', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+SPECIAL_CHARS = '<>|{}[]();=+*&%$#@!'
+
+
+class VerdictCache:
+    """
+    LRU of validate_query verdicts, keyed by the normalized query (stripped,
+    lowercased: every check is case-insensitive) and the validation options.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.batch_queries = 0
+
+    def get_many(self, keys: Iterable[Tuple]) -> Dict[Tuple, Dict]:
+
+        found = {}
+        with self._lock:
+            for key in keys:
+                verdict = self._entries.get(key)
+                if verdict is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                self._entries.move_to_end(key)
+                found[key] = verdict
+        return found
+
+    def put_many(self, verdicts: Dict[Tuple, Dict]) -> None:
+
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.update(verdicts)
+            for key in verdicts:
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_batch(self, size: int) -> None:
+
+        self.batches += 1
+        self.batch_queries += size
+
+    def get_stats(self) -> Dict:
+
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            'batches': self.batches,
+            'batch_queries': self.batch_queries
+        }
+
+
+verdict_cache = VerdictCache(settings.GUARDRAILS_CACHE_SIZE)
+
+# Blocks removed from answers, as (opener, closer), in the order sanitize_response applies them.
+RESPONSE_BLOCKS = [("[SYSTEM]", "[/SYSTEM]"), ("<|im_start|>", "<|im_end|>")]
+TRUNCATION_SUFFIX = "... (response truncated)"
+
+
+def _partial_suffix(text: str, marker: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of marker."""
+    for size in range(min(len(marker) - 1, len(text)), 0, -1):
+        if text.endswith(marker[:size]):
+            return size
+    return 0
+
+
+class _BlockStripper:
+    """
+    Removes opener...closer blocks from text arriving in pieces, pairing each
+    opener with the first closer after it (the non-greedy regex). Holds back
+    only a tail that could still begin an opener, or the block currently
+    open; a block never closed is released verbatim by finish().
+    """
+
+    def __init__(self, opener: str, closer: str):
+        self.opener = opener
+        self.closer = closer
+        self._pending = ""
+        self._inside = False
+        self._scanned = 0
+
+    def feed(self, text: str) -> str:
+
+        buf = self._pending + text
+        out = []
+        while True:
+            if self._inside:
+                end = buf.find(self.closer, self._scanned)
+                if end == -1:
+                    # Next time, search only where a closer could still start.
+                    self._scanned = max(len(self.opener), len(buf) - len(self.closer) + 1)
+                    self._pending = buf
+                    return "".join(out)
+                buf = buf[end + len(self.closer):]
+                self._inside = False
+            else:
+                start = buf.find(self.opener)
+                if start == -1:
+                    hold = len(buf) - _partial_suffix(buf, self.opener)
+                    out.append(buf[:hold])
+                    self._pending = buf[hold:]
+                    return "".join(out)
+                out.append(buf[:start])
+                buf = buf[start:]
+                self._inside = True
+                self._scanned = len(self.opener)
+
+    def finish(self) -> str:
+
+        rest = self._pending
+        self._pending = ""
+        self._inside = False
+        return rest
+
+
+class StreamSanitizer:
+    """
+    sanitize_response applied incrementally to an answer arriving as token
+    deltas: the concatenation of everything feed() and finish() return
+    equals sanitize_response(full_answer).
+
+    Text is released as soon as no later delta can change it. Held back are
+    only a tail that could begin a [SYSTEM] / <|im_start|> marker, a block
+    still waiting for its closer, and trailing whitespace. All of it is
+    bounded by max_length, which is enforced as deltas arrive; input past it
+    is ignored.
+    """
+
+    def __init__(self, max_length: int = 2000):
+        self.max_length = max_length
+        self.consumed = 0
+        self.truncated = False
+        self._strippers = [_BlockStripper(opener, closer) for opener, closer in RESPONSE_BLOCKS]
+        self._started = False
+        self._trailing = ""
+
+    def feed(self, delta: str) -> str:
+
+        if self.truncated:
+            return ""
+        room = self.max_length - self.consumed
+        self.consumed += len(delta)
+        if len(delta) > room:
+            self.truncated = True
+            delta = delta[:room] + TRUNCATION_SUFFIX
+
+        for stripper in self._strippers:
+            delta = stripper.feed(delta)
+        return self._edges(delta)
+
+    def finish(self) -> str:
+
+        text = ""
+        for stripper in self._strippers:
+            text = stripper.feed(text) + stripper.finish()
+        return self._edges(text, final=True)
+
+    def _edges(self, text: str, final: bool = False) -> str:
+        """The final strip(): leading whitespace dropped, trailing held until text follows."""
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+
+        text = self._trailing + text
+        body = text.rstrip()
+        self._trailing = "" if final else text[len(body):]
+        return body
 
 class GuardrailsService:
     """
@@ -15,6 +203,8 @@ class GuardrailsService:
       * Only questions about AI, ML, NLP, RAG
       * Rejects questions outside context
       * Suggests reformulation when necessary
+      * With DOMAIN_CHECK=embedding the routes decide on the query
+        embedding instead (services/domain_classifier.py)
 
     - Content Filtering: Basic security
       * Blocks offensive language
@@ -59,6 +249,14 @@ class GuardrailsService:
         r"javascript:",
         r"onerror\s*=",
         r"onclick\s*=",
+        r"on\w+\s*=",
+        r"```",
+        r"\$\{",
+        r"<script",
+        r"</script>",
+        r"import\s+os",
+        r"import\s+subprocess",
+        r"import\s+sys",
     ]
 
     DOMAIN_KEYWORDS = [
@@ -68,9 +266,9 @@ class GuardrailsService:
         "rag", "retrieval augmented generation", "retrieval-augmented",
         "embedding", "vector", "vetor", "similaridade",
         "chunk", "chunking", "segmentação",
-        "llm", "large language model", "modelo de linguagem",
+        "llm", "large language model", "modelo de linguagem", "modelos de linguagem",
         "transformer", "bert", "gpt", "openai",
-        "neural network", "rede neural", "deep learning",
+        "neural network", "rede neural", "redes neurais", "deep learning",
         "dados", "data", "dataset", "corpus",
         "treinamento", "training", "fine-tuning",
         "prompt", "contexto", "context",
@@ -122,12 +320,6 @@ class GuardrailsService:
         "fonte", "source", "fontes", "sources"
     ]
 
-    def __init__(self):
-        self.injection_regex = [
-            re.compile(pattern, re.IGNORECASE)
-            for pattern in self.INJECTION_PATTERNS
-        ]
-
     def validate_query(
         self,
         query: str,
@@ -135,7 +327,64 @@ class GuardrailsService:
         check_injection: bool = True,
         check_domain: bool = True
     ) -> Dict:
+        """Verdict for one query; repeated queries are answered from verdict_cache."""
+        key = (self._normalize(query), max_length, check_injection, check_domain)
+        verdict = verdict_cache.get_many([key]).get(key)
+        if verdict is None:
+            verdict = self._validate((query or "").strip(), max_length, check_injection, check_domain)
+            verdict_cache.put_many({key: verdict})
+        return self._for_query(verdict, query)
+
+    def validate_batch(
+        self,
+        queries: Sequence[str],
+        max_length: int = 500,
+        check_injection: bool = True,
+        check_domain: bool = True
+    ) -> List[Dict]:
+        """
+        validate_query for each query, with one cache round trip for the
+        whole list; queries repeated in the list are validated once.
+        """
+        keys = [(self._normalize(q), max_length, check_injection, check_domain) for q in queries]
+        verdicts = verdict_cache.get_many(keys)
+
+        pending: Dict[Tuple, str] = {}
+        for query, key in zip(queries, keys):
+            if key not in verdicts:
+                pending.setdefault(key, (query or "").strip())
+
+        if pending:
+            computed = {
+                key: self._validate(text, max_length, check_injection, check_domain)
+                for key, text in pending.items()
+            }
+            verdict_cache.put_many(computed)
+            verdicts.update(computed)
+
+        verdict_cache.record_batch(len(queries))
+        return [self._for_query(verdicts[key], query) for query, key in zip(queries, keys)]
+
+    @staticmethod
+    def _normalize(query: Optional[str]) -> str:
+        return (query or "").strip().lower()
+
+    @staticmethod
+    def _for_query(verdict: Dict, query: str) -> Dict:
+        """Copy of a shared cached verdict, with this query's own sanitized text."""
+        verdict = {**verdict, 'violations': list(verdict['violations'])}
+        if verdict['is_valid']:
+            verdict['sanitized_query'] = query.strip()
+        return verdict
 
+    def _validate(
+        self,
+        query: str,
+        max_length: int,
+        check_injection: bool,
+        check_domain: bool
+    ) -> Dict:
+        """The checks on one stripped query."""
         violations = []
         severity = 'low'
 
@@ -165,7 +414,7 @@ class GuardrailsService:
                 'message': 'Question too short. Please ask a more complete question.'
             }
 
-        if re.search(r'http[s]?://', query, re.IGNORECASE):
+        if URL_PATTERN.search(query):
             violations.append('url_detected')
             return {
                 'is_valid': False,
@@ -174,7 +423,7 @@ class GuardrailsService:
                 'message': 'URLs are not allowed in the question. Please reformulate.'
             }
 
-        if re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', query):
+        if EMAIL_PATTERN.search(query):
             violations.append('email_detected')
             return {
                 'is_valid': False,
@@ -198,72 +447,52 @@ class GuardrailsService:
         if check_domain:
             domain_valid = self._check_domain(query)
             if not domain_valid:
-                violations.append('out_of_domain')
-                severity = 'low'
-                return {
-                    'is_valid': False,
-                    'violations': violations,
-                    'severity': severity,
-                    'message': (
-                        'Your question seems to be outside the scope. '
-                        'This chatbot answers about AI, ML, NLP and RAG. '
-                        'Please ask a question related to these topics.'
-                    )
-                }
+                return self.out_of_domain_result()
 
         return {
             'is_valid': True,
             'violations': [],
             'severity': 'low',
-            'message': 'Valid query',
-            'sanitized_query': query.strip()
+            'message': 'Valid query'
         }
 
-    def _check_injection(self, query: str) -> bool:
-
-        query_lower = query.lower()
-
-        for pattern in self.injection_regex:
-            if pattern.search(query_lower):
-                return True
-
-        special_chars = sum(1 for c in query if c in ['<', '>', '|', '{', '}', '[', ']', '(', ')', ';', '=', '+', '*', '&', '%', '$', '#', '@', '!'])
-        if special_chars > 10:
-            return True
-
-        if query.count('\n') > 5:
-            return True
-
-        if query.count('```') > 0:
-            return True
+    @staticmethod
+    def out_of_domain_result(domain: Optional[Dict] = None) -> Dict:
+        """Rejection for an off-topic question; `domain` is the classifier's verdict, when it decided."""
+        result = {
+            'is_valid': False,
+            'violations': ['out_of_domain'],
+            'severity': 'low',
+            'message': (
+                'Your question seems to be outside the scope. '
+                'This chatbot answers about AI, ML, NLP and RAG. '
+                'Please ask a question related to these topics.'
+            )
+        }
+        if domain is not None:
+            result['domain'] = domain
+        return result
 
-        if re.search(r'\$\{.*?\}', query) or query.count('${') > 0:
-            return True
+    def _check_injection(self, query: str) -> bool:
 
-        if re.search(r'<script', query_lower) or re.search(r'</script>', query_lower):
+        if INJECTION_MATCHER.search(query):
             return True
 
-        if re.search(r'javascript:', query_lower):
+        if sum(map(query.count, SPECIAL_CHARS)) > 10:
             return True
 
-        if re.search(r'on\w+\s*=', query_lower):
+        if query.count('\n') > 5:
             return True
 
         if query.count('\\') > 10:
             return True
 
-        if re.search(r'import\s+os|import\s+subprocess|import\s+sys', query_lower):
-            return True
-
         return False
 
     def _check_domain(self, query: str) -> bool:
 
-        query_lower = query.lower()
-
-        for keyword in self.DOMAIN_KEYWORDS:
-            if keyword.lower() in query_lower:
-                return True
+        if DOMAIN_MATCHER.find(query):
+            return True
 
         if len(query.split()) <= 3:
             return True
@@ -273,16 +502,44 @@ class GuardrailsService:
     def sanitize_response(self, response: str, max_length: int = 2000) -> str:
 
         if len(response) > max_length:
-            response = response[:max_length] + "... (response truncated)"
+            response = response[:max_length] + TRUNCATION_SUFFIX
 
         response = re.sub(r'\[SYSTEM\].*?\[/SYSTEM\]', '', response, flags=re.DOTALL)
         response = re.sub(r'<\|im_start\|>.*?<\|im_end\|>', '', response, flags=re.DOTALL)
 
         return response.strip()
 
+    def sanitize_stream(self, deltas: Iterable[str], max_length: int = 2000) -> Iterator[str]:
+        """
+        Streaming counterpart of sanitize_response: yields sanitized text as
+        deltas arrive (see StreamSanitizer), so the concatenated output
+        equals sanitize_response(full_text).
+        """
+        sanitizer = StreamSanitizer(max_length)
+
+        for delta in deltas:
+            text = sanitizer.feed(delta)
+            if text:
+                yield text
+            if sanitizer.truncated:
+                break
+
+        # Keep consuming so the producer finishes (and reports usage) after truncation.
+        for _ in deltas:
+            pass
+
+        text = sanitizer.finish()
+        if text:
+            yield text
+
     def log_violation(self, query: str, violations: List[str], severity: str) -> None:
 
         print(f"⚠️  GUARDRAIL VIOLATION")
         print(f"   Severity: {severity}")
         print(f"   Violations: {violations}")
         print(f"   Query: {query[:100]}...")
+
+
+# Built once at import: every GuardrailsService shares them.
+INJECTION_MATCHER = RegexSet(GuardrailsService.INJECTION_PATTERNS)
+DOMAIN_MATCHER = KeywordMatcher(GuardrailsService.DOMAIN_KEYWORDS)
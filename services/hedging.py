@@ -0,0 +1,184 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from services.openai_scheduler import openai_scheduler
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("hedging")
+
+T = TypeVar("T")
+
+MIN_SAMPLES = 20
+LATENCY_SAMPLES = 200
+MAX_HEDGE_CREDITS = 10.0
+
+
+class Hedger:
+    """
+    Request hedging for one call type: when the first attempt has not
+    finished after `delay` seconds, a duplicate is sent and whichever
+    finishes first wins; the other is cancelled. A failure of either
+    attempt after the hedge was sent waits for the other one.
+
+    The delay is HEDGE_DELAY_SECONDS, or when that is 0 the observed p95
+    latency of this call type (no hedging until MIN_SAMPLES calls have been
+    seen). Hedges are capped at HEDGE_MAX_RATE of calls: every call earns
+    that fraction of a credit and a hedge spends one, with at most
+    MAX_HEDGE_CREDITS banked. `allow` can veto hedging (e.g. while the
+    OpenAI quota is congested, when a duplicate would only add load).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        delay: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        allow: Optional[Callable[[], bool]] = None
+    ):
+        self.name = name
+        self.delay = delay if delay is not None else settings.HEDGE_DELAY_SECONDS
+        self.max_rate = max_rate if max_rate is not None else settings.HEDGE_MAX_RATE
+        self.allow = allow
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._credits = 0.0
+        self.stats = {
+            'calls': 0,
+            'hedged': 0,
+            'hedge_won': 0,
+            'budget_denied': 0,
+            'vetoed': 0
+        }
+
+    def current_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is no estimate yet."""
+        if self.delay > 0:
+            return self.delay
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def _take_credit(self) -> bool:
+
+        with self._lock:
+            if self._credits < 1:
+                self.stats['budget_denied'] += 1
+                return False
+            self._credits -= 1
+            self.stats['hedged'] += 1
+            return True
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> Tuple[T, float]:
+
+        start = time.monotonic()
+        result = await fn()
+        return result, time.monotonic() - start
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> Tuple[T, str]:
+        """
+        Returns (result, outcome): 'direct' when no hedge was sent, 'primary'
+        when the first attempt won the race, 'hedge' when the duplicate did.
+        """
+        with self._lock:
+            self.stats['calls'] += 1
+            self._credits = min(self._credits + self.max_rate, MAX_HEDGE_CREDITS)
+
+        delay = self.current_delay()
+        primary = asyncio.ensure_future(self._timed(fn))
+        tasks = {primary}
+
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+            if delay is None or done:
+                result, latency = await primary
+                self._observe(latency)
+                return result, 'direct'
+
+            if self.allow is not None and not self.allow():
+                with self._lock:
+                    self.stats['vetoed'] += 1
+                result, latency = await primary
+                self._observe(latency)
+                return result, 'direct'
+
+            if not self._take_credit():
+                result, latency = await primary
+                self._observe(latency)
+                return result, 'direct'
+
+            hedge = asyncio.ensure_future(self._timed(fn))
+            tasks.add(hedge)
+            logger.debug(f"Hedging {self.name} call after {delay:.3f}s")
+
+            first_error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+                    result, latency = task.result()
+                    self._observe(latency)
+                    if task is hedge:
+                        with self._lock:
+                            self.stats['hedge_won'] += 1
+                    return result, 'hedge' if task is hedge else 'primary'
+
+            raise first_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _observe(self, latency: float) -> None:
+
+        with self._lock:
+            self._latencies.append(latency)
+
+    def get_stats(self) -> Dict:
+
+        delay = self.current_delay()
+        with self._lock:
+            hedged = self.stats['hedged']
+            return {
+                **self.stats,
+                'hedge_rate': round(hedged / self.stats['calls'] * 100, 2) if self.stats['calls'] else 0.0,
+                'win_rate': round(self.stats['hedge_won'] / hedged * 100, 2) if hedged else 0.0,
+                'delay': round(delay, 4) if delay is not None else None,
+                'adaptive': self.delay <= 0,
+                'samples': len(self._latencies)
+            }
+
+
+_hedgers: Dict[str, Hedger] = {}
+_hedgers_lock = threading.Lock()
+
+
+def get_hedger(call_type: str) -> Hedger:
+    """One Hedger (and latency history) per call type, e.g. 'embedding' or 'chat:gpt-4o'."""
+    with _hedgers_lock:
+        if call_type not in _hedgers:
+            _hedgers[call_type] = Hedger(call_type, allow=lambda: not openai_scheduler.congested)
+        return _hedgers[call_type]
+
+
+async def hedged(call_type: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, str]:
+    """Hedger.run for call_type when HEDGE_REQUESTS is on, a plain call otherwise."""
+    if not settings.HEDGE_REQUESTS:
+        return await fn(), 'direct'
+    return await get_hedger(call_type).run(fn)
+
+
+def hedging_stats() -> Dict[str, Dict]:
+
+    with _hedgers_lock:
+        hedgers = dict(_hedgers)
+    return {name: hedger.get_stats() for name, hedger in hedgers.items()}
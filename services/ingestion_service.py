@@ -2,13 +2,17 @@ from pathlib import Path
 from typing import Optional, Dict
 import io
 import uuid
+import hashlib
 from datetime import datetime
 
-from pypdf import PdfReader
 from docx import Document as DocxDocument
 from sqlalchemy.orm import Session
 
 from models.document import Document
+from models.chunk import Chunk
+from services.pdf_extraction import PdfPageCache, iter_pdf_text
+from services.document_cache import document_cache
+from services.corpus_stats import corpus_stats, count_documents
 from core.config import settings
 
 class IngestionService:
@@ -38,41 +42,19 @@ class IngestionService:
         file_type = file_ext.lstrip('.')
 
         try:
-            if file_type == 'pdf':
-                content, metadata = self._extract_pdf(file_content)
-            elif file_type == 'docx':
-                content, metadata = self._extract_docx(file_content)
-            elif file_type == 'txt':
-                content, metadata = self._extract_txt(file_content)
-            elif file_type == 'md':
-                content, metadata = self._extract_markdown(file_content)
-            else:
-                raise ValueError(f"File type not supported: {file_type}")
-
-            preview = content[:500] if len(content) > 500 else content
-
-            document = Document(
-                filename=unique_filename,
+            content, metadata = extract_content(file_content, file_type)
+
+            return self.save_extracted_document(
+                stored_filename=unique_filename,
                 original_filename=original_filename,
                 file_type=file_type,
                 file_size=file_size,
                 file_path=str(file_path),
                 content=content,
-                content_preview=preview,
-                num_pages=metadata.get('num_pages'),
-                num_words=self._count_words(content),
-                num_characters=len(content),
-                language=self._detect_language(content),
-                is_processed=False,
-                processing_status='uploaded'
+                metadata=metadata,
+                content_hash=compute_content_hash(file_content)
             )
 
-            self.db.add(document)
-            self.db.commit()
-            self.db.refresh(document)
-
-            return document
-
         except Exception as e:
             if file_path.exists():
                 file_path.unlink()
@@ -82,7 +64,8 @@ class IngestionService:
         self,
         file_content: bytes,
         original_filename: str,
-        save_to_disk: bool = False
+        save_to_disk: bool = False,
+        file_mtime_ns: Optional[int] = None
     ) -> Document:
         file_ext = Path(original_filename).suffix.lower()
         if file_ext not in settings.ALLOWED_EXTENSIONS:
@@ -106,66 +89,81 @@ class IngestionService:
             stored_file_path = str(Path("data") / original_filename)
 
         try:
-            if file_type == 'pdf':
-                content, metadata = self._extract_pdf(file_content)
-            elif file_type == 'docx':
-                content, metadata = self._extract_docx(file_content)
-            elif file_type == 'txt':
-                content, metadata = self._extract_txt(file_content)
-            elif file_type == 'md':
-                content, metadata = self._extract_markdown(file_content)
-            else:
-                raise ValueError(f"File type not supported: {file_type}")
-
-            preview = content[:500] if len(content) > 500 else content
-
-            document = Document(
-                filename=stored_filename,
+            content, metadata = extract_content(file_content, file_type)
+
+            return self.save_extracted_document(
+                stored_filename=stored_filename,
                 original_filename=original_filename,
                 file_type=file_type,
                 file_size=file_size,
                 file_path=stored_file_path,
                 content=content,
-                content_preview=preview,
-                num_pages=metadata.get('num_pages'),
-                num_words=self._count_words(content),
-                num_characters=len(content),
-                language=self._detect_language(content),
-                is_processed=False,
-                processing_status='uploaded'
+                metadata=metadata,
+                content_hash=compute_content_hash(file_content),
+                file_mtime_ns=file_mtime_ns
             )
 
-            self.db.add(document)
-            self.db.commit()
-            self.db.refresh(document)
-
-            return document
-
         except Exception as e:
             if save_to_disk and file_path.exists():
                 file_path.unlink()
             raise ValueError(f"Error processing file: {str(e)}")
 
-    def _extract_pdf(self, file_content: bytes) -> tuple[str, Dict]:
+    def save_extracted_document(
+        self,
+        stored_filename: str,
+        original_filename: str,
+        file_type: str,
+        file_size: int,
+        file_path: str,
+        content: str,
+        metadata: Dict,
+        content_hash: Optional[str] = None,
+        file_mtime_ns: Optional[int] = None
+    ) -> Document:
+        preview = content[:500] if len(content) > 500 else content
+
+        document = Document(
+            filename=stored_filename,
+            original_filename=original_filename,
+            file_type=file_type,
+            file_size=file_size,
+            file_path=file_path,
+            content_hash=content_hash,
+            file_mtime_ns=file_mtime_ns,
+            content=content,
+            content_preview=preview,
+            num_pages=metadata.get('num_pages'),
+            num_words=self._count_words(content),
+            num_characters=len(content),
+            language=self._detect_language(content),
+            is_processed=False,
+            processing_status='uploaded'
+        )
+
+        self.db.add(document)
+        self.db.commit()
+        self.db.refresh(document)
+        document_cache.invalidate(int(document.id))
+        corpus_stats.mark_dirty()
 
-        pdf_file = io.BytesIO(file_content)
-        reader = PdfReader(pdf_file)
+        return document
 
-        text_parts = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                text_parts.append(text)
+    @staticmethod
+    def _extract_pdf(file_content: bytes) -> tuple[str, Dict]:
 
-        content = "\n\n".join(text_parts)
+        content_hash = compute_content_hash(file_content)
+        cache = PdfPageCache()
+
+        content = "".join(iter_pdf_text(file_content, content_hash, cache=cache))
 
         metadata = {
-            'num_pages': len(reader.pages)
+            'num_pages': cache.get_num_pages(content_hash)
         }
 
         return content, metadata
 
-    def _extract_docx(self, file_content: bytes) -> tuple[str, Dict]:
+    @staticmethod
+    def _extract_docx(file_content: bytes) -> tuple[str, Dict]:
 
         docx_file = io.BytesIO(file_content)
         doc = DocxDocument(docx_file)
@@ -183,7 +181,8 @@ class IngestionService:
 
         return content, metadata
 
-    def _extract_txt(self, file_content: bytes) -> tuple[str, Dict]:
+    @staticmethod
+    def _extract_txt(file_content: bytes) -> tuple[str, Dict]:
 
         encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
         content = None
@@ -204,15 +203,18 @@ class IngestionService:
 
         return content, metadata
 
-    def _extract_markdown(self, file_content: bytes) -> tuple[str, Dict]:
+    @staticmethod
+    def _extract_markdown(file_content: bytes) -> tuple[str, Dict]:
 
-        return self._extract_txt(file_content)
+        return IngestionService._extract_txt(file_content)
 
-    def _count_words(self, text: str) -> int:
+    @staticmethod
+    def _count_words(text: str) -> int:
 
         return len(text.split())
 
-    def _detect_language(self, text: str) -> Optional[str]:
+    @staticmethod
+    def _detect_language(text: str) -> Optional[str]:
 
         pt_words = ['o', 'a', 'de', 'que', 'e', 'do', 'da', 'em', 'um', 'para']
         en_words = ['the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'it']
@@ -238,48 +240,55 @@ class IngestionService:
 
         return self.db.query(Document).offset(skip).limit(limit).all()
 
-    def delete_document(self, document_id: int) -> bool:
+    def delete_document(self, document_id: int, delete_file: bool = True) -> bool:
 
         document = self.get_document(document_id)
         if not document:
             return False
 
-        file_path = Path(str(document.file_path))
-        if file_path.exists():
-            file_path.unlink()
+        if delete_file:
+            file_path = Path(str(document.file_path))
+            if file_path.exists():
+                file_path.unlink()
 
+        self.db.query(Chunk).filter(Chunk.document_id == document_id).delete()
         self.db.delete(document)
         self.db.commit()
+        document_cache.invalidate(document_id)
+        corpus_stats.mark_dirty()
 
         return True
 
     def get_stats(self) -> Dict:
 
-        total = self.db.query(Document).count()
+        documents = count_documents(self.db)
+
+        return {
+            'total_documents': documents['total'],
+            'total_size_mb': documents['total_size_mb'],
+            'by_type': documents['by_type'],
+            'by_status': documents['by_status']
+        }
 
-        total_size = self.db.query(
-            func.sum(Document.file_size)
-        ).scalar() or 0
 
-        by_type = {}
-        for file_type in ['pdf', 'docx', 'txt', 'md']:
-            count = self.db.query(Document).filter(
-                Document.file_type == file_type
-            ).count()
-            by_type[file_type] = count
+def compute_content_hash(file_content: bytes) -> str:
 
-        by_status = {}
-        for status in ['uploaded', 'processing', 'completed', 'failed']:
-            count = self.db.query(Document).filter(
-                Document.processing_status == status
-            ).count()
-            by_status[status] = count
+    return hashlib.sha256(file_content).hexdigest()
 
-        return {
-            'total_documents': total,
-            'total_size_mb': round(total_size / (1024 * 1024), 2),
-            'by_type': by_type,
-            'by_status': by_status
-        }
+
+def extract_content(file_content: bytes, file_type: str) -> tuple[str, Dict]:
+    """
+    Extract text and metadata from raw file bytes.
+    Module-level (no session needed) so it can run inside worker processes.
+    """
+    if file_type == 'pdf':
+        return IngestionService._extract_pdf(file_content)
+    elif file_type == 'docx':
+        return IngestionService._extract_docx(file_content)
+    elif file_type == 'txt':
+        return IngestionService._extract_txt(file_content)
+    elif file_type == 'md':
+        return IngestionService._extract_markdown(file_content)
+    raise ValueError(f"File type not supported: {file_type}")
 
 from sqlalchemy import func
@@ -0,0 +1,108 @@
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from datetime import datetime
+from dataclasses import dataclass, field, asdict
+
+@dataclass
+class IngestionJob:
+
+    job_id: str
+    filename: str
+    file_size: int
+
+    status: str = "queued"
+    stages: Dict[str, str] = field(default_factory=dict)
+
+    document_id: Optional[int] = None
+    chunks_count: int = 0
+    embeddings_count: int = 0
+    error: Optional[str] = None
+
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    updated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+class JobService:
+    """
+    In-process registry of background ingestion jobs.
+
+    Stage updates arrive from the event loop and from worker threads, so all
+    mutations go through a lock. Only the most recent max_jobs are retained;
+    finished jobs are evicted first.
+    """
+
+    STAGES = ["queued", "extracting", "extracted", "embedding", "completed"]
+    FINAL_STATUSES = ("completed", "failed")
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create_job(self, filename: str, file_size: int) -> IngestionJob:
+
+        job = IngestionJob(job_id=uuid.uuid4().hex, filename=filename, file_size=file_size)
+        job.stages["queued"] = job.created_at
+
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._evict()
+
+        return job
+
+    def update_stage(self, job_id: str, stage: str, **fields) -> None:
+
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+
+            now = datetime.now().isoformat()
+            job.status = stage
+            job.stages[stage] = now
+            job.updated_at = now
+            for key, value in fields.items():
+                setattr(job, key, value)
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def get_status(self, job_id: str) -> Optional[Dict]:
+
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            data = asdict(job)
+
+        if job.status in self.STAGES:
+            progress = self.STAGES.index(job.status) / (len(self.STAGES) - 1)
+        else:
+            progress = 1.0
+
+        data['progress'] = round(progress, 2)
+        data['is_finished'] = job.status in self.FINAL_STATUSES
+        return data
+
+    def list_jobs(self, n: int = 20) -> List[Dict]:
+
+        with self._lock:
+            job_ids = list(self.jobs.keys())[-n:]
+
+        return [status for status in (self.get_status(job_id) for job_id in job_ids) if status]
+
+    def _evict(self) -> None:
+
+        if len(self.jobs) <= self.max_jobs:
+            return
+
+        for job_id in [j.job_id for j in self.jobs.values() if j.status in self.FINAL_STATUSES]:
+            if len(self.jobs) <= self.max_jobs:
+                return
+            del self.jobs[job_id]
+
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
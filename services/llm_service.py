@@ -1,16 +1,19 @@
 import time
+import asyncio
 from typing import Dict, List, Optional, Generator, Any, cast
-from openai import OpenAI
 from openai.types.chat import ChatCompletionMessageParam
 import tiktoken
 
+from services.openai_clients import get_openai_client, get_async_openai_client
+from services.openai_scheduler import openai_scheduler, INTERACTIVE
+from services.hedging import hedged
 from core.config import settings
 
 class LLMService:
 
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.model = settings.LLM_MODEL
+    def __init__(self, model: Optional[str] = None):
+        self.client = get_openai_client()
+        self.model = model or settings.LLM_MODEL
         self.temperature = settings.LLM_TEMPERATURE
         self.max_tokens = settings.MAX_TOKENS
 
@@ -57,78 +60,139 @@ class LLMService:
         
         return params
 
-    def generate_response(
+    def _create_params(
         self,
         messages: List[Dict[str, str]],
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None
-    ) -> Dict:
+    ) -> Dict[str, Any]:
 
-        start_time = time.time()
+        typed_messages = cast(List[ChatCompletionMessageParam], messages)
+        token_limit = max_tokens or self.max_tokens
 
-        try:
-            typed_messages = cast(List[ChatCompletionMessageParam], messages)
-            token_limit = max_tokens or self.max_tokens
-            
-            create_params = {
-                "model": self.model,
-                "messages": typed_messages,
-            }
+        create_params: Dict[str, Any] = {
+            "model": self.model,
+            "messages": typed_messages,
+        }
 
-            completion_params = self._get_completion_params(
-                token_limit=token_limit,
-                temperature=temperature,
-                model=self.model
-            )
-            create_params.update(completion_params)
-            
-            response = self.client.chat.completions.create(**create_params)
+        completion_params = self._get_completion_params(
+            token_limit=token_limit,
+            temperature=temperature,
+            model=self.model
+        )
+        create_params.update(completion_params)
+        return create_params
 
-            latency = time.time() - start_time
+    def _estimate_tokens(self, create_params: Dict[str, Any]) -> int:
+        """TPM cost OpenAI charges up front: prompt plus the completion limit."""
+        completion_limit = create_params.get("max_completion_tokens") or create_params.get("max_tokens") or 0
+        return self.count_messages_tokens(create_params["messages"]) + completion_limit
 
-            choice = response.choices[0]
-            finish_reason = choice.finish_reason
-            message = choice.message
+    def _parse_response(self, response: Any, start_time: float) -> Dict:
 
-            answer = message.content if message.content is not None else ""
+        latency = time.time() - start_time
 
-            if not answer and response.usage and response.usage.completion_tokens > 0:
-                from core.logging_config import get_logger
-                logger = get_logger("llm_service")
-                logger.warning(
-                    f"Empty answer but {response.usage.completion_tokens} completion tokens generated. "
-                    f"Finish reason: {finish_reason}, Model: {self.model}"
-                )
+        choice = response.choices[0]
+        finish_reason = choice.finish_reason
+        message = choice.message
 
-            usage = {
-                'prompt_tokens': response.usage.prompt_tokens if response.usage else 0,
-                'completion_tokens': response.usage.completion_tokens if response.usage else 0,
-                'total_tokens': response.usage.total_tokens if response.usage else 0
-            }
+        answer = message.content if message.content is not None else ""
 
-            cost = self._calculate_cost(
-                usage['prompt_tokens'],
-                usage['completion_tokens']
+        if not answer and response.usage and response.usage.completion_tokens > 0:
+            from core.logging_config import get_logger
+            logger = get_logger("llm_service")
+            logger.warning(
+                f"Empty answer but {response.usage.completion_tokens} completion tokens generated. "
+                f"Finish reason: {finish_reason}, Model: {self.model}"
             )
 
-            return {
-                'answer': answer,
-                'usage': usage,
-                'cost': cost,
-                'latency': round(latency, 2),
-                'model': self.model,
-                'finish_reason': response.choices[0].finish_reason
-            }
+        usage = {
+            'prompt_tokens': response.usage.prompt_tokens if response.usage else 0,
+            'completion_tokens': response.usage.completion_tokens if response.usage else 0,
+            'total_tokens': response.usage.total_tokens if response.usage else 0
+        }
+
+        cost = self._calculate_cost(
+            usage['prompt_tokens'],
+            usage['completion_tokens']
+        )
+
+        return {
+            'answer': answer,
+            'usage': usage,
+            'cost': cost,
+            'latency': round(latency, 2),
+            'model': self.model,
+            'finish_reason': finish_reason
+        }
+
+    def _error_response(self, error: Exception, start_time: float) -> Dict:
+
+        return {
+            'answer': f"Error generating response: {str(error)}",
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            'cost': 0.0,
+            'latency': time.time() - start_time,
+            'model': self.model,
+            'error': str(error)
+        }
+
+    def generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict:
+
+        start_time = time.time()
+
+        try:
+            create_params = self._create_params(messages, temperature, max_tokens)
+            estimated = self._estimate_tokens(create_params)
+            response = openai_scheduler.call(
+                lambda: self.client.chat.completions.create(**create_params),
+                priority=INTERACTIVE,
+                tokens=estimated
+            )
+            openai_scheduler.reconcile(estimated, response.usage.total_tokens if response.usage else 0)
+            return self._parse_response(response, start_time)
 
         except Exception as e:
-            return {
-                'answer': f"Error generating response: {str(e)}",
-                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
-                'cost': 0.0,
-                'latency': time.time() - start_time,
-                'model': self.model,
-                'error': str(e)
-            }
+            return self._error_response(e, start_time)
+
+    async def generate_response_async(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Same contract as generate_response, without holding the event loop,
+        plus 'hedge' (see services.hedging) when HEDGE_REQUESTS is on. With a
+        timeout, covering quota waits and retries too, an unfinished call
+        returns an error response with 'timed_out': True.
+        """
+        start_time = time.time()
+
+        try:
+            create_params = self._create_params(messages, temperature, max_tokens)
+            estimated = self._estimate_tokens(create_params)
+            call = hedged(f"chat:{self.model}", lambda: openai_scheduler.call_async(
+                lambda: get_async_openai_client().chat.completions.create(**create_params),
+                priority=INTERACTIVE,
+                tokens=estimated
+            ))
+            response, hedge = await (asyncio.wait_for(call, timeout) if timeout is not None else call)
+            openai_scheduler.reconcile(estimated, response.usage.total_tokens if response.usage else 0)
+            return {**self._parse_response(response, start_time), 'hedge': hedge}
+
+        except asyncio.TimeoutError:
+            error = TimeoutError(f"LLM call did not finish within the {timeout:.2f}s left in the request deadline")
+            return {**self._error_response(error, start_time), 'timed_out': True}
+
+        except Exception as e:
+            return self._error_response(e, start_time)
 
     def generate_response_stream(
         self,
@@ -137,31 +201,91 @@ class LLMService:
         max_tokens: Optional[int] = None
     ) -> Generator[str, None, None]:
 
+        for event in self.generate_response_events(messages, temperature, max_tokens):
+            if event['type'] == 'token':
+                yield event['content']
+            elif event.get('error'):
+                yield f"Erro no streaming: {event['error']}"
+
+    def generate_response_events(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        Stream a completion as events: {'type': 'token', 'content': ...} per
+        delta, then a single {'type': 'done', ...} with the same fields as
+        generate_response plus time_to_first_token.
+        """
+        start_time = time.time()
+        first_token_time = None
+        parts: List[str] = []
+        usage = None
+        finish_reason = None
+        error = None
+        estimated = 0
+
         try:
-            typed_messages = cast(List[ChatCompletionMessageParam], messages)
-            token_limit = max_tokens or self.max_tokens
-            
-            create_params = {
-                "model": self.model,
-                "messages": typed_messages,
-                "stream": True
-            }
-            
-            completion_params = self._get_completion_params(
-                token_limit=token_limit,
-                temperature=temperature,
-                model=self.model
+            create_params = self._create_params(messages, temperature, max_tokens)
+            create_params["stream"] = True
+            create_params["stream_options"] = {"include_usage": True}
+
+            estimated = self._estimate_tokens(create_params)
+            stream = openai_scheduler.call(
+                lambda: self.client.chat.completions.create(**create_params),
+                priority=INTERACTIVE,
+                tokens=estimated
             )
-            create_params.update(completion_params)
-            
-            stream = self.client.chat.completions.create(**create_params)
 
             for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                if choice.delta.content:
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    parts.append(choice.delta.content)
+                    yield {'type': 'token', 'content': choice.delta.content}
 
         except Exception as e:
-            yield f"Erro no streaming: {str(e)}"
+            error = str(e)
+
+        answer = ''.join(parts)
+
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens
+        else:
+            prompt_tokens = self.count_messages_tokens(messages)
+            completion_tokens = self.count_tokens(answer)
+
+        if estimated:
+            openai_scheduler.reconcile(estimated, prompt_tokens + completion_tokens)
+
+        done = {
+            'type': 'done',
+            'answer': answer,
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            },
+            'cost': self._calculate_cost(prompt_tokens, completion_tokens),
+            'latency': round(time.time() - start_time, 2),
+            'time_to_first_token': round(first_token_time - start_time, 3) if first_token_time else None,
+            'model': self.model,
+            'finish_reason': finish_reason
+        }
+        if error is not None:
+            done['error'] = error
+
+        yield done
 
     def count_tokens(self, text: str) -> int:
 
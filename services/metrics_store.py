@@ -0,0 +1,223 @@
+import math
+import threading
+from collections import Counter
+from dataclasses import fields
+from typing import Any, Dict, List, Optional, Type
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram (HDR-style). Bucket bounds grow
+    geometrically from MIN_SECONDS to MAX_SECONDS, so any percentile is
+    reported within RELATIVE_ERROR whatever the number of samples; memory is
+    fixed and two histograms merge by adding their counts.
+    """
+
+    MIN_SECONDS = 1e-4
+    MAX_SECONDS = 1e3
+    RELATIVE_ERROR = 0.01
+
+    def __init__(self):
+        self._growth = (1 + self.RELATIVE_ERROR) ** 2
+        self._log_growth = math.log(self._growth)
+        # Bucket 0 holds values up to MIN_SECONDS, the last one values past MAX_SECONDS.
+        self._buckets = math.ceil(math.log(self.MAX_SECONDS / self.MIN_SECONDS) / self._log_growth) + 2
+        self.counts = np.zeros(self._buckets, dtype=np.int64)
+        self.total = 0
+
+    def record(self, seconds: float) -> None:
+
+        if seconds <= self.MIN_SECONDS:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / self.MIN_SECONDS) / self._log_growth) + 1, self._buckets - 1)
+        self.counts[index] += 1
+        self.total += 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+
+        self.counts += other.counts
+        self.total += other.total
+
+    def percentiles(self, quantiles=PERCENTILES) -> Dict[str, float]:
+
+        if not self.total:
+            return {f'p{q}': 0.0 for q in quantiles}
+        cumulative = np.cumsum(self.counts)
+        result = {}
+        for q in quantiles:
+            index = int(np.searchsorted(cumulative, max(math.ceil(q / 100 * self.total), 1)))
+            if index == 0:
+                value = self.MIN_SECONDS
+            elif index == self._buckets - 1:
+                value = self.MAX_SECONDS
+            else:
+                # Geometric middle of the bucket: within RELATIVE_ERROR of any value in it.
+                value = self.MIN_SECONDS * self._growth ** (index - 1) * math.sqrt(self._growth)
+            result[f'p{q}'] = round(value, 4)
+        return result
+
+
+class MetricsStore:
+    """
+    Fixed-capacity store for per-query records of a dataclass type.
+
+    Numeric and boolean fields live in one float64 column per field of a
+    ring buffer holding the last `capacity` records; the other fields
+    (question, model, violations...) in a parallel object ring, the question
+    cut to QUESTION_CHARS. Alongside, running sums, nonzero counts and
+    min/max per numeric field, value counts per category field and a
+    LatencyHistogram per latency field cover every record since start, so
+    lifetime statistics cost the same after a million queries as after ten.
+    """
+
+    QUESTION_CHARS = 200
+
+    def __init__(
+        self,
+        record_type: Type,
+        capacity: int,
+        latency_fields: List[str],
+        category_fields: List[str]
+    ):
+        self.record_type = record_type
+        self.capacity = capacity
+        self.numeric_fields = [f.name for f in fields(record_type) if f.type in (float, int, bool)]
+        self.text_fields = [f.name for f in fields(record_type) if f.name not in self.numeric_fields]
+        self._types = {f.name: f.type for f in fields(record_type)}
+        self._column = {name: i for i, name in enumerate(self.numeric_fields)}
+
+        self._rows = np.zeros((capacity, len(self.numeric_fields)), dtype=np.float64)
+        self._text = np.empty(capacity, dtype=object)
+        self._next = 0
+        self._size = 0
+
+        self.count = 0
+        self.sums = np.zeros(len(self.numeric_fields), dtype=np.float64)
+        self.nonzero = np.zeros(len(self.numeric_fields), dtype=np.int64)
+        self.minimums = np.full(len(self.numeric_fields), np.inf)
+        self.maximums = np.full(len(self.numeric_fields), -np.inf)
+        self.categories = {name: Counter() for name in category_fields}
+        self.histograms = {name: LatencyHistogram() for name in latency_fields}
+        self._lock = threading.Lock()
+
+    def append(self, record: Any) -> None:
+
+        row = np.array([getattr(record, name) for name in self.numeric_fields], dtype=np.float64)
+        text = tuple(getattr(record, name) for name in self.text_fields)
+        if 'question' in self.text_fields:
+            position = self.text_fields.index('question')
+            text = text[:position] + (text[position][:self.QUESTION_CHARS],) + text[position + 1:]
+
+        with self._lock:
+            self._rows[self._next] = row
+            self._text[self._next] = text
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+            self.count += 1
+            self.sums += row
+            self.nonzero += row != 0
+            np.minimum(self.minimums, row, out=self.minimums)
+            np.maximum(self.maximums, row, out=self.maximums)
+            for name, counter in self.categories.items():
+                counter[getattr(record, name)] += 1
+            for name, histogram in self.histograms.items():
+                value = row[self._column[name]]
+                if value > 0:
+                    histogram.record(value)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _window_indices(self, last_n: Optional[int] = None) -> np.ndarray:
+        """Ring positions of the last `last_n` records held (all held by default), oldest first."""
+        n = self._size if last_n is None else min(max(last_n, 0), self._size)
+        return (np.arange(self._next - n, self._next)) % self.capacity
+
+    def summary(self, last_n: Optional[int] = None) -> Dict:
+        """
+        {'count', 'columns': {field: {'sum', 'nonzero', 'min', 'max'}},
+        'categories': {field: {value: count}}, 'percentiles': {field: {'p50', ...}}}
+        over every record since start, or over the last `last_n` records held.
+        Latency percentiles only count records where the stage ran (value > 0).
+        """
+        if last_n is None:
+            with self._lock:
+                return {
+                    'count': self.count,
+                    'columns': {
+                        name: {
+                            'sum': float(self.sums[i]),
+                            'nonzero': int(self.nonzero[i]),
+                            'min': float(self.minimums[i]),
+                            'max': float(self.maximums[i])
+                        }
+                        for i, name in enumerate(self.numeric_fields)
+                    },
+                    'categories': {name: dict(counter) for name, counter in self.categories.items()},
+                    'percentiles': {name: h.percentiles() for name, h in self.histograms.items()}
+                }
+
+        with self._lock:
+            indices = self._window_indices(last_n)
+            rows = self._rows[indices]
+            text = self._text[indices]
+
+        if not len(rows):
+            return {'count': 0, 'columns': {}, 'categories': {}, 'percentiles': {}}
+
+        percentiles = {}
+        for name in self.histograms:
+            values = rows[:, self._column[name]]
+            values = values[values > 0]
+            points = np.percentile(values, PERCENTILES) if len(values) else np.zeros(len(PERCENTILES))
+            percentiles[name] = {f'p{q}': round(float(v), 4) for q, v in zip(PERCENTILES, points)}
+
+        return {
+            'count': len(rows),
+            'columns': {
+                name: {
+                    'sum': float(column.sum()),
+                    'nonzero': int(np.count_nonzero(column)),
+                    'min': float(column.min()),
+                    'max': float(column.max())
+                }
+                for name, column in zip(self.numeric_fields, rows.T)
+            },
+            'categories': {
+                name: dict(Counter(values[self.text_fields.index(name)] for values in text))
+                for name in self.categories
+            },
+            'percentiles': percentiles
+        }
+
+    def records(self, last_n: Optional[int] = None) -> List[Dict]:
+        """The last `last_n` records held as dicts, oldest first."""
+        with self._lock:
+            indices = self._window_indices(last_n)
+            rows = self._rows[indices]
+            text = list(self._text[indices])
+
+        records = []
+        for row, values in zip(rows, text):
+            record = {name: self._types[name](value) for name, value in zip(self.numeric_fields, row.tolist())}
+            record.update(zip(self.text_fields, values))
+            records.append({name: record[name] for name in self._types})
+        return records
+
+    def column_stats(self) -> Dict[str, Dict]:
+        """Lifetime sum, nonzero count, min and max per numeric field."""
+        with self._lock:
+            return {
+                name: {
+                    'sum': float(self.sums[i]),
+                    'nonzero': int(self.nonzero[i]),
+                    'min': float(self.minimums[i]),
+                    'max': float(self.maximums[i])
+                }
+                for i, name in enumerate(self.numeric_fields)
+            }
@@ -0,0 +1,188 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from services.llm_service import LLMService
+from core.deadline import Deadline
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("model_cascade")
+
+
+class ModelCascade:
+    """
+    Two-tier routing: answer with LLM_FAST_MODEL first and escalate to
+    LLM_MODEL only when a configured signal fires.
+
+    Signals (LLM_CASCADE_SIGNALS):
+    - low_similarity: best retrieval similarity below LLM_CASCADE_MIN_SIMILARITY
+      (checked before the fast call, so the cheap attempt is skipped)
+    - length: the fast answer was cut off (finish_reason == "length")
+    - empty: the fast answer is empty
+    - no_citations: the fast answer has no [Source N] citation
+    A failed fast call always escalates. With no fast model configured every
+    question goes straight to LLM_MODEL.
+
+    Each call gets the time left in the request deadline. When a fast answer
+    needs escalating but less than DEADLINE_MIN_LLM_SECONDS is left, the fast
+    answer is kept (escalation_skipped) rather than risking a timeout.
+    """
+
+    SIGNALS = ("low_similarity", "length", "empty", "no_citations")
+    CITATION_PATTERN = re.compile(r"\[Source \d+\]")
+
+    def __init__(
+        self,
+        fast_model: Optional[str] = None,
+        strong_model: Optional[str] = None,
+        min_similarity: Optional[float] = None,
+        signals: Optional[List[str]] = None
+    ):
+        self.fast_model = fast_model if fast_model is not None else settings.LLM_FAST_MODEL
+        self.strong_model = strong_model or settings.LLM_MODEL
+        self.min_similarity = min_similarity if min_similarity is not None else settings.LLM_CASCADE_MIN_SIMILARITY
+        self.signals = set(signals if signals is not None else settings.LLM_CASCADE_SIGNALS)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalations_skipped = 0
+        self.escalations: Dict[str, int] = {}
+        self.tiers: Dict[str, Dict] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.fast_model) and self.fast_model != self.strong_model
+
+    def pre_route_reason(self, retrieval_results: List[Dict]) -> Optional[str]:
+
+        if "low_similarity" not in self.signals or not retrieval_results:
+            return None
+        best = max(r.get('similarity', 0) for r in retrieval_results)
+        return "low_similarity" if best < self.min_similarity else None
+
+    def escalation_reason(self, llm_response: Dict) -> Optional[str]:
+
+        if 'error' in llm_response:
+            return "error"
+        if "length" in self.signals and llm_response.get('finish_reason') == "length":
+            return "length"
+        answer = (llm_response.get('answer') or "").strip()
+        if "empty" in self.signals and not answer:
+            return "empty"
+        if "no_citations" in self.signals and not self.CITATION_PATTERN.search(answer):
+            return "no_citations"
+        return None
+
+    def _record_tier(self, tier: str, response: Dict) -> None:
+
+        with self._lock:
+            stats = self.tiers.setdefault(tier, {
+                'model': response.get('model'),
+                'calls': 0,
+                'errors': 0,
+                'total_latency': 0.0,
+                'total_cost': 0.0
+            })
+            stats['calls'] += 1
+            stats['errors'] += 1 if 'error' in response else 0
+            stats['total_latency'] += response.get('latency', 0.0)
+            stats['total_cost'] += response.get('cost', 0.0)
+
+    async def _call(
+        self,
+        tier: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        deadline: Optional[Deadline] = None
+    ) -> Dict:
+
+        timeout = deadline.remaining() if deadline is not None else None
+        response = await LLMService(model=model).generate_response_async(messages, timeout=timeout)
+        self._record_tier(tier, response)
+        return response
+
+    @staticmethod
+    def _combine(attempts: List[Tuple[str, Dict]], reason: Optional[str]) -> Dict:
+        """Final answer from the last attempt; latency, usage and cost summed."""
+        tier, final = attempts[-1]
+        usage = {
+            key: sum(a.get('usage', {}).get(key, 0) for _, a in attempts)
+            for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+        }
+        return {
+            **final,
+            'usage': usage,
+            'cost': round(sum(a.get('cost', 0.0) for _, a in attempts), 6),
+            'latency': round(sum(a.get('latency', 0.0) for _, a in attempts), 2),
+            'tier': tier,
+            'escalated': reason is not None,
+            'escalation_reason': reason,
+            'attempts': [
+                {'tier': t, 'model': a.get('model'), 'latency': a.get('latency'), 'cost': a.get('cost')}
+                for t, a in attempts
+            ]
+        }
+
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        retrieval_results: List[Dict],
+        deadline: Optional[Deadline] = None
+    ) -> Dict:
+        """Same contract as LLMService.generate_response, plus tier/escalation fields."""
+        with self._lock:
+            self.requests += 1
+
+        if not self.enabled:
+            response = await self._call("strong", self.strong_model, messages, deadline)
+            return self._combine([("strong", response)], None)
+
+        attempts: List[Tuple[str, Dict]] = []
+        reason = self.pre_route_reason(retrieval_results)
+
+        if reason is None:
+            fast = await self._call("fast", self.fast_model, messages, deadline)
+            attempts.append(("fast", fast))
+            reason = self.escalation_reason(fast)
+            if reason is None:
+                return self._combine(attempts, None)
+            if reason != "error" and deadline is not None and not deadline.allows(settings.DEADLINE_MIN_LLM_SECONDS):
+                logger.info(f"Keeping {self.fast_model} answer ({reason}): no time left to escalate")
+                with self._lock:
+                    self.escalations_skipped += 1
+                return {**self._combine(attempts, None), 'escalation_skipped': reason}
+
+        logger.info(f"Escalating to {self.strong_model} ({reason})")
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+
+        strong = await self._call("strong", self.strong_model, messages, deadline)
+        attempts.append(("strong", strong))
+        return self._combine(attempts, reason)
+
+    def get_stats(self) -> Dict:
+
+        with self._lock:
+            escalated = sum(self.escalations.values())
+            return {
+                'enabled': self.enabled,
+                'fast_model': self.fast_model or None,
+                'strong_model': self.strong_model,
+                'requests': self.requests,
+                'escalations': escalated,
+                'escalations_skipped': self.escalations_skipped,
+                'escalation_rate': round(escalated / self.requests * 100, 2) if self.requests else 0.0,
+                'escalation_reasons': dict(self.escalations),
+                'tiers': {
+                    tier: {
+                        'model': stats['model'],
+                        'calls': stats['calls'],
+                        'errors': stats['errors'],
+                        'avg_latency': round(stats['total_latency'] / stats['calls'], 3),
+                        'avg_cost': round(stats['total_cost'] / stats['calls'], 6),
+                        'total_cost': round(stats['total_cost'], 6)
+                    }
+                    for tier, stats in self.tiers.items()
+                }
+            }
@@ -1,8 +1,10 @@
 import time
 from typing import Dict, List, Optional
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
+from services.metrics_store import MetricsStore
+from core.config import settings
 from core.logging_config import get_logger
 
 logger = get_logger("observability")
@@ -14,12 +16,16 @@ class QueryMetrics:
     question: str
 
     guardrails_latency: float = 0.0
+    embedding_latency: float = 0.0
+    speculation_saved: float = 0.0
     retrieval_latency: float = 0.0
     llm_latency: float = 0.0
     total_latency: float = 0.0
+    time_to_first_token: float = 0.0
 
     query_tokens: int = 0
     context_tokens: int = 0
+    context_budget: int = 0
     prompt_tokens: int = 0
     completion_tokens: int = 0
     total_tokens: int = 0
@@ -29,10 +35,19 @@ class QueryMetrics:
     total_cost: float = 0.0
 
     chunks_retrieved: int = 0
+    chunks_in_prompt: int = 0
     avg_similarity: float = 0.0
 
+    llm_model: str = ""
+    escalated: bool = False
+    hedged: bool = False
+    hedge_won: bool = False
+    degraded: bool = False
+    answer_mode: str = "generate"
+
     success: bool = True
     error: Optional[str] = None
+    coalesced: bool = False
 
     guardrails_passed: bool = True
     guardrails_violations: Optional[List[str]] = None
@@ -41,10 +56,28 @@ class QueryMetrics:
         if self.guardrails_violations is None:
             self.guardrails_violations = []
 
-class ObservabilityService:
+LATENCY_FIELDS = [
+    'guardrails_latency', 'embedding_latency', 'retrieval_latency',
+    'llm_latency', 'time_to_first_token', 'total_latency'
+]
 
-    def __init__(self):
-        self.metrics_history: List[QueryMetrics] = []
+class ObservabilityService:
+    """
+    Per-query metrics kept in a MetricsStore: the last METRICS_WINDOW_SIZE
+    queries in NumPy columns, plus running totals and latency histograms
+    since start, so memory stays constant and /chat/metrics does not rescan
+    the history.
+    """
+
+    def __init__(self, window_size: Optional[int] = None):
+        self.store = MetricsStore(
+            QueryMetrics,
+            window_size or settings.METRICS_WINDOW_SIZE,
+            latency_fields=LATENCY_FIELDS,
+            category_fields=['answer_mode']
+        )
+        self.speculations_cancelled = 0
+        self.deadline_exceeded: Dict[str, int] = {}
 
     def start_query(self, question: str) -> Dict:
 
@@ -84,6 +117,42 @@ class ObservabilityService:
         if metadata:
             context[f'{stage}_metadata'] = metadata
 
+    def record_speculation(
+        self,
+        context: Dict,
+        guardrails_done: float,
+        embedding: Optional[Dict] = None
+    ) -> None:
+        """
+        Account for a query embedding started alongside the guardrails.
+        `embedding` holds its 'started'/'finished' times, or is None when the
+        work was cancelled. The time saved is how long the embedding ran
+        before the guardrails verdict, i.e. what a sequential pipeline would
+        have added to the critical path.
+        """
+        if embedding is None:
+            self.speculations_cancelled += 1
+            self.record_stage(context, 'speculation', 0.0, metadata={'cancelled': True})
+            return
+
+        latency = embedding['finished'] - embedding['started']
+        saved = max(min(guardrails_done, embedding['finished']) - embedding['started'], 0.0)
+        self.record_stage(context, 'speculation', saved, metadata={
+            'cancelled': False,
+            'embedding_latency': round(latency, 4),
+            'saved': round(saved, 4)
+        })
+
+    def record_deadline_exceeded(self, stage: str) -> None:
+        """A request failed with 504 because `stage` ran out of budget."""
+        logger.warning(f"Request deadline exceeded during {stage}")
+        self.deadline_exceeded[stage] = self.deadline_exceeded.get(stage, 0) + 1
+
+    def record_first_token(self, context: Dict) -> None:
+        """Time from query start until the first answer byte reached the client."""
+        if 'time_to_first_token' not in context:
+            context['time_to_first_token'] = round(time.time() - context['start_time'], 3)
+
     def finish_query(
         self,
         context: Dict,
@@ -94,6 +163,7 @@ class ObservabilityService:
     ) -> QueryMetrics:
 
         total_time = time.time() - context['start_time']
+        packing = context.get('prompt_metadata') or {}
 
         chunks_retrieved = len(retrieval_results)
         avg_similarity = (
@@ -118,12 +188,19 @@ class ObservabilityService:
             question=context['question'],
 
             guardrails_latency=context['stage_times'].get('guardrails', 0),
+            embedding_latency=context.get('speculation_metadata', {}).get('embedding_latency', 0.0),
+            speculation_saved=context.get('speculation_metadata', {}).get('saved', 0.0),
             retrieval_latency=context['stage_times'].get('retrieval', 0),
             llm_latency=llm_response.get('latency', 0),
             total_latency=round(total_time, 2),
+            time_to_first_token=context.get('time_to_first_token', 0.0),
 
             query_tokens=context.get('retrieval_metadata', {}).get('query_tokens', 0),
-            context_tokens=context.get('retrieval_metadata', {}).get('context_tokens', 0),
+            context_tokens=packing.get(
+                'context_tokens',
+                context.get('retrieval_metadata', {}).get('context_tokens', 0)
+            ),
+            context_budget=packing.get('context_budget', 0),
             prompt_tokens=llm_response.get('usage', {}).get('prompt_tokens', 0),
             completion_tokens=llm_response.get('usage', {}).get('completion_tokens', 0),
             total_tokens=llm_response.get('usage', {}).get('total_tokens', 0),
@@ -133,107 +210,166 @@ class ObservabilityService:
             total_cost=llm_response.get('cost', 0),
 
             chunks_retrieved=chunks_retrieved,
+            chunks_in_prompt=packing.get('sources_used', chunks_retrieved),
             avg_similarity=round(avg_similarity, 3),
 
+            llm_model=llm_response.get('model', ''),
+            escalated=llm_response.get('escalated', False),
+            hedged=llm_response.get('hedge', 'direct') != 'direct',
+            hedge_won=llm_response.get('hedge') == 'hedge',
+            degraded=llm_response.get('degraded', False),
+            answer_mode=llm_response.get('answer_mode', 'generate'),
+
             success='error' not in llm_response,
             error=llm_response.get('error'),
+            coalesced=llm_response.get('coalesced', False),
 
             guardrails_passed=guardrails_result.get('is_valid', True),
             guardrails_violations=guardrails_result.get('violations', [])
         )
 
-        self.metrics_history.append(metrics)
+        self.store.append(metrics)
 
         return metrics
 
     def get_statistics(self, last_n: Optional[int] = None) -> Dict:
-
-        if not self.metrics_history:
+        """
+        Statistics over every query since start, or over the last `last_n`
+        (at most METRICS_WINDOW_SIZE). Without last_n this reads running
+        totals only.
+        """
+        if not len(self.store):
             return {
                 'total_queries': 0,
                 'message': 'No metrics recorded yet'
             }
 
-        metrics = self.metrics_history[-last_n:] if last_n else self.metrics_history
-
-        total = len(metrics)
-        successful = sum(1 for m in metrics if m.success)
-        failed = total - successful
-
-        avg_total_latency = sum(m.total_latency for m in metrics) / total
-        avg_llm_latency = sum(m.llm_latency for m in metrics) / total
-        avg_retrieval_latency = sum(m.retrieval_latency for m in metrics) / total
-
-        total_tokens = sum(m.total_tokens for m in metrics)
-        avg_tokens = total_tokens / total
+        summary = self.store.summary(last_n or None)
+        columns = summary['columns']
+        total = summary['count']
 
-        total_cost = sum(m.total_cost for m in metrics)
-        avg_cost = total_cost / total
+        def total_of(name: str) -> float:
+            return columns[name]['sum']
 
-        avg_chunks = sum(m.chunks_retrieved for m in metrics) / total
-        avg_similarity = sum(m.avg_similarity for m in metrics) / total
+        def avg(name: str) -> float:
+            return columns[name]['sum'] / total
 
-        guardrails_violations = sum(1 for m in metrics if not m.guardrails_passed)
+        successful = int(total_of('success'))
+        streamed = columns['time_to_first_token']['nonzero']
+        speculative = columns['embedding_latency']['nonzero']
+        guardrails_violations = total - int(total_of('guardrails_passed'))
+        degraded = int(total_of('degraded'))
+        answer_modes = summary['categories']['answer_mode']
 
         return {
             'total_queries': total,
             'successful_queries': successful,
-            'failed_queries': failed,
+            'failed_queries': total - successful,
             'success_rate': round(successful / total * 100, 2),
+            'coalesced_queries': int(total_of('coalesced')),
 
             'latency': {
-                'avg_total': round(avg_total_latency, 2),
-                'avg_llm': round(avg_llm_latency, 2),
-                'avg_retrieval': round(avg_retrieval_latency, 2),
-                'min_total': min(m.total_latency for m in metrics),
-                'max_total': max(m.total_latency for m in metrics)
+                'avg_total': round(avg('total_latency'), 2),
+                'avg_llm': round(avg('llm_latency'), 2),
+                'avg_retrieval': round(avg('retrieval_latency'), 2),
+                'avg_time_to_first_token': round(
+                    total_of('time_to_first_token') / streamed, 3
+                ) if streamed else 0.0,
+                'min_total': columns['total_latency']['min'],
+                'max_total': columns['total_latency']['max']
+            },
+
+            'percentiles': {
+                name.replace('_latency', ''): points
+                for name, points in summary['percentiles'].items()
             },
 
             'tokens': {
-                'total': total_tokens,
-                'avg_per_query': round(avg_tokens, 0),
-                'avg_prompt': round(sum(m.prompt_tokens for m in metrics) / total, 0),
-                'avg_completion': round(sum(m.completion_tokens for m in metrics) / total, 0)
+                'total': int(total_of('total_tokens')),
+                'avg_per_query': round(avg('total_tokens'), 0),
+                'avg_prompt': round(avg('prompt_tokens'), 0),
+                'avg_completion': round(avg('completion_tokens'), 0)
             },
 
             'cost': {
-                'total': round(total_cost, 4),
-                'avg_per_query': round(avg_cost, 6),
-                'estimated_per_1k_queries': round(avg_cost * 1000, 2)
+                'total': round(total_of('total_cost'), 4),
+                'avg_per_query': round(avg('total_cost'), 6),
+                'estimated_per_1k_queries': round(avg('total_cost') * 1000, 2)
             },
 
             'retrieval': {
-                'avg_chunks_retrieved': round(avg_chunks, 1),
-                'avg_similarity': round(avg_similarity, 3)
+                'avg_chunks_retrieved': round(avg('chunks_retrieved'), 1),
+                'avg_similarity': round(avg('avg_similarity'), 3)
+            },
+
+            'prompt': {
+                'avg_context_tokens': round(avg('context_tokens'), 0),
+                'avg_context_budget': round(avg('context_budget'), 0),
+                'avg_chunks_in_prompt': round(avg('chunks_in_prompt'), 1)
+            },
+
+            'speculation': {
+                'speculative_queries': speculative,
+                'cancelled': self.speculations_cancelled,
+                'avg_embedding_latency': round(
+                    total_of('embedding_latency') / speculative, 4
+                ) if speculative else 0.0,
+                'avg_saved': round(total_of('speculation_saved') / speculative, 4) if speculative else 0.0,
+                'total_saved': round(total_of('speculation_saved'), 3)
+            },
+
+            'hedging': {
+                'hedged_queries': int(total_of('hedged')),
+                'hedge_wins': int(total_of('hedge_won'))
+            },
+
+            'answer_mode': {
+                mode: answer_modes.get(mode, 0)
+                for mode in ('generate', 'extractive')
+            },
+
+            'deadline': {
+                'degraded': degraded,
+                'degradation_rate': round(degraded / total * 100, 2),
+                'exceeded': dict(self.deadline_exceeded)
             },
 
             'guardrails': {
                 'violations': guardrails_violations,
                 'violation_rate': round(guardrails_violations / total * 100, 2)
+            },
+
+            'window': {
+                'size': self.store.capacity,
+                'queries_held': min(self.store.count, self.store.capacity)
             }
         }
 
     def get_recent_queries(self, n: int = 10) -> List[Dict]:
-
-        recent = self.metrics_history[-n:]
-        return [asdict(m) for m in recent]
+        """The last n queries, oldest first; questions are cut to MetricsStore.QUESTION_CHARS."""
+        return self.store.records(n)
 
     def identify_bottlenecks(self) -> Dict:
 
-        if not self.metrics_history:
+        if not len(self.store):
             return {'message': 'Dados insuficientes'}
 
-        metrics = self.metrics_history
+        summary = self.store.summary()
+        columns = summary['columns']
+        total = summary['count']
 
-        avg_total = sum(m.total_latency for m in metrics) / len(metrics)
-        avg_guardrails = sum(m.guardrails_latency for m in metrics) / len(metrics)
-        avg_retrieval = sum(m.retrieval_latency for m in metrics) / len(metrics)
-        avg_llm = sum(m.llm_latency for m in metrics) / len(metrics)
+        avg_total = columns['total_latency']['sum'] / total
+        avg_guardrails = columns['guardrails_latency']['sum'] / total
+        avg_retrieval = columns['retrieval_latency']['sum'] / total
+        avg_llm = columns['llm_latency']['sum'] / total
+
+        def share(latency: float) -> float:
+            return round(latency / avg_total * 100, 1) if avg_total else 0.0
 
         breakdown = {
-            'guardrails': round(avg_guardrails / avg_total * 100, 1),
-            'retrieval': round(avg_retrieval / avg_total * 100, 1),
-            'llm': round(avg_llm / avg_total * 100, 1)
+            'guardrails': share(avg_guardrails),
+            'retrieval': share(avg_retrieval),
+            'llm': share(avg_llm)
         }
 
         bottleneck = max(breakdown.items(), key=lambda x: x[1])[0] if breakdown else "unknown"
@@ -245,6 +381,10 @@ class ObservabilityService:
                 'retrieval': round(avg_retrieval, 2),
                 'llm': round(avg_llm, 2)
             },
+            'p95_latencies': {
+                stage: summary['percentiles'][f'{stage}_latency']['p95']
+                for stage in ('total', 'guardrails', 'retrieval', 'llm')
+            },
             'time_breakdown_percent': breakdown,
             'primary_bottleneck': bottleneck,
             'recommendation': self._get_bottleneck_recommendation(bottleneck)
@@ -260,5 +400,5 @@ class ObservabilityService:
         return recommendations.get(bottleneck, 'No specific recommendation')
 
     def export_metrics(self) -> List[Dict]:
-
-        return [asdict(m) for m in self.metrics_history]
+        """Every query still in the window, oldest first."""
+        return self.store.records()
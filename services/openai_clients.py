@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from typing import Optional, Tuple
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+from core.config import settings
+
+_lock = threading.Lock()
+_sync_client: Optional[OpenAI] = None
+_async_client: Optional[Tuple[asyncio.AbstractEventLoop, AsyncOpenAI]] = None
+
+
+def _limits() -> httpx.Limits:
+
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS
+    )
+
+
+def get_openai_client() -> OpenAI:
+    """
+    Process-wide sync client, so threadpool callers share one connection pool.
+    SDK retries are off: openai_scheduler owns retry and backoff.
+    """
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = OpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL or None,
+                timeout=settings.OPENAI_TIMEOUT,
+                max_retries=0,
+                http_client=DefaultHttpxClient(limits=_limits())
+            )
+        return _sync_client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Shared async client for the running event loop. httpx async pools are
+    bound to the loop that created them, so a new loop (asyncio.run in a CLI)
+    gets its own client.
+    """
+    global _async_client
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if _async_client is None or _async_client[0] is not loop:
+            _async_client = (loop, AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL or None,
+                timeout=settings.OPENAI_TIMEOUT,
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(limits=_limits())
+            ))
+        return _async_client[1]
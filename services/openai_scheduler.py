@@ -0,0 +1,365 @@
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("openai_scheduler")
+
+T = TypeVar("T")
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+BURST_SECONDS = 10
+WAIT_SAMPLES = 1000
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class TokenBucket:
+    """
+    Continuously refilled bucket of `per_minute` units per minute, holding at
+    most BURST_SECONDS worth of them. A limit of 0 means unlimited. The level
+    may go negative when a call turns out to cost more than estimated.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = max(per_minute * BURST_SECONDS / 60, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def refill(self, now: float) -> None:
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def time_until(self, amount: float, floor: float = 0.0) -> float:
+        """Seconds until `amount` can be taken leaving at least `floor` units."""
+        if self.unlimited:
+            return 0.0
+        deficit = amount + floor - self.level
+        return max(deficit * 60 / self.per_minute, 0.0)
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level -= amount
+
+    def give(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass
+class _Waiter:
+
+    priority: int
+    tokens: int
+    wake: Callable[[], None]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted: bool = False
+    cancelled: bool = False
+
+
+class QuotaScheduler:
+    """
+    Process-wide admission control for OpenAI calls.
+
+    Every call first takes one request from the RPM bucket and its estimated
+    tokens from the TPM bucket. Waiting calls are served strictly by
+    priority (INTERACTIVE before BATCH, FIFO within a priority), and BATCH
+    calls may not drain either bucket below OPENAI_BATCH_RESERVE of its
+    capacity, so a live question arriving during a bulk ingest finds quota
+    immediately instead of queueing behind it.
+
+    A 429 pauses all dispatching for the server's Retry-After (or a jittered
+    exponential backoff when absent), since the quota it reports is shared
+    by every caller; connection errors, timeouts and 5xx are retried with
+    jittered backoff by the failing caller only. Sync callers block their
+    thread, async callers await without holding the event loop; a daemon
+    thread wakes waiters as the buckets refill.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        batch_reserve: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_base: Optional[float] = None,
+        retry_max: Optional[float] = None
+    ):
+        self.rpm = TokenBucket(rpm if rpm is not None else settings.OPENAI_RPM_LIMIT)
+        self.tpm = TokenBucket(tpm if tpm is not None else settings.OPENAI_TPM_LIMIT)
+        self.batch_reserve = batch_reserve if batch_reserve is not None else settings.OPENAI_BATCH_RESERVE
+        self.max_retries = max_retries if max_retries is not None else settings.OPENAI_MAX_RETRIES
+        self.retry_base = retry_base if retry_base is not None else settings.OPENAI_RETRY_BASE_SECONDS
+        self.retry_max = retry_max if retry_max is not None else settings.OPENAI_RETRY_MAX_SECONDS
+
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._dispatcher: Optional[threading.Thread] = None
+
+        self.stats = {
+            name: {'granted': 0, 'throttled': 0, 'retries': 0, 'failed': 0, 'total_wait': 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self._waits = {name: deque(maxlen=WAIT_SAMPLES) for name in PRIORITY_NAMES.values()}
+
+    def _max_tokens(self, priority: int) -> int:
+        """Largest TPM cost a call of this priority can ever be granted."""
+        reserve = self.batch_reserve if priority == BATCH else 0.0
+        return max(int(self.tpm.capacity * (1 - reserve)), 1)
+
+    def _dispatch(self) -> Optional[float]:
+        """
+        Grant every waiter that fits, in priority order. Returns the seconds
+        until the head waiter can be served, or None when the queue is empty.
+        Must hold self._cond.
+        """
+        now = time.monotonic()
+        self.rpm.refill(now)
+        self.tpm.refill(now)
+
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            reserve = self.batch_reserve if waiter.priority == BATCH else 0.0
+            wait = max(
+                self.rpm.time_until(1, self.rpm.capacity * reserve),
+                self.tpm.time_until(waiter.tokens, self.tpm.capacity * reserve)
+            )
+            if wait > 0:
+                return wait
+
+            heapq.heappop(self._queue)
+            self.rpm.take(1)
+            self.tpm.take(waiter.tokens)
+            waiter.granted = True
+
+            name = PRIORITY_NAMES[waiter.priority]
+            waited = now - waiter.enqueued_at
+            self.stats[name]['granted'] += 1
+            self.stats[name]['total_wait'] += waited
+            self._waits[name].append(waited)
+            waiter.wake()
+
+        return None
+
+    def _run_dispatcher(self) -> None:
+
+        with self._cond:
+            while True:
+                self._cond.wait(self._dispatch())
+
+    def _enqueue(self, priority: int, tokens: int, wake: Callable[[], None]) -> _Waiter:
+
+        waiter = _Waiter(priority=priority, tokens=min(max(tokens, 1), self._max_tokens(priority)), wake=wake)
+        with self._cond:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run_dispatcher, name="openai-scheduler", daemon=True)
+                self._dispatcher.start()
+            heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+            self._dispatch()
+            self._cond.notify()
+        return waiter
+
+    def _cancel(self, waiter: _Waiter) -> None:
+
+        with self._cond:
+            if waiter.granted:
+                self.rpm.give(1)
+                self.tpm.give(waiter.tokens)
+            waiter.cancelled = True
+            self._cond.notify()
+
+    @property
+    def congested(self) -> bool:
+        """Calls are queueing or dispatch is paused after a 429."""
+        with self._cond:
+            return time.monotonic() < self._paused_until or any(
+                not waiter.cancelled for _, _, waiter in self._queue
+            )
+
+    def acquire(self, priority: int = INTERACTIVE, tokens: int = 1) -> None:
+        """Block the calling thread until the call may be sent."""
+        event = threading.Event()
+        self._enqueue(priority, tokens, event.set)
+        event.wait()
+
+    async def acquire_async(self, priority: int = INTERACTIVE, tokens: int = 1) -> None:
+        """Wait, without blocking the event loop, until the call may be sent."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+            except RuntimeError:
+                pass
+
+        waiter = self._enqueue(priority, tokens, wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+
+    def reconcile(self, estimated: int, actual: int) -> None:
+        """Correct the TPM bucket once a call's real token usage is known."""
+        if not actual or actual == estimated:
+            return
+        with self._cond:
+            if actual < estimated:
+                self.tpm.give(estimated - actual)
+            else:
+                self.tpm.take(actual - estimated)
+            self._cond.notify()
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+
+    def _on_error(self, error: Exception, priority: int, attempt: int) -> Optional[float]:
+        """
+        Record a failed attempt. Returns how long this caller should sleep
+        before retrying (0 for a 429, whose pause applies to everyone via
+        the dispatcher), or None when the error must be raised.
+        """
+        name = PRIORITY_NAMES[priority]
+
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+            with self._cond:
+                self.stats[name]['failed'] += 1
+            return None
+
+        with self._cond:
+            self.stats[name]['retries'] += 1
+            if not isinstance(error, RateLimitError):
+                delay = self._backoff(attempt)
+                logger.warning(f"OpenAI call failed ({type(error).__name__}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                return delay
+
+            retry_after = self._retry_after(error)
+            pause = retry_after + random.uniform(0, self.retry_base) if retry_after is not None else self._backoff(attempt)
+            self.stats[name]['throttled'] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._cond.notify()
+
+        logger.warning(f"OpenAI rate limit hit ({name}); pausing dispatch for {pause:.2f}s")
+        return 0.0
+
+    def call(self, fn: Callable[[], T], priority: int = INTERACTIVE, tokens: int = 1) -> T:
+        """Run a blocking OpenAI call under the quota, retrying transient failures."""
+        attempt = 0
+        while True:
+            self.acquire(priority, tokens)
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._on_error(e, priority, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    async def call_async(self, fn: Callable[[], Awaitable[T]], priority: int = INTERACTIVE, tokens: int = 1) -> T:
+        """Async twin of call."""
+        attempt = 0
+        while True:
+            await self.acquire_async(priority, tokens)
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._on_error(e, priority, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._cond:
+            now = time.monotonic()
+            self.rpm.refill(now)
+            self.tpm.refill(now)
+
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, waiter in self._queue:
+                if not waiter.cancelled:
+                    queued[PRIORITY_NAMES[priority]] += 1
+
+            priorities = {}
+            for name, stats in self.stats.items():
+                waits = sorted(self._waits[name])
+                priorities[name] = {
+                    'queued': queued[name],
+                    'granted': stats['granted'],
+                    'throttled': stats['throttled'],
+                    'retries': stats['retries'],
+                    'failed': stats['failed'],
+                    'avg_wait': round(stats['total_wait'] / stats['granted'], 4) if stats['granted'] else 0.0,
+                    'p95_wait': round(waits[min(int(len(waits) * 0.95), len(waits) - 1)], 4) if waits else 0.0,
+                    'max_wait': round(waits[-1], 4) if waits else 0.0
+                }
+
+            return {
+                'rpm_limit': self.rpm.per_minute or None,
+                'tpm_limit': self.tpm.per_minute or None,
+                'rpm_available': None if self.rpm.unlimited else round(self.rpm.level, 2),
+                'tpm_available': None if self.tpm.unlimited else round(self.tpm.level),
+                'batch_reserve': self.batch_reserve,
+                'queue_depth': sum(queued.values()),
+                'paused_for': round(max(self._paused_until - now, 0.0), 3),
+                'priorities': priorities
+            }
+
+
+openai_scheduler = QuotaScheduler()
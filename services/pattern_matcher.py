@@ -0,0 +1,159 @@
+import re
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+REGEX_SPECIAL = set(".^$*+?{}[]()|\\")
+OPTIONAL_QUANTIFIERS = set("?*{")
+
+
+class AhoCorasick:
+    """
+    Multi-string matcher: every occurrence of every word in one pass over
+    the text, whatever the number of words.
+
+    The trie's failure links are folded into a full transition table
+    (a DFA), so the scan is a single dict lookup per character; characters
+    absent from every word go straight back to the root.
+    """
+
+    def __init__(self, words: Sequence[str]):
+        self.words = list(words)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for index, word in enumerate(self.words):
+            if not word:
+                raise ValueError("AhoCorasick words must be non-empty")
+            state = 0
+            for ch in word:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._output.append(())
+                state = nxt
+            self._output[state] += (index,)
+
+        # Breadth-first so a state's failure target is complete before its children.
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in list(self._goto[state].items()):
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                fail[child] = target if target != child else 0
+                self._output[child] += self._output[fail[child]]
+            for ch, target in self._goto[fail[state]].items():
+                self._goto[state].setdefault(ch, target)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(start offset, word index) of each occurrence, in order of end offset."""
+        goto = self._goto
+        root = goto[0]
+        output = self._output
+        words = self.words
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = goto[state].get(ch) or root.get(ch, 0)
+            if output[state]:
+                for index in output[state]:
+                    yield end - len(words[index]), index
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive keyword lookup on whole words. A keyword must start at a
+    word boundary; keywords up to WHOLE_WORD_MAX_CHARS ("ai", "rag", "svm")
+    must also end at one, while longer ones may run on into inflections
+    ("embedding" in "embeddings"). So "ai" no longer matches "said".
+    """
+
+    WHOLE_WORD_MAX_CHARS = 3
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords))
+        self._automaton = AhoCorasick(self.keywords)
+
+    def find(self, text: str) -> Optional[str]:
+        """First keyword found in text, or None."""
+        text = text.lower()
+        for start, index in self._automaton.iter_matches(text):
+            keyword = self.keywords[index]
+            end = start + len(keyword)
+            if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(keyword[0]):
+                continue
+            if (
+                len(keyword) <= self.WHOLE_WORD_MAX_CHARS
+                and end < len(text)
+                and _is_word_char(text[end])
+                and _is_word_char(keyword[-1])
+            ):
+                continue
+            return keyword
+        return None
+
+
+def literal_prefix(pattern: str) -> str:
+    """
+    Literal text every match of `pattern` starts with, e.g. "ignore" for
+    r"ignore\\s+previous". Stops at the first regex construct; a character
+    made optional by the quantifier after it is dropped.
+    """
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                break
+            ch = pattern[i + 1]
+            i += 2
+        elif ch in REGEX_SPECIAL:
+            break
+        else:
+            i += 1
+        if i < len(pattern) and pattern[i] in OPTIONAL_QUANTIFIERS:
+            break
+        prefix.append(ch)
+    return "".join(prefix)
+
+
+class RegexSet:
+    """
+    Case-insensitive search for any of many regexes in one pass.
+
+    Each pattern is anchored on its literal prefix; one Aho-Corasick scan
+    finds where any prefix occurs and only the patterns whose prefix occurs
+    there are tried, with match() at that offset. Cost follows the text
+    length and the number of prefix hits, not the number of patterns.
+    Patterns must begin with a literal and have no top-level alternation.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        self._compiled = [re.compile(p, re.IGNORECASE) for p in self.patterns]
+
+        anchors = []
+        for pattern in self.patterns:
+            anchor = literal_prefix(pattern).lower()
+            if not anchor:
+                raise ValueError(f"Pattern has no literal prefix to anchor on: {pattern!r}")
+            anchors.append(anchor)
+        self._automaton = AhoCorasick(anchors)
+
+    def search(self, text: str) -> Optional[str]:
+        """First pattern (by position in text) that matches, or None."""
+        text = text.lower()
+        for start, index in self._automaton.iter_matches(text):
+            if self._compiled[index].match(text, start):
+                return self.patterns[index]
+        return None
@@ -0,0 +1,180 @@
+import io
+import os
+import json
+import tempfile
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from pypdf import PdfReader
+
+from core.config import settings
+
+PdfSource = Union[str, bytes]
+
+
+class PdfPageCache:
+    """
+    On-disk cache of extracted page text keyed by (content hash, page number).
+
+    Layout: <cache_dir>/<hash[:2]>/<hash>/<page>.txt plus meta.json holding the
+    page count. Keys are content hashes, so entries never go stale; a re-ingest
+    or a chunking-parameter change reuses them without re-parsing the PDF.
+    Writes go through a temp file and os.replace so concurrent workers never
+    observe partial pages.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(cache_dir or settings.PDF_PAGE_CACHE_DIR)
+
+    def _document_dir(self, content_hash: str) -> Path:
+        return self.cache_dir / content_hash[:2] / content_hash
+
+    def _write_atomic(self, path: Path, data: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def has_page(self, content_hash: str, page: int) -> bool:
+        return (self._document_dir(content_hash) / f"{page}.txt").exists()
+
+    def get_page(self, content_hash: str, page: int) -> Optional[str]:
+        try:
+            return (self._document_dir(content_hash) / f"{page}.txt").read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def put_page(self, content_hash: str, page: int, text: str) -> None:
+        self._write_atomic(self._document_dir(content_hash) / f"{page}.txt", text)
+
+    def get_num_pages(self, content_hash: str) -> Optional[int]:
+        try:
+            meta = json.loads((self._document_dir(content_hash) / "meta.json").read_text())
+            return int(meta['num_pages'])
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def put_num_pages(self, content_hash: str, num_pages: int) -> None:
+        self._write_atomic(
+            self._document_dir(content_hash) / "meta.json",
+            json.dumps({'num_pages': num_pages})
+        )
+
+
+def _open_reader(source: PdfSource) -> PdfReader:
+    if isinstance(source, bytes):
+        return PdfReader(io.BytesIO(source))
+    return PdfReader(source)
+
+
+def count_pages(source: PdfSource) -> int:
+
+    return len(_open_reader(source).pages)
+
+
+def extract_page_range(source: PdfSource, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract pages [start, end). Module-level so it can be submitted to a
+    process pool; pass a file path rather than bytes to avoid pickling the PDF.
+    """
+    reader = _open_reader(source)
+    return [(page, reader.pages[page].extract_text() or "") for page in range(start, end)]
+
+
+def _missing_ranges(missing: List[int], pages_per_task: int) -> List[Tuple[int, int]]:
+    """Group missing page numbers into contiguous ranges of at most pages_per_task."""
+    ranges: List[Tuple[int, int]] = []
+    for page in missing:
+        if ranges and ranges[-1][1] == page and page - ranges[-1][0] < pages_per_task:
+            ranges[-1] = (ranges[-1][0], page + 1)
+        else:
+            ranges.append((page, page + 1))
+    return ranges
+
+
+def iter_pdf_pages(
+    source: PdfSource,
+    content_hash: str,
+    executor: Optional[Executor] = None,
+    cache: Optional[PdfPageCache] = None,
+    pages_per_task: Optional[int] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) in page order.
+
+    Cached pages are read from disk; the rest are grouped into page ranges and,
+    when an executor is given, all ranges are submitted up front so they parse
+    in parallel while earlier pages are already being yielded. Without an
+    executor, ranges are extracted lazily in the calling process.
+    """
+    cache = cache or PdfPageCache()
+    pages_per_task = pages_per_task or settings.PDF_PAGES_PER_TASK
+
+    num_pages = cache.get_num_pages(content_hash)
+    if num_pages is None:
+        num_pages = count_pages(source)
+        cache.put_num_pages(content_hash, num_pages)
+
+    missing = [page for page in range(num_pages) if not cache.has_page(content_hash, page)]
+    ranges = _missing_ranges(missing, pages_per_task)
+
+    futures: Dict[Tuple[int, int], Future] = {}
+    if executor is not None:
+        for start, end in ranges:
+            futures[(start, end)] = executor.submit(extract_page_range, source, start, end)
+
+    range_of_page = {page: r for r in ranges for page in range(r[0], r[1])}
+    ready: Dict[int, str] = {}
+
+    try:
+        for page in range(num_pages):
+            page_range = range_of_page.get(page)
+
+            if page_range is None:
+                text = cache.get_page(content_hash, page)
+                if text is None:
+                    text = extract_page_range(source, page, page + 1)[0][1]
+                    cache.put_page(content_hash, page, text)
+                yield page, text
+                continue
+
+            if page not in ready:
+                future = futures.pop(page_range, None)
+                if future is not None:
+                    extracted = future.result()
+                else:
+                    extracted = extract_page_range(source, page_range[0], page_range[1])
+                for extracted_page, text in extracted:
+                    cache.put_page(content_hash, extracted_page, text)
+                    ready[extracted_page] = text
+
+            yield page, ready.pop(page)
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+
+def iter_pdf_text(
+    source: PdfSource,
+    content_hash: str,
+    executor: Optional[Executor] = None,
+    cache: Optional[PdfPageCache] = None
+) -> Iterator[str]:
+    """
+    Yield the text stream that joins non-empty pages with blank lines, in the
+    same layout IngestionService has always produced for PDFs.
+    """
+    first = True
+    for _, text in iter_pdf_pages(source, content_hash, executor=executor, cache=cache):
+        if not text:
+            continue
+        if not first:
+            yield "\n\n"
+        first = False
+        yield text
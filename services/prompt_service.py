@@ -1,4 +1,7 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+
+from services.token_counter import count_tokens, get_encoding
+from core.config import settings
 
 class PromptService:
 
@@ -18,8 +21,38 @@ Important rules:
 - Keep responses concise (maximum 3 paragraphs)
 - Use appropriate technical language, but accessible"""
 
-    def __init__(self):
+    SOURCE_HEADER = """--- Source {index} ---
+Document: {filename}
+Relevance: {similarity:.2%}
+
+"""
+
+    USER_TEMPLATE = """CONTEXT:
+{context}
+
+QUESTION:
+{question}
+
+Please answer using the information from the context and cite the sources."""
+
+    TRIM_MARKER = " [...]"
+    MIN_TRIMMED_TOKENS = 50
+
+    def __init__(self, token_budget: Optional[int] = None):
         self.system_message = self.SYSTEM_MESSAGE
+        self.token_budget = token_budget or min(
+            settings.PROMPT_TOKEN_BUDGET,
+            settings.LLM_CONTEXT_WINDOW - settings.MAX_TOKENS
+        )
+
+    def _format_source(self, index: int, result: Dict, content: str) -> str:
+
+        header = self.SOURCE_HEADER.format(
+            index=index,
+            filename=result['document'].filename,
+            similarity=result.get('similarity', 0)
+        )
+        return f"{header}{content}\n"
 
     def _format_context(
         self,
@@ -29,22 +62,100 @@ Important rules:
         context_parts = []
 
         for i, result in enumerate(retrieval_results, 1):
-            doc = result['document']
             content = result.get('full_context', result.get('content', ''))
-            similarity = result.get('similarity', 0)
-
-            source_text = f"""--- Source {i} ---
-Document: {doc.filename}
-Relevance: {similarity:.2%}
-
-{content}
-"""
-            context_parts.append(source_text)
+            context_parts.append(self._format_source(i, result, content))
 
         full_context = "\n".join(context_parts)
 
         return full_context
 
+    @staticmethod
+    def _messages_tokens(messages: List[Dict[str, str]]) -> int:
+        """Same accounting as LLMService.count_messages_tokens."""
+        num_tokens = 3
+        for message in messages:
+            num_tokens += 3
+            for value in message.values():
+                num_tokens += count_tokens(str(value))
+        return num_tokens
+
+    def _trim(self, content: str, max_tokens: int) -> str:
+
+        encoding = get_encoding()
+        keep = max_tokens - count_tokens(self.TRIM_MARKER)
+        trimmed = encoding.decode(encoding.encode(content)[:keep])
+
+        boundary = max(trimmed.rfind('. '), trimmed.rfind('\n'))
+        if boundary > len(trimmed) // 2:
+            trimmed = trimmed[:boundary + 1]
+        return trimmed.rstrip() + self.TRIM_MARKER
+
+    def pack_context(self, question: str, retrieval_results: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """
+        Fill the prompt budget greedily by relevance. Each source costs its
+        header plus content tokens, counted with tiktoken; a source that does
+        not fit is trimmed if at least MIN_TRIMMED_TOKENS remain, otherwise
+        dropped, and smaller sources further down may still fit. MAX_TOKENS is
+        reserved for the answer through the budget itself.
+        """
+        fixed_tokens = self._messages_tokens([
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": self.USER_TEMPLATE.format(context="", question=question)}
+        ])
+        context_budget = max(self.token_budget - fixed_tokens, 0)
+
+        packed = []
+        used = 0
+        trimmed = 0
+
+        ranked = sorted(retrieval_results, key=lambda r: r.get('similarity', 0), reverse=True)
+        for result in ranked:
+            content = result.get('full_context', result.get('content', ''))
+            header_tokens = count_tokens(self._format_source(len(packed) + 1, result, "")) + 1
+            # Counted here rather than read from Chunk.token_count: rows chunked
+            # before it held a tiktoken count still carry the len // 4 estimate.
+            content_tokens = count_tokens(content)
+            remaining = context_budget - used - header_tokens
+
+            if content_tokens > remaining:
+                if remaining < self.MIN_TRIMMED_TOKENS:
+                    continue
+                content = self._trim(content, remaining)
+                content_tokens = count_tokens(content)
+                trimmed += 1
+
+            packed.append({**result, 'full_context': content})
+            used += header_tokens + content_tokens
+
+        report = {
+            'budget': self.token_budget,
+            'context_budget': context_budget,
+            'context_tokens': used,
+            'prompt_tokens': fixed_tokens + used,
+            'sources_retrieved': len(retrieval_results),
+            'sources_used': len(packed),
+            'sources_trimmed': trimmed,
+            'sources_dropped': len(retrieval_results) - len(packed)
+        }
+        return packed, report
+
+    def build_prompt(self, question: str, retrieval_results: List[Dict]) -> Dict:
+        """
+        Packed prompt plus the packing report:
+        {'messages': [...], 'sources': [...], 'packing': {...}}
+        """
+        sources, packing = self.pack_context(question, retrieval_results)
+
+        messages = [
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": self.USER_TEMPLATE.format(
+                context=self._format_context(sources),
+                question=question
+            )}
+        ]
+
+        return {'messages': messages, 'sources': sources, 'packing': packing}
+
     def create_conversation_prompt(
         self,
         question: str,
@@ -60,20 +171,4 @@ Relevance: {similarity:.2%}
                 {"role": "user", "content": "..."},
             ]
         """
-        messages = [
-            {"role": "system", "content": self.system_message}
-        ]
-
-        context = self._format_context(retrieval_results)
-
-        user_message = f"""CONTEXT:
-{context}
-
-QUESTION:
-{question}
-
-Please answer using the information from the context and cite the sources."""
-
-        messages.append({"role": "user", "content": user_message})
-
-        return messages
+        return self.build_prompt(question, retrieval_results)['messages']
@@ -1,10 +1,12 @@
-from typing import List, Dict, Optional
+import asyncio
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 
 from database.vector_store import VectorStore
 from services.embedding_service import EmbeddingService
 from models.chunk import Chunk
-from models.document import Document
+from services.document_cache import document_cache
+from services.chunking_service import stitch_chunks
 from core.config import settings
 
 class RetrievalService:
@@ -21,13 +23,21 @@ class RetrievalService:
         min_similarity: Optional[float] = None
     ) -> List[Dict]:
 
+        query_embedding = self.embedding_service.generate_query_embedding(query)
+        return self._search(query_embedding, top_k, min_similarity)
+
+    def _search(
+        self,
+        query_embedding: List[float],
+        top_k: Optional[int] = None,
+        min_similarity: Optional[float] = None
+    ) -> List[Dict]:
+
         if top_k is None:
             top_k = settings.TOP_K_RESULTS
         if min_similarity is None:
             min_similarity = settings.MIN_SIMILARITY
 
-        query_embedding = self.embedding_service.generate_query_embedding(query)
-
         chunk_results = self.vector_store.similarity_search(
             query_embedding=query_embedding,
             top_k=top_k * 2,
@@ -37,36 +47,65 @@ class RetrievalService:
         if not chunk_results:
             return []
 
-        seen_docs = set()
-        deduplicated = []
-
+        hits_by_doc: Dict[int, List[Tuple[Chunk, float]]] = {}
         for chunk, similarity in chunk_results:
-            if chunk.document_id not in seen_docs:
-                seen_docs.add(chunk.document_id)
-                deduplicated.append((chunk, similarity))
+            document_id = int(chunk.document_id)
+            if document_id not in hits_by_doc:
+                if len(hits_by_doc) >= top_k:
+                    continue
+                hits_by_doc[document_id] = []
+            hits_by_doc[document_id].append((chunk, similarity))
 
-            if len(deduplicated) >= top_k:
-                break
+        documents = document_cache.get_many(self.db, hits_by_doc.keys())
 
         results = []
-        for chunk, similarity in deduplicated:
-            document = self.db.query(Document).filter(
-                Document.id == chunk.document_id
-            ).first()
+        for document_id, hits in hits_by_doc.items():
+            span = self._adjacent_span(hits) if settings.STITCH_ADJACENT_CHUNKS else hits[:1]
+            chunk, similarity = hits[0]
+
+            if len(span) == 1:
+                content = str(chunk.content)
+                token_count = chunk.token_count
+            else:
+                content = stitch_chunks([str(c.content) for c, _ in span], settings.CHUNK_OVERLAP)
+                token_count = None
 
             result = {
                 'chunk': chunk,
                 'similarity': round(similarity, 3),
-                'document': document,
+                'document': documents.get(document_id),
                 'chunk_index': chunk.chunk_index,
-                'content': str(chunk.content),
-                'full_context': str(chunk.content)
+                'chunk_indices': [c.chunk_index for c, _ in span],
+                'chunk_ids': [c.id for c, _ in span],
+                'token_count': token_count,
+                'content': content,
+                'full_context': content
             }
 
             results.append(result)
 
         return results
 
+    @staticmethod
+    def _adjacent_span(hits: List[Tuple[Chunk, float]]) -> List[Tuple[Chunk, float]]:
+        """
+        The best hit of a document extended with every other hit of the same
+        document whose chunk_index is contiguous with it, in document order.
+        Neighbouring chunks share CHUNK_OVERLAP characters, so they are
+        stitched into one span instead of being dropped as duplicates.
+        """
+        by_index = {int(chunk.chunk_index): (chunk, similarity) for chunk, similarity in hits}
+        best = int(hits[0][0].chunk_index)
+
+        first = best
+        while first - 1 in by_index:
+            first -= 1
+        last = best
+        while last + 1 in by_index:
+            last += 1
+
+        return [by_index[index] for index in range(first, last + 1)]
+
     def retrieve_with_metadata(
         self,
         query: str,
@@ -74,6 +113,40 @@ class RetrievalService:
     ) -> Dict:
 
         results = self.retrieve(query, top_k=top_k)
+        return self._with_metadata(query, results)
+
+    async def retrieve_with_metadata_async(
+        self,
+        query: str,
+        top_k: Optional[int] = None
+    ) -> Dict:
+        """
+        Query embedding on the shared AsyncOpenAI client; the vector search
+        (sync session) and token counting run in a worker thread so the event
+        loop stays free for other requests.
+        """
+        query_embedding = await self.embedding_service.generate_query_embedding_async(query)
+        return await self.search_with_metadata_async(query, query_embedding, top_k)
+
+    def search_with_metadata(
+        self,
+        query: str,
+        query_embedding: List[float],
+        top_k: Optional[int] = None
+    ) -> Dict:
+        """retrieve_with_metadata for an embedding computed elsewhere."""
+        return self._with_metadata(query, self._search(query_embedding, top_k))
+
+    async def search_with_metadata_async(
+        self,
+        query: str,
+        query_embedding: List[float],
+        top_k: Optional[int] = None
+    ) -> Dict:
+        """Second half of retrieve_with_metadata_async, for an embedding computed elsewhere."""
+        return await asyncio.to_thread(self.search_with_metadata, query, query_embedding, top_k)
+
+    def _with_metadata(self, query: str, results: List[Dict]) -> Dict:
 
         if not results:
             return {
@@ -85,7 +158,7 @@ class RetrievalService:
 
         avg_similarity = sum(r['similarity'] for r in results) / len(results)
         total_context_tokens = sum(
-            self.embedding_service.count_tokens(r['full_context'])
+            r.get('token_count') or self.embedding_service.count_tokens(r['full_context'])
             for r in results
         )
 
@@ -0,0 +1,67 @@
+import re
+import json
+from typing import List, Optional, Tuple
+import numpy as np
+
+from core.config import settings
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+MIN_SENTENCE_CHARS = 25
+MAX_SENTENCE_CHARS = 400
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    (start, end) offsets of the sentences in text worth scoring on their own.
+    Offsets rather than strings, so a chunk stores only its embeddings and
+    the sentences are cut from its content when needed.
+    """
+    spans = []
+    start = 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text + "\n\n"):
+        end = boundary.start()
+        if len(text[start:end].strip()) >= MIN_SENTENCE_CHARS:
+            spans.append((start, end))
+        start = boundary.end()
+    return spans
+
+
+def sentence_text(content: str, span: Tuple[int, int]) -> str:
+
+    return " ".join(content[span[0]:span[1]].split()).lstrip("#-* ")[:MAX_SENTENCE_CHARS]
+
+
+def sentence_dimension(model: Optional[str] = None) -> Optional[int]:
+    """
+    Stored dimension: text-embedding-3 vectors keep their meaning when
+    truncated and re-normalised (what the API's `dimensions` does), so they
+    are cut to SENTENCE_EMBEDDING_DIM; other models keep every dimension.
+    """
+    model = model or settings.EMBEDDING_MODEL
+    return settings.SENTENCE_EMBEDDING_DIM if "text-embedding-3" in model else None
+
+
+def reduce(vectors: np.ndarray, dimension: Optional[int]) -> np.ndarray:
+    """Truncate to `dimension` and L2-normalise each row."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dimension:
+        vectors = vectors[..., :dimension]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def pack(vectors: List[List[float]], model: Optional[str] = None) -> bytes:
+    """Sentence embeddings of one chunk as a float16 row-major matrix."""
+    return reduce(np.array(vectors), sentence_dimension(model)).astype(np.float16).tobytes()
+
+
+def unpack(blob: bytes, count: int) -> np.ndarray:
+    """Inverse of pack; the dimension follows from the blob size."""
+    matrix = np.frombuffer(blob, dtype=np.float16)
+    return matrix.reshape(count, -1).astype(np.float32) if count else matrix.reshape(0, 0)
+
+
+def encode_chunk(spans: List[Tuple[int, int]], vectors: List[List[float]], model: Optional[str] = None) -> Tuple[str, Optional[bytes]]:
+    """Column values (sentence_spans, sentence_embeddings) for one chunk."""
+    return json.dumps(spans), pack(vectors, model) if spans else None
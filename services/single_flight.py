@@ -0,0 +1,93 @@
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger("single_flight")
+
+
+@dataclass
+class _Flight:
+
+    task: asyncio.Task
+    started_at: float
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one in-flight
+    computation (Go's singleflight, for asyncio).
+
+    The first caller for a key starts the computation as its own task, so a
+    cancelled leader request does not cancel it for the followers. Followers
+    wait at most `timeout` seconds; past that they stop waiting and compute on
+    their own, and a flight older than `timeout` no longer accepts new
+    followers. Errors propagate to every caller of the flight.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._flights: Dict[Any, _Flight] = {}
+        self.stats = {
+            'leaders': 0,
+            'coalesced': 0,
+            'timeouts': 0,
+            'errors': 0
+        }
+
+    def joinable(self, key: Any, timeout: Optional[float] = None) -> bool:
+        """Whether a call with this key right now would join an in-flight computation."""
+        timeout = self.timeout if timeout is None else timeout
+        flight = self._flights.get(key)
+        return flight is not None and not flight.task.done() and time.monotonic() - flight.started_at < timeout
+
+    async def do(
+        self,
+        key: Any,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """Returns (result, coalesced) where coalesced is True for followers."""
+        timeout = self.timeout if timeout is None else timeout
+        now = time.monotonic()
+
+        flight = self._flights.get(key)
+        if self.joinable(key, timeout):
+            flight.waiters += 1
+            try:
+                result = await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+                self.stats['coalesced'] += 1
+                return result, True
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                logger.warning(f"Coalesced call timed out after {timeout}s; computing independently")
+                return await fn(), False
+            finally:
+                flight.waiters -= 1
+
+        task = asyncio.ensure_future(fn())
+        flight = _Flight(task=task, started_at=now)
+        self._flights[key] = flight
+        self.stats['leaders'] += 1
+
+        def _forget(done: asyncio.Task) -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not done.cancelled() and done.exception() is not None:
+                self.stats['errors'] += 1
+
+        task.add_done_callback(_forget)
+        return await asyncio.shield(task), False
+
+    def get_stats(self) -> Dict:
+
+        calls = self.stats['leaders'] + self.stats['coalesced']
+        return {
+            **self.stats,
+            'in_flight': len(self._flights),
+            'waiting': sum(f.waiters for f in self._flights.values()),
+            'coalesced_rate': round(self.stats['coalesced'] / calls * 100, 2) if calls else 0.0
+        }
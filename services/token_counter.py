@@ -0,0 +1,19 @@
+from functools import lru_cache
+from typing import Optional
+import tiktoken
+
+from core.config import settings
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: Optional[str] = None) -> tiktoken.Encoding:
+
+    try:
+        return tiktoken.encoding_for_model(model or settings.LLM_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens of text under the chat model's tokenizer (cl100k_base if unknown)."""
+    return len(get_encoding(model).encode(text))